@@ -28,10 +28,16 @@ if 'RECENT_MONTHS' not in globals():
     RECENT_MONTHS = 3
 if 'MIN_PLAYS' not in globals():
     MIN_PLAYS = 20
+if 'LASTFM_USERS' not in globals():
+    LASTFM_USERS = None
 if 'REQUEST_LIMIT' not in globals():
     REQUEST_LIMIT = 1/5
 if 'MBZ_DELAY' not in globals():
     MBZ_DELAY = 1.1
+if 'LASTFM_BURST' not in globals():
+    LASTFM_BURST = 5
+if 'MBZ_BURST' not in globals():
+    MBZ_BURST = 1
 if 'SIMILAR_MATCH_MIN' not in globals():
     SIMILAR_MATCH_MIN = 0.46
 if 'MAX_SIMILAR_PER_ART' not in globals():
@@ -40,10 +46,74 @@ if 'MAX_POP_ALBUMS' not in globals():
     MAX_POP_ALBUMS = 5
 if 'CACHE_TTL_HOURS' not in globals():
     CACHE_TTL_HOURS = 24
+if 'SIMILAR_CACHE_MAX_STALE_HOURS' not in globals():
+    SIMILAR_CACHE_MAX_STALE_HOURS = 168
+if 'SIMILAR_CACHE_MAX_ENTRIES' not in globals():
+    SIMILAR_CACHE_MAX_ENTRIES = 20000
+if 'SIMILAR_CACHE_MAX_BYTES' not in globals():
+    SIMILAR_CACHE_MAX_BYTES = 64 * 1024 * 1024
+if 'LOOKUP_CACHE_TTL_DAYS' not in globals():
+    LOOKUP_CACHE_TTL_DAYS = 30
+if 'CHECKPOINT_INTERVAL_SECONDS' not in globals():
+    CHECKPOINT_INTERVAL_SECONDS = 60
+if 'MISS_RETRY_BASE_DAYS' not in globals():
+    MISS_RETRY_BASE_DAYS = 1
+if 'MISS_RETRY_MAX_DAYS' not in globals():
+    MISS_RETRY_MAX_DAYS = 32
+if 'PROCESSED_SKIP_DAYS' not in globals():
+    PROCESSED_SKIP_DAYS = 7
+if 'HTTP_POOL_MAXSIZE' not in globals():
+    HTTP_POOL_MAXSIZE = 10
+if 'PIPELINE_QUEUE_SIZE' not in globals():
+    PIPELINE_QUEUE_SIZE = 100
+if 'PIPELINE_LASTFM_WORKERS' not in globals():
+    PIPELINE_LASTFM_WORKERS = 2
+if 'PIPELINE_MBZ_WORKERS' not in globals():
+    PIPELINE_MBZ_WORKERS = 2
+if 'PIPELINE_SERVICE_WORKERS' not in globals():
+    PIPELINE_SERVICE_WORKERS = 2
+if 'SYNC_ENGINE' not in globals():
+    SYNC_ENGINE = "threads"
+if 'ASYNC_STAGE_TASKS' not in globals():
+    ASYNC_STAGE_TASKS = 8
+if 'ENQUEUE_PACE_SECONDS' not in globals():
+    ENQUEUE_PACE_SECONDS = 5
+if 'ENQUEUE_MAX_FAILURES' not in globals():
+    ENQUEUE_MAX_FAILURES = 3
+if 'ENQUEUE_MAX_PER_RUN' not in globals():
+    ENQUEUE_MAX_PER_RUN = 0
+if 'DAEMON_INTERVAL_MINUTES' not in globals():
+    DAEMON_INTERVAL_MINUTES = 1440
+if 'DAEMON_CRON' not in globals():
+    DAEMON_CRON = None
+if 'DAEMON_RUN_ON_START' not in globals():
+    DAEMON_RUN_ON_START = True
+if 'RUN_LOCK_MODE' not in globals():
+    RUN_LOCK_MODE = "wait"
+if 'RUN_LOCK_TIMEOUT' not in globals():
+    RUN_LOCK_TIMEOUT = 3600
+if 'ALBUM_FILTER_ENABLED' not in globals():
+    ALBUM_FILTER_ENABLED = True
+if 'ALBUM_FILTER_FP_RATE' not in globals():
+    ALBUM_FILTER_FP_RATE = 0.01
+if 'ALBUM_FILTER_CAPACITY' not in globals():
+    ALBUM_FILTER_CAPACITY = 200000
+if 'ALBUM_FILTER_REFRESH_HOURS' not in globals():
+    ALBUM_FILTER_REFRESH_HOURS = 24
 if 'DEBUG_PRINT' not in globals():
     DEBUG_PRINT = True
 if 'MUSIC_SERVICE' not in globals():
     MUSIC_SERVICE = "headphones"
+if 'SIMILAR_RANKING' not in globals():
+    SIMILAR_RANKING = "seed"
+if 'SIMILAR_RANKING_BUDGET' not in globals():
+    SIMILAR_RANKING_BUDGET = None
+if 'SIMILAR_GRAPH_DEPTH' not in globals():
+    SIMILAR_GRAPH_DEPTH = 1
+if 'SIMILAR_GRAPH_DECAY' not in globals():
+    SIMILAR_GRAPH_DECAY = 0.5
+if 'SIMILAR_GRAPH_FANOUT' not in globals():
+    SIMILAR_GRAPH_FANOUT = 10
 
 BAD_SEC = {
     "Compilation", "Live", "Remix", "Soundtrack", "DJ-Mix",
@@ -54,28 +124,57 @@ BAD_SEC = {
 from pathlib import Path
 from datetime import datetime, timedelta
 from collections import defaultdict
-import json, logging, os, sys, time, urllib.parse, requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import asyncio, logging, os, signal, sys, threading, time, urllib.parse, requests
 
 # Import nuovo service layer
-from services import MusicServiceFactory, ArtistInfo, AlbumInfo, ServiceError, ConfigurationError
+from services import MusicServiceFactory, ArtistInfo, AlbumInfo, ServiceError, ConfigurationError, NotFoundError
+from utils.ranking import rank_candidates
+from utils.similar_graph import SimilarGraph
+from utils.cache_store import CacheStore
+from utils.packed_set import PackedUUIDSet
+from utils.bloom import BloomFilter
+from utils.checkpoint import SyncCheckpoint
+from utils.locking import FileLock
+from utils import json_codec
+from utils.transport import HTTPTransport, set_transport
+from utils import async_transport
+from utils.rate_limit import TokenBucket
+from utils.single_flight import SingleFlight, freeze
+from utils.pipeline import Pipeline, AsyncPipeline, Stage
+from utils.miss_ledger import MissLedger
+from utils.processed_ledger import ProcessedLedger
+from utils.candidate_queue import CandidateQueue
+from utils.cache_bundle import export_bundle, import_bundle, BundleError
+from utils.schedule import create_schedule, ScheduleError
 
 SCRIPT_DIR = Path(__file__).resolve().parent
-CACHE_FILE = SCRIPT_DIR / "lastfm_similar_cache.json"
+CACHE_FILE = SCRIPT_DIR / "lastfm_similar_cache.json"  # Cache legacy (importata in CACHE_DB)
+CACHE_DB = SCRIPT_DIR / "lastfm_cache.db"
+ADDED_ALBUMS_FILE = SCRIPT_DIR / "added_albums.bin"
+ALBUM_FILTER_FILE = SCRIPT_DIR / "album_filter.bin"
+RUN_LOCK_FILE = SCRIPT_DIR / "discovery.lock"
+ENQUEUE_LOCK_FILE = SCRIPT_DIR / "enqueue.lock"
 LOG_DIR = SCRIPT_DIR / "log"
 LOG_FILE = LOG_DIR / "discover.log"
 
 # ─────────────────── LOGGER ───────────────────
-# Assicura che la directory di log esista
-LOG_DIR.mkdir(exist_ok=True)
-
-logging.basicConfig(
-    format="%(asctime)s  %(levelname)-8s  %(message)s",
-    level=logging.DEBUG,
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(LOG_FILE)
-    ],
-)
+def setup_logging():
+    """Log su stdout e su LOG_FILE: configurato all'avvio, l'import del modulo non crea file"""
+    # Assicura che la directory di log esista
+    LOG_DIR.mkdir(exist_ok=True)
+    
+    logging.basicConfig(
+        format="%(asctime)s  %(levelname)-8s  %(message)s",
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler(LOG_FILE)
+        ],
+    )
+
 log = logging.getLogger("lfm2hp")
 
 # Riduci verbosità dei logger di requests per evitare duplicazione
@@ -86,40 +185,59 @@ def dprint(msg):
     if DEBUG_PRINT:
         print(f"[DEBUG] {msg}")
 
-# ──────────── RATE LIMIT WRAPPERS ────────────
-def rate_limited(delay):
-    def decorator(fn):
-        last = 0
-        def wrapped(*args, **kwargs):
-            nonlocal last
-            wait = delay - (time.time() - last)
-            if wait > 0:
-                dprint(f"sleep {wait:.2f}s ({fn.__name__})")
-                time.sleep(wait)
-            result = fn(*args, **kwargs)
-            last = time.time()
-            return result
-        return wrapped
-    return decorator
-
-@rate_limited(REQUEST_LIMIT)
-def lf_request(method, **params):
-    # Last.fm API call con gestione retry robusta
+_stats_lock = threading.Lock()
+
+def count(stats, key, n=1):
+    """Incremento di un contatore condiviso fra i worker della pipeline"""
+    with _stats_lock:
+        stats[key] += n
+
+# ──────────── HTTP TRANSPORT ────────────
+# Una session keep-alive per host, condivisa da Last.fm, MusicBrainz, servizi e updater
+http_transport = HTTPTransport(pool_maxsize=HTTP_POOL_MAXSIZE)
+set_transport(http_transport)
+# Controparte asyncio (aiohttp, opzionale) usata da SYNC_ENGINE = "asyncio"
+async_http = async_transport.AsyncHTTPTransport(pool_maxsize=HTTP_POOL_MAXSIZE)
+
+# ──────────── RATE LIMIT ────────────
+# Un token bucket per backend, condiviso fra thread, task asyncio e retry
+lastfm_bucket = TokenBucket(REQUEST_LIMIT, LASTFM_BURST)
+mbz_bucket = TokenBucket(MBZ_DELAY, MBZ_BURST)
+
+# Richieste identiche nello stesso run: una sola chiamata in volo, risultato in memo
+api_flight = SingleFlight()
+
+def throttle(bucket, label):
+    """Attende un token del bucket prima di ogni tentativo di chiamata"""
+    wait = bucket.acquire()
+    if wait > 0:
+        dprint(f"sleep {wait:.2f}s ({label})")
+
+def lf_params(method, params):
+    """Parametri di una chiamata Last.fm (from_/to_ → from/to, chiave API, formato)"""
     for alt, real in (("from_", "from"), ("to_", "to")):
         if alt in params:
             params[real] = params.pop(alt)
-    
+    return params | {"method": method, "api_key": LASTFM_API_KEY, "format": "json"}
+
+def lf_request(method, **params):
+    """Last.fm API call; richieste identiche nel run condividono la stessa chiamata"""
+    return api_flight.do(("lastfm", method, freeze(params)), lambda: _lf_request(method, **params))
+
+def _lf_request(method, **params):
+    # Last.fm API call con gestione retry robusta
     base = "https://ws.audioscrobbler.com/2.0/"
-    params |= {"method": method, "api_key": LASTFM_API_KEY, "format": "json"}
+    params = lf_params(method, params)
     
     # Configurazione retry
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
+        throttle(lastfm_bucket, "lf_request")
         try:
             dprint(f"LF  → {base}?{urllib.parse.urlencode(params)} (tentativo {attempt+1}/{max_retries})")
-            r = requests.get(base, params=params, timeout=15)
+            r = http_transport.get(base, params=params, timeout=15)
             dprint(f"LF  ← {r.status_code}")
             
             # Rate limiting
@@ -139,7 +257,7 @@ def lf_request(method, **params):
                     return None
             
             try:
-                return r.json()
+                return json_codec.response_json(r)
             except:
                 if attempt < max_retries - 1:
                     log.warning(f"Last.fm invalid JSON, tentativo {attempt+1}/{max_retries}")
@@ -167,8 +285,11 @@ def lf_request(method, **params):
     
     return None
 
-@rate_limited(MBZ_DELAY)
 def mbz_request(path, **params):
+    """MusicBrainz API call; richieste identiche nel run condividono la stessa chiamata"""
+    return api_flight.do(("mbz", path, freeze(params)), lambda: _mbz_request(path, **params))
+
+def _mbz_request(path, **params):
     # MusicBrainz API call con gestione retry robusta
     base = "https://musicbrainz.org/ws/2/"
     params.setdefault("fmt", "json")
@@ -180,9 +301,10 @@ def mbz_request(path, **params):
     retry_delay = 2  # secondi
     
     for attempt in range(max_retries):
+        throttle(mbz_bucket, "mbz_request")
         try:
             dprint(f"MBZ → {base}{path}?{urllib.parse.urlencode(params)} (tentativo {attempt+1}/{max_retries})")
-            r = requests.get(
+            r = http_transport.get(
                 base + path, params=params, headers=headers, timeout=30
             )
             dprint(f"MBZ ← {r.status_code}")
@@ -204,7 +326,7 @@ def mbz_request(path, **params):
                     return None
                     
             try:
-                return r.json()
+                return json_codec.response_json(r)
             except:
                 if attempt < max_retries - 1:
                     log.warning(f"MusicBrainz invalid JSON, tentativo {attempt+1}/{max_retries}")
@@ -232,61 +354,338 @@ def mbz_request(path, **params):
     
     return None
 
-# ────────────── CORE FUNCTIONS (IDENTICHE) ──────────────
-def load_cache():
-    """Carica cache da file JSON"""
-    try:
-        with open(CACHE_FILE, "r") as f:
-            cache = json.load(f)
+# ──────────── ASYNC API (SYNC_ENGINE = "asyncio") ────────────
+async def api_request_async(label, bucket, url, params, headers=None, timeout=30):
+    """
+    Chiamata API asincrona con la stessa politica di retry di lf_request/mbz_request
+    (3 tentativi, Retry-After su 429, backoff lineare). Il token bucket è
+    condiviso con le chiamate bloccanti dello stesso backend.
+    """
+    max_retries = 3
+    retry_delay = 2
+    
+    for attempt in range(max_retries):
+        wait = await bucket.acquire_async()
+        if wait > 0:
+            dprint(f"sleep {wait:.2f}s ({label} async)")
+        try:
+            dprint(f"{label} → {url}?{urllib.parse.urlencode(params)} (async, tentativo {attempt+1}/{max_retries})")
+            r = await async_http.get(url, params=params, headers=headers, timeout=timeout)
+            dprint(f"{label} ← {r.status_code}")
             
-        # Assicura che added_albums sia un set
-        if "added_albums" in cache and isinstance(cache["added_albums"], list):
-            cache["added_albums"] = set(cache["added_albums"])
-        elif "added_albums" not in cache:
-            cache["added_albums"] = set()
+            if r.status_code == 429 and attempt < max_retries - 1:
+                wait_time = int(r.headers.get('Retry-After', retry_delay * 2))
+                log.warning(f"Rate limit {label}, attendo {wait_time}s")
+                await asyncio.sleep(wait_time)
+                continue
             
-        return cache
-    except:
-        return {"similar_cache": {}, "added_albums": set()}
+            if r.status_code != 200:
+                if attempt < max_retries - 1:
+                    log.warning(f"{label} HTTP {r.status_code}, tentativo {attempt+1}/{max_retries}")
+                    await asyncio.sleep(retry_delay * (attempt + 1))
+                    continue
+                log.warning(f"{label} HTTP {r.status_code}: {r.text[:200]}")
+                return None
+            
+            try:
+                return json_codec.response_json(r)
+            except json_codec.JSONDecodeError:
+                if attempt < max_retries - 1:
+                    log.warning(f"{label} invalid JSON, tentativo {attempt+1}/{max_retries}")
+                    await asyncio.sleep(retry_delay)
+                    continue
+                log.warning(f"{label} invalid JSON: {r.text[:200]}")
+                return None
+        
+        except (TimeoutError, ConnectionError) as e:
+            if attempt < max_retries - 1:
+                log.warning(f"{label} connection error: {e}, tentativo {attempt+1}/{max_retries}")
+                await asyncio.sleep(retry_delay * (attempt + 1))
+                continue
+            log.error(f"{label} connection failed dopo {max_retries} tentativi: {e}")
+            return None
+        except Exception as e:
+            if attempt < max_retries - 1:
+                log.warning(f"{label} error: {e}, tentativo {attempt+1}/{max_retries}")
+                await asyncio.sleep(retry_delay * (attempt + 1))
+            else:
+                log.error(f"{label} error dopo {max_retries} tentativi: {e}")
+                return None
+    
+    return None
 
-def save_cache(cache):
-    """Salva cache su file JSON con gestione memory efficiente"""
+async def lf_request_async(method, **params):
+    """Versione asincrona di lf_request (stesso single-flight)"""
+    return await api_flight.do_async(
+        ("lastfm", method, freeze(params)),
+        lambda: api_request_async("Last.fm", lastfm_bucket, "https://ws.audioscrobbler.com/2.0/",
+                                  lf_params(method, dict(params)), timeout=15)
+    )
+
+async def mbz_request_async(path, **params):
+    """Versione asincrona di mbz_request (stesso single-flight)"""
+    key = ("mbz", path, freeze(params))
+    params.setdefault("fmt", "json")
+    headers = {"User-Agent": "DiscoveryLastFM/2.0.0 ( mrroboto@example.com )"}
+    return await api_flight.do_async(
+        key,
+        lambda: api_request_async("MusicBrainz", mbz_bucket, "https://musicbrainz.org/ws/2/" + path,
+                                  params, headers, timeout=30)
+    )
+
+# ────────────── CORE FUNCTIONS (IDENTICHE) ──────────────
+_cache_store = None
+_added_albums = None
+
+def load_cache():
+    """
+    Apre la cache SQLite e il set added_albums (una sola volta per processo).
+    Al primo avvio importa automaticamente lastfm_similar_cache.json.
+    """
+    global _cache_store, _added_albums
+    if _cache_store is None:
+        _cache_store = CacheStore(CACHE_DB)
+        if CACHE_FILE.exists():
+            import_legacy_cache(_cache_store)
+    if _added_albums is None:
+        _added_albums = PackedUUIDSet(ADDED_ALBUMS_FILE)
+        if _cache_store.get_meta("added_albums_backend") != "packed":
+            migrate_added_albums(_cache_store, _added_albums)
+    return {
+        "similar_cache": _cache_store.similar_cache,
+        "added_albums": _added_albums,
+        "store": _cache_store,
+    }
+
+def migrate_added_albums(store, packed):
+    """Sposta added_albums dalla tabella SQLite al set impaccato (one-time)"""
+    count = len(store.added_albums)
+    packed.update(store.added_albums)
+    store.added_albums.clear()
+    store.set_meta("added_albums_backend", "packed")
+    if count:
+        log.info(f"added_albums migrati in {ADDED_ALBUMS_FILE.name}: {count} album")
+
+def import_legacy_cache(store):
+    """Importa la cache JSON v1.x/v2.x nello store SQLite e la archivia"""
     try:
-        # Converte set in list per JSON senza duplicare memoria
-        cache_to_save = {}
-        for key, value in cache.items():
-            if key == "added_albums" and isinstance(value, set):
-                cache_to_save[key] = list(value)
-            else:
-                cache_to_save[key] = value
-        
-        # Salva in file temporaneo poi rinomina per atomicità
-        temp_file = CACHE_FILE.with_suffix('.tmp')
-        with open(temp_file, "w") as f:
-            json.dump(cache_to_save, f, indent=2, separators=(',', ':'))
+        with open(CACHE_FILE, "rb") as f:
+            cache = json_codec.loads(f.read())
         
-        # Rinomina atomicamente
-        temp_file.replace(CACHE_FILE)
+        cache.setdefault("similar_cache", {})
+        if cache.get("similar_format") != SIMILAR_CACHE_FORMAT:
+            migrate_similar_cache(cache)
         
+        store.import_legacy(cache["similar_cache"], cache.get("added_albums", []))
+        CACHE_FILE.replace(CACHE_FILE.with_suffix(".json.migrated"))
+        log.info(f"Cache JSON importata in {CACHE_DB.name}: "
+                 f"{len(cache['similar_cache'])} artisti simili, {len(cache.get('added_albums', []))} album")
+    except Exception as e:
+        log.error(f"Import cache JSON legacy fallito: {e}")
+
+def migrate_similar_cache(cache):
+    """Migrazione one-time delle entry similar_cache v1.x (raw Last.fm) al formato compatto"""
+    migrated = 0
+    for entry in cache["similar_cache"].values():
+        data = entry.get("data", [])
+        if data and isinstance(data[0], dict):
+            entry["data"] = compact_similars(data)
+            migrated += 1
+    cache["similar_format"] = SIMILAR_CACHE_FORMAT
+    log.info(f"Cache similar_cache migrata al formato compatto ({migrated} entry)")
+
+def save_cache(cache):
+    """
+    Le scritture sono già incrementali: compatta similar_cache (TTL + LRU),
+    fonde il log di added_albums nel file ordinato e riporta il WAL nel
+    database principale. Sicuro con più processi: le righe SQLite sono
+    upsert per chiave, added_albums e album filter vengono uniti sotto file
+    lock allo stato su disco invece di sovrascriverlo.
+    """
+    try:
+        evicted = cache["store"].compact_similar(
+            SIMILAR_CACHE_MAX_STALE_HOURS * 3600, SIMILAR_CACHE_MAX_ENTRIES, SIMILAR_CACHE_MAX_BYTES
+        )
+        if evicted["evicted"]:
+            log.info(f"Compattazione similar_cache: {evicted['evicted']} entry rimosse, "
+                     f"{evicted['bytes_saved'] / 1024:.1f} KB liberati")
+        cache["added_albums"].merge()
+        cache["store"].flush()
+        if _album_filter is not None:
+            _album_filter.save(ALBUM_FILTER_FILE)
     except Exception as e:
         log.error(f"Errore salvataggio cache: {e}")
-        # Cleanup temp file se esiste
-        if 'temp_file' in locals() and temp_file.exists():
-            temp_file.unlink()
 
-def recent_artists():
-    """Ottiene artisti ascoltati di recente con gestione memoria ottimizzata"""
+# ────────────── ALBUM EXISTENCE FILTER ──────────────
+_album_filter = None
+album_filter_stats = {"checks": 0, "definite_negatives": 0, "confirmed_positives": 0,
+                      "false_positives": 0, "network_checks": 0}
+
+def load_album_filter(music_service, added_albums):
+    """
+    Carica il Bloom filter degli album in libreria. Ogni ALBUM_FILTER_REFRESH_HOURS
+    (o se saturo, o se un run precedente ha creato artisti) viene ricostruito da
+    added_albums + snapshot della libreria.
+    """
+    global _album_filter
+    if not ALBUM_FILTER_ENABLED:
+        _album_filter = None
+        return None
+    
+    bloom = _album_filter or BloomFilter.load(ALBUM_FILTER_FILE, ALBUM_FILTER_CAPACITY, ALBUM_FILTER_FP_RATE)
+    if bloom.age_hours() > ALBUM_FILTER_REFRESH_HOURS or bloom.saturated:
+        library_ids = music_service.get_library_album_ids()
+        if library_ids is not None:
+            bloom = BloomFilter(ALBUM_FILTER_CAPACITY, ALBUM_FILTER_FP_RATE)
+            bloom.update(added_albums)
+            bloom.update(library_ids)
+            bloom.snapshot_ts = time.time()
+            log.info(f"Album filter ricostruito: {bloom.count} album (libreria {len(library_ids)})")
+            if bloom.saturated:
+                log.warning(f"Album filter oltre la capacità ({bloom.count} > {ALBUM_FILTER_CAPACITY}): "
+                            f"aumentare ALBUM_FILTER_CAPACITY")
+        elif bloom.stale:
+            # Snapshot superato da artisti creati in un run precedente: i "no" non sono più certi
+            bloom.snapshot_ts = 0.0
+        elif bloom.count == 0:
+            # Senza snapshot il filtro non copre la libreria: i "no" non saltano la rete
+            bloom.update(added_albums)
+    
+    _album_filter = bloom
+    return bloom
+
+def album_in_library(music_service, mbid, added_albums, artist_mbid=None):
+    """
+    Esistenza album: added_albums (esatto) → Bloom filter → controllo servizio.
+    Con un filtro costruito dallo snapshot della libreria un "no" è definitivo
+    e il controllo di rete viene saltato; un "sì" è confermato dal servizio.
+    Gli album di un artista creato in questo run (artist_mbid) non sono nello
+    snapshot: per loro il "no" va sempre confermato dal servizio.
+    """
+    if mbid in added_albums:
+        return True
+    
+    bloom = _album_filter
+    count(album_filter_stats, "checks")
+    maybe_present = bloom is not None and mbid in bloom
+    trusted = bloom is not None and bloom.snapshot_ts and \
+        not (artist_mbid and music_service.artist_created(artist_mbid))
+    if trusted and not maybe_present:
+        count(album_filter_stats, "definite_negatives")
+        return False
+    
+    count(album_filter_stats, "network_checks")
+    exists = music_service.album_exists(mbid, added_albums)
+    if exists:
+        if maybe_present:
+            count(album_filter_stats, "confirmed_positives")
+        if bloom is not None:
+            bloom.add(mbid)
+    elif maybe_present:
+        count(album_filter_stats, "false_positives")
+    return exists
+
+# Namespace dei lookup indipendenti dall'utente (esportati nei bundle cache)
+SHARED_LOOKUP_NAMESPACES = ("lastfm_artist_mbid", "mbz_release_rg", "mbz_rg_studio")
+
+def cached_lookup(namespace, key, fetch):
+    """Lookup con cache persistente (MusicBrainz, name→MBID); None non viene salvato"""
+    if _cache_store is None:
+        return fetch()
+    value = _cache_store.get_lookup(namespace, key, LOOKUP_CACHE_TTL_DAYS * 86400)
+    if value is not None:
+        return value
+    value = fetch()
+    if value is not None:
+        _cache_store.set_lookup(namespace, key, value)
+    return value
+
+async def cached_lookup_async(namespace, key, fetch):
+    """cached_lookup con fetch asincrono (fetch() ritorna una coroutine)"""
+    if _cache_store is None:
+        return await fetch()
+    value = _cache_store.get_lookup(namespace, key, LOOKUP_CACHE_TTL_DAYS * 86400)
+    if value is not None:
+        return value
+    value = await fetch()
+    if value is not None:
+        _cache_store.set_lookup(namespace, key, value)
+    return value
+
+@dataclass
+class LastfmUser:
+    """Utente Last.fm della sync con le proprie soglie di selezione dei seed"""
+    username: str
+    min_plays: int
+    recent_months: int
+
+def lastfm_users():
+    """
+    Utenti della sync: LASTFM_USERS (nomi o dict con username e, opzionali,
+    min_plays/recent_months) oppure il solo LASTFM_USERNAME
+    """
+    users = []
+    for entry in LASTFM_USERS or [LASTFM_USERNAME]:
+        if isinstance(entry, str):
+            entry = {"username": entry}
+        users.append(LastfmUser(entry["username"], entry.get("min_plays", MIN_PLAYS),
+                                entry.get("recent_months", RECENT_MONTHS)))
+    return users
+
+def recent_window(user):
+    """Finestra (from, to) degli ascolti considerati: ultimi recent_months mesi"""
     end = int(time.time())
-    start = end - (RECENT_MONTHS * 30 * 24 * 3600)
+    return end - (user.recent_months * 30 * 24 * 3600), end
+
+def recent_tracks_page(user, window, page):
+    """Una pagina di user.getRecentTracks (condivisa con il memo del run)"""
+    start, end = window
+    return lf_request("user.getRecentTracks", user=user.username, from_=start, to_=end, limit=200, page=page)
+
+def iter_seed_artists(users, windows, play_counts):
+    """
+    Seed di tutti gli utenti, uno dopo l'altro. Un artista in comune fra più
+    utenti viene emesso una sola volta; play_counts riceve la somma degli
+    ascolti di tutti gli utenti (pesi del ranking globale).
+    """
+    emitted = set()
+    for user in users:
+        if len(users) > 1:
+            log.info(f"Ascolti di {user.username} (≥{user.min_plays} plays, {user.recent_months} mesi)")
+        user_counts = {}
+        for name, mbid, _plays in iter_recent_artists(user_counts, windows[user.username], user):
+            if mbid and mbid not in emitted:
+                emitted.add(mbid)
+                yield name, mbid
+        for name, plays in user_counts.items():
+            play_counts[name] = play_counts.get(name, 0) + plays
+
+def iter_recent_artists(play_counts=None, window=None, user=None):
+    """
+    Generatore di artisti seed ascoltati di recente.
+    Un artista viene emesso appena raggiunge MIN_PLAYS durante la paginazione
+    (i conteggi possono solo crescere), così il resto della sync può partire
+    prima che tutte le pagine siano state scaricate.
+    Emette tuple (name, mbid, plays) con plays al momento della qualifica;
+    se play_counts è un dict, viene aggiornato con i conteggi completi.
+    user è un LastfmUser (default: il primo di lastfm_users()), window la sua
+    finestra di recent_window() (default: calcolata ora).
+    """
+    user = user or lastfm_users()[0]
+    window = window or recent_window(user)
     
     # Gestione paginazione per grandi dataset
     artist_plays = defaultdict(int)
+    if play_counts is not None:
+        artist_plays = play_counts
     page = 1
     total_pages = 1
     processed_tracks = 0
+    qualified = 0
+    resolved = 0
     
     while page <= total_pages and page <= 10:  # Max 10 pagine per sicurezza
-        js = lf_request("user.getRecentTracks", user=LASTFM_USERNAME, from_=start, to_=end, limit=200, page=page)
+        js = recent_tracks_page(user, window, page)
         if not js:
             break
             
@@ -299,64 +698,148 @@ def recent_artists():
             total_pages = min(int(attr.get("totalPages", 1)), 10)  # Limite pagine
             log.info(f"Processing {attr.get('total', 0)} recent tracks across {total_pages} pages")
         
-        # Processa tracks della pagina corrente
+        # Processa tracks della pagina corrente, raccogliendo i nuovi qualificati
+        newly_qualified = []
         for t in tracks:
             if isinstance(t, dict):
                 artist = t.get("artist", {})
                 name = artist.get("#text", "") if isinstance(artist, dict) else str(artist)
                 if name:
-                    artist_plays[name] += 1
+                    artist_plays[name] = artist_plays.get(name, 0) + 1
                     processed_tracks += 1
+                    if artist_plays[name] == user.min_plays:
+                        newly_qualified.append(name)
         
         page += 1
-    
-    log.info(f"Processed {processed_tracks} tracks from {len(artist_plays)} unique artists")
-    
-    # Filtro e ottieni MBID per artisti con abbastanza plays
-    result = []
-    qualifying_artists = [(name, plays) for name, plays in artist_plays.items() if plays >= MIN_PLAYS]
-    log.info(f"Found {len(qualifying_artists)} artists with ≥{MIN_PLAYS} plays")
-    
-    for name, plays in qualifying_artists:
-        js = lf_request("artist.getInfo", artist=name)
-        if js:
-            mbid = js.get("artist", {}).get("mbid")
+        
+        # Risoluzione MBID ed emissione immediata dei nuovi qualificati
+        for name in newly_qualified:
+            qualified += 1
+            mbid = cached_lookup("lastfm_artist_mbid", name, lambda: artist_mbid(name))
             if mbid:
-                result.append((name, mbid))
-                log.debug(f"Artist {name}: {plays} plays, MBID: {mbid}")
+                resolved += 1
+                log.debug(f"Artist {name}: ≥{user.min_plays} plays (page {page - 1}), MBID: {mbid}")
+                yield name, mbid, artist_plays[name]
     
-    log.info(f"Final result: {len(result)} artists with valid MBIDs")
-    return result
+    log.info(f"Processed {processed_tracks} tracks from {len(artist_plays)} unique artists")
+    log.info(f"Found {qualified} artists with ≥{user.min_plays} plays")
+    log.info(f"Final result: {resolved} artists with valid MBIDs")
+
+def artist_mbid(name):
+    """Risolve nome → MBID via artist.getInfo ("" se Last.fm non ha un MBID)"""
+    js = lf_request("artist.getInfo", artist=name)
+    if not js:
+        return None
+    return js.get("artist", {}).get("mbid") or ""
+
+def recent_artists():
+    """Ottiene artisti ascoltati di recente con gestione memoria ottimizzata"""
+    return [(name, mbid) for name, mbid, _plays in iter_recent_artists()]
+
+# ────────────── SIMILAR CACHE (STALE-WHILE-REVALIDATE) ──────────────
+_similar_refresh_executor = None
+_similar_refresh_pending = {}
+
+SIMILAR_CACHE_FORMAT = "compact-v1"
+
+def compact_similars(raw):
+    """
+    Riduce la lista similarartists.artist di Last.fm a tuple [mbid, name, match].
+    Image, url e streamable non vengono mai letti; artisti senza MBID vengono scartati.
+    """
+    return [
+        [a["mbid"], a.get("name", "Sconosciuto"), round(float(a.get("match", 0)), 4)]
+        for a in raw if a.get("mbid")
+    ]
+
+def fetch_similars(aid):
+    """Scarica artisti simili da Last.fm (artist.getSimilar) in formato compatto"""
+    js = lf_request("artist.getSimilar", mbid=aid, limit=50)
+    return compact_similars(js.get("similarartists", {}).get("artist", [])) if js else []
+
+def store_similars(cache, aid, sims):
+    """Salva in cache solo se abbiamo dati validi"""
+    if sims:
+        cache["similar_cache"][aid] = {"ts": time.time(), "data": sims}
+
+def _refresh_similars(cache, aid):
+    """Worker di refresh in background per una entry scaduta"""
+    try:
+        store_similars(cache, aid, fetch_similars(aid))
+        dprint(f"Cache simili aggiornata in background per {aid}")
+    except Exception as e:
+        log.warning(f"Background refresh similar artists failed for {aid}: {e}")
+
+def schedule_similar_refresh(cache, aid):
+    """Accoda il refresh di una entry (un solo refresh in corso per artista)"""
+    global _similar_refresh_executor
+    if aid in _similar_refresh_pending:
+        return
+    if _similar_refresh_executor is None:
+        _similar_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="similar-refresh")
+    _similar_refresh_pending[aid] = _similar_refresh_executor.submit(_refresh_similars, cache, aid)
+
+def wait_similar_refreshes():
+    """Attende i refresh in background ancora in corso (prima del salvataggio)"""
+    global _similar_refresh_executor
+    if _similar_refresh_executor is None:
+        return
+    if _similar_refresh_pending:
+        log.info(f"Attendo {len(_similar_refresh_pending)} refresh artisti simili in background...")
+    _similar_refresh_executor.shutdown(wait=True)
+    _similar_refresh_executor = None
+    _similar_refresh_pending.clear()
 
 def cached_similars(cache, aid):
-    """Controlla cache artisti simili con TTL - IDENTICA"""
+    """
+    Controlla cache artisti simili con TTL in modalità stale-while-revalidate.
+    Entry oltre CACHE_TTL_HOURS vengono servite subito e aggiornate in background;
+    oltre SIMILAR_CACHE_MAX_STALE_HOURS ritorna None e forza un refresh sincrono.
+    """
     if aid not in cache["similar_cache"]:
         return None
     
     entry = cache["similar_cache"][aid]
     age_hours = (time.time() - entry["ts"]) / 3600
     
-    if age_hours > CACHE_TTL_HOURS:
-        dprint(f"Cache scaduta per {aid} ({age_hours:.1f}h)")
+    if age_hours > SIMILAR_CACHE_MAX_STALE_HOURS:
+        dprint(f"Cache scaduta per {aid} ({age_hours:.1f}h), refresh sincrono")
         return None
     
+    if age_hours > CACHE_TTL_HOURS:
+        dprint(f"Cache stale per {aid} ({age_hours:.1f}h), refresh in background")
+        schedule_similar_refresh(cache, aid)
+    
     return entry["data"]
 
 def top_albums(artist_mbid):
     """Ottiene album popolari filtrati - IDENTICA"""
     js = lf_request("artist.getTopAlbums", mbid=artist_mbid, limit=MAX_POP_ALBUMS*2)
+    return top_album_ids(js)
+
+def top_album_ids(js):
+    """MBID dei primi MAX_POP_ALBUMS album di una risposta artist.getTopAlbums"""
     if not js:
         return []
     
     albums = js.get("topalbums", {}).get("album", [])
     return [a.get("mbid") for a in albums if a.get("mbid")][:MAX_POP_ALBUMS]
 
+def top_album_titles(js):
+    """Titoli per MBID di una risposta artist.getTopAlbums"""
+    albums_raw = js.get("topalbums", {}).get("album", []) if js else []
+    return {a.get("mbid"): a.get("name") for a in albums_raw if a.get("mbid")}
+
 def release_to_rg(rel_id):
     """Converte Release ID in Release Group ID - IDENTICA"""
     if not rel_id:
         return None
-    
-    js = mbz_request(f"release/{rel_id}", inc="release-groups")
+    return cached_lookup("mbz_release_rg", rel_id, lambda: _fetch_release_rg(rel_id))
+
+def _fetch_release_rg(rel_id):
+    return _release_rg(mbz_request(f"release/{rel_id}", inc="release-groups"))
+
+def _release_rg(js):
     if js and "release-group" in js:
         return js["release-group"]["id"]
     return None
@@ -365,8 +848,12 @@ def is_studio_rg(rg_id):
     """Verifica se è album studio - IDENTICA"""
     if not rg_id:
         return None
-    
-    js = mbz_request(f"release-group/{rg_id}")
+    return cached_lookup("mbz_rg_studio", rg_id, lambda: _fetch_rg_studio(rg_id))
+
+def _fetch_rg_studio(rg_id):
+    return _rg_studio(mbz_request(f"release-group/{rg_id}"))
+
+def _rg_studio(js):
     if not js:
         return None
     
@@ -382,20 +869,58 @@ def is_studio_rg(rg_id):
     
     return True
 
+async def release_to_rg_async(rel_id):
+    """Versione asincrona di release_to_rg (stessa cache)"""
+    if not rel_id:
+        return None
+    return await cached_lookup_async(
+        "mbz_release_rg", rel_id,
+        lambda: _fetch_async(_release_rg, f"release/{rel_id}", inc="release-groups")
+    )
+
+async def is_studio_rg_async(rg_id):
+    """Versione asincrona di is_studio_rg (stessa cache)"""
+    if not rg_id:
+        return None
+    return await cached_lookup_async(
+        "mbz_rg_studio", rg_id, lambda: _fetch_async(_rg_studio, f"release-group/{rg_id}")
+    )
+
+async def _fetch_async(parse, path, **params):
+    return parse(await mbz_request_async(path, **params))
+
 # ────────────── MUSIC SERVICE INTEGRATION ──────────────
-def validate_configuration():
-    """Validazione estesa per tutti i servizi con checks dettagliati"""
+def validate_configuration(check_service=True):
+    """
+    Validazione estesa per tutti i servizi con checks dettagliati.
+    check_service=False salta la validazione del servizio (--discover-only).
+    """
     config_dict = {k: v for k, v in globals().items() if k.isupper()}
     service_type = config_dict.get("MUSIC_SERVICE", "headphones").lower()
     
     log.info("Starting configuration validation...")
     
     # Validazione parametri base
-    required_base = ["LASTFM_USERNAME", "LASTFM_API_KEY"]
+    required_base = ["LASTFM_API_KEY"] if config_dict.get("LASTFM_USERS") else ["LASTFM_USERNAME", "LASTFM_API_KEY"]
     missing_base = [k for k in required_base if not config_dict.get(k)]
     if missing_base:
         raise ConfigurationError(f"Missing base configuration: {missing_base}")
     
+    users = config_dict.get("LASTFM_USERS")
+    if users is not None:
+        if not isinstance(users, (list, tuple)) or not users:
+            raise ConfigurationError(f"LASTFM_USERS must be a non-empty list, got {users!r}")
+        for entry in users:
+            if isinstance(entry, str):
+                entry = {"username": entry}
+            if not isinstance(entry, dict) or not entry.get("username"):
+                raise ConfigurationError(f"LASTFM_USERS entries need a username, got {entry!r}")
+            for key, (min_val, max_val) in (("min_plays", (1, 1000)), ("recent_months", (1, 12))):
+                value = entry.get(key)
+                if value is not None and (not isinstance(value, int) or not min_val <= value <= max_val):
+                    raise ConfigurationError(f"LASTFM_USERS {entry['username']}: {key} must be between "
+                                             f"{min_val} and {max_val}, got {value}")
+    
     # Validazione parametri numerici
     numeric_params = {
         "RECENT_MONTHS": (1, 12),
@@ -416,12 +941,74 @@ def validate_configuration():
     if request_limit <= 0 or request_limit > 10:
         raise ConfigurationError(f"REQUEST_LIMIT must be between 0 and 10, got {request_limit}")
     
+    max_stale = config_dict.get("SIMILAR_CACHE_MAX_STALE_HOURS", 168)
+    if max_stale < config_dict.get("CACHE_TTL_HOURS", 24):
+        raise ConfigurationError(f"SIMILAR_CACHE_MAX_STALE_HOURS must be >= CACHE_TTL_HOURS, got {max_stale}")
+    
+    depth = config_dict.get("SIMILAR_GRAPH_DEPTH", 1)
+    if depth not in (1, 2, 3):
+        raise ConfigurationError(f"SIMILAR_GRAPH_DEPTH must be 1, 2 or 3, got {depth}")
+    
+    decay = config_dict.get("SIMILAR_GRAPH_DECAY", 0.5)
+    if not 0 < decay <= 1:
+        raise ConfigurationError(f"SIMILAR_GRAPH_DECAY must be between 0 and 1, got {decay}")
+    
+    ranking = config_dict.get("SIMILAR_RANKING", "seed")
+    if ranking not in ("seed", "global"):
+        raise ConfigurationError(f"SIMILAR_RANKING must be 'seed' or 'global', got {ranking}")
+    
+    if config_dict.get("MISS_RETRY_MAX_DAYS", 32) < config_dict.get("MISS_RETRY_BASE_DAYS", 1):
+        raise ConfigurationError("MISS_RETRY_MAX_DAYS must be >= MISS_RETRY_BASE_DAYS")
+    
+    for param in ("PIPELINE_LASTFM_WORKERS", "PIPELINE_MBZ_WORKERS", "PIPELINE_SERVICE_WORKERS"):
+        workers = config_dict.get(param, 2)
+        if not isinstance(workers, int) or not 1 <= workers <= 16:
+            raise ConfigurationError(f"{param} must be between 1 and 16, got {workers}")
+    
+    engine = config_dict.get("SYNC_ENGINE", "threads")
+    if engine not in ("threads", "asyncio"):
+        raise ConfigurationError(f"SYNC_ENGINE must be 'threads' or 'asyncio', got {engine}")
+    
+    tasks = config_dict.get("ASYNC_STAGE_TASKS", 8)
+    if not isinstance(tasks, int) or not 1 <= tasks <= 64:
+        raise ConfigurationError(f"ASYNC_STAGE_TASKS must be between 1 and 64, got {tasks}")
+    
+    lock_mode = config_dict.get("RUN_LOCK_MODE", "wait")
+    if lock_mode not in ("wait", "skip"):
+        raise ConfigurationError(f"RUN_LOCK_MODE must be 'wait' or 'skip', got {lock_mode}")
+    
+    fp_rate = config_dict.get("ALBUM_FILTER_FP_RATE", 0.01)
+    if not 0 < fp_rate < 0.5:
+        raise ConfigurationError(f"ALBUM_FILTER_FP_RATE must be between 0 and 0.5, got {fp_rate}")
+    
     mbz_delay = config_dict.get("MBZ_DELAY", 1.1)
     if mbz_delay < 0.5 or mbz_delay > 10:
         raise ConfigurationError(f"MBZ_DELAY must be between 0.5 and 10, got {mbz_delay}")
     
+    for param, default in (("LASTFM_BURST", 5), ("MBZ_BURST", 1)):
+        burst = config_dict.get(param, default)
+        if not isinstance(burst, int) or not 1 <= burst <= 20:
+            raise ConfigurationError(f"{param} must be between 1 and 20, got {burst}")
+    
+    try:
+        create_schedule(config_dict.get("DAEMON_CRON"), config_dict.get("DAEMON_INTERVAL_MINUTES", 1440))
+    except ScheduleError as e:
+        raise ConfigurationError(f"Invalid daemon schedule: {e}")
+    
+    pace = config_dict.get("ENQUEUE_PACE_SECONDS", 5)
+    if pace < 0:
+        raise ConfigurationError(f"ENQUEUE_PACE_SECONDS must be >= 0, got {pace}")
+    
+    max_failures = config_dict.get("ENQUEUE_MAX_FAILURES", 3)
+    if not isinstance(max_failures, int) or max_failures < 1:
+        raise ConfigurationError(f"ENQUEUE_MAX_FAILURES must be an integer >= 1, got {max_failures}")
+    
+    max_enqueue = config_dict.get("ENQUEUE_MAX_PER_RUN", 0)
+    if not isinstance(max_enqueue, int) or max_enqueue < 0:
+        raise ConfigurationError(f"ENQUEUE_MAX_PER_RUN must be an integer >= 0, got {max_enqueue}")
+    
     # Validazione servizio specifico
-    if not MusicServiceFactory.validate_service_config(service_type, config_dict):
+    if check_service and not MusicServiceFactory.validate_service_config(service_type, config_dict):
         available = ", ".join(MusicServiceFactory.get_available_services())
         raise ConfigurationError(
             f"Invalid configuration for {service_type}. "
@@ -430,203 +1017,830 @@ def validate_configuration():
     
     log.info(f"Configuration validated successfully for {service_type}")
     log.info(f"- Discovery scope: {config_dict.get('RECENT_MONTHS', 3)} months, {config_dict.get('MIN_PLAYS', 20)} min plays")
-    log.info(f"- Rate limits: LastFM {request_limit}/s, MusicBrainz {mbz_delay}s delay")
+    if users:
+        log.info(f"- Last.fm users: {', '.join(u if isinstance(u, str) else u['username'] for u in users)}")
+    log.info(f"- Rate limits: LastFM {request_limit}s delay (burst {config_dict.get('LASTFM_BURST', 5)}), "
+             f"MusicBrainz {mbz_delay}s delay (burst {config_dict.get('MBZ_BURST', 1)})")
     log.info(f"- Processing limits: {config_dict.get('MAX_SIMILAR_PER_ART', 20)} similar artists, {config_dict.get('MAX_POP_ALBUMS', 5)} albums each")
 
-def sync():
-    """Sync function modificata per service abstraction"""
-    start_time = time.time()
+_music_service = None
+_keep_music_service = False  # modalità daemon: servizio creato una volta e riusato
+
+def get_music_service(service_type, config_dict):
+    """
+    Servizio musicale del run. In modalità daemon l'istanza (health check,
+    validazione profili, connessioni) viene creata una sola volta e riusata.
+    """
+    global _music_service
+    if _keep_music_service and _music_service is not None:
+        _music_service.begin_run()
+        _music_service.last_health = None  # info del servizio aggiornate a ogni run
+        return _music_service
+    service = MusicServiceFactory.create_service(service_type, config_dict, http_transport)
+    if _keep_music_service:
+        _music_service = service
+    return service
+
+def release_music_service(service):
+    """Fine run: chiude il servizio, salvo quello tenuto caldo dal daemon"""
+    if service is not None and service is not _music_service:
+        service.close()
+
+def drop_music_service():
+    """Chiude il servizio riusato dal daemon (ricreato al prossimo run)"""
+    global _music_service
+    if _music_service is not None:
+        _music_service.close()
+        _music_service = None
+
+# ────────────── MISS / PROCESSED LEDGER ──────────────
+_miss_ledger = None
+_processed_ledger = None
+
+def skip_known_miss(kind, mbid, label):
+    """True se l'MBID è nel ledger dei fallimenti e il backoff non è ancora scaduto"""
+    if _miss_ledger is None or not _miss_ledger.should_skip(kind, mbid):
+        return False
+    log.debug(f"Scarto {label} ({mbid}): non trovato/fallito di recente, in backoff")
+    return True
+
+def record_miss(kind, mbid, reason, label):
+    """Registra un fallimento nel ledger (backoff 1, 2, 4, ... giorni)"""
+    if _miss_ledger is None:
+        return
+    days = _miss_ledger.record(kind, mbid, reason)
+    if days:
+        log.info(f"{label} ({mbid}) {reason}: nuovo tentativo fra {days:g} giorni")
+
+def clear_miss(kind, mbid):
+    if _miss_ledger is not None:
+        _miss_ledger.clear(kind, mbid)
+
+def add_artist_checked(music_service, artist_info, stats, label="l'artista"):
+    """
+    Aggiunge e aggiorna un artista tramite service layer, aggiornando le statistiche.
+    Il ledger dei fallimenti va consultato prima (skip_known_miss).
+    Ritorna "added", "not_found" o "failed" (errore del servizio, da ritentare).
+    """
+    name, aid = artist_info.name, artist_info.mbid
+    try:
+        if not music_service.add_artist(artist_info):
+            log.error(f"Impossibile aggiungere {label} {name} ({aid})")
+            count(stats, "errors")
+            record_miss("artist", aid, "failed", name)
+            return "failed"
+    except NotFoundError as e:
+        log.warning(f"{e}")
+        record_miss("artist", aid, "not_found", name)
+        return "not_found"
+    except ServiceError as e:
+        log.error(f"Service error adding {label} {name}: {e}")
+        count(stats, "errors")
+        record_miss("artist", aid, "failed", name)
+        return "failed"
+    except Exception as e:
+        log.error(f"Unexpected error adding {label} {name}: {e}")
+        count(stats, "errors")
+        return "failed"
     
+    clear_miss("artist", aid)
+    if _album_filter is not None and music_service.artist_created(aid):
+        # Gli album del nuovo artista entrano in libreria senza passare dal filtro
+        _album_filter.stale = True
+    music_service.refresh_artist(aid)
+    return "added"
+
+def add_and_queue_album(music_service, album_info, added_albums, stats):
+    """
+    Aggiunge e accoda un album tramite service layer, aggiornando le statistiche.
+    Ritorna "added" (anche se la queue fallisce), "not_found" o "failed"
+    (errore del servizio: l'album va ritentato).
+    """
     try:
-        # Inizializzazione servizio
-        config_dict = {k: v for k, v in globals().items() if k.isupper()}
-        service_type = config_dict.get("MUSIC_SERVICE", "headphones")
+        if music_service.add_album(album_info):
+            clear_miss("album", album_info.mbid)
+            # Queue album
+            if music_service.queue_album(album_info, force_new=True):
+                # Nota: added_albums è persistito subito (append sul log)
+                added_albums.add(album_info.mbid)
+                if _album_filter is not None:
+                    _album_filter.add(album_info.mbid)
+                count(stats, "success")
+            else:
+                log.warning(f"Album {album_info.title} aggiunto ma queue fallita")
+            return "added"
+        count(stats, "errors")
+        log.error(f"Fallito add album {album_info.title}")
+        record_miss("album", album_info.mbid, "failed", album_info.title)
+    except NotFoundError as e:
+        log.warning(f"{e}")
+        record_miss("album", album_info.mbid, "not_found", album_info.title)
+        return "not_found"
+    except ServiceError as e:
+        count(stats, "errors")
+        log.error(f"Service error adding album {album_info.title}: {e}")
+        record_miss("album", album_info.mbid, "failed", album_info.title)
+    except Exception as e:
+        count(stats, "errors")
+        log.error(f"Unexpected error adding album {album_info.title}: {e}")
+    return "failed"
+
+# ────────────── PIPELINE DI SYNC ──────────────
+# Arresto richiesto dal daemon (SIGTERM/SIGINT): sync ed enqueue si fermano fra un task e l'altro
+_shutdown = threading.Event()
+_active_pipeline = None  # pipeline in esecuzione, fermata dal signal handler del daemon
+
+@dataclass(eq=False)
+class SeedTask:
+    """Seed in elaborazione: completato quando lo sono tutti i suoi artisti simili"""
+    mbid: str
+    name: str
+    fingerprint: str
+    pending: int = 1  # riferimento tenuto dallo stadio similars finché emette
+    ok: bool = True
+    mark: bool = True  # False se un artista simile è stato rimandato dal ledger dei fallimenti
+
+@dataclass(eq=False)
+class ArtistTask:
+    """Artista simile in elaborazione: completato quando lo sono tutti i suoi album"""
+    mbid: str
+    name: str
+    seed: Optional[SeedTask] = None
+    albums: List[str] = field(default_factory=list)
+    titles: Dict[str, str] = field(default_factory=dict)
+    fingerprint: Optional[str] = None
+    pending: int = 1
+    ok: bool = True
+    mark: bool = True
+
+@dataclass(eq=False)
+class AlbumTask:
+    """Album top di un artista simile in elaborazione"""
+    artist: ArtistTask
+    rel_id: str
+    rg_id: Optional[str] = None
+    info: Optional[AlbumInfo] = None
+
+class DiscoveryRun:
+    """
+    Stato condiviso di una sync e handler degli stadi della pipeline:
+
+        seeds → similars → top_albums → artists → classify → enqueue
+        (Last.fm)  (cache/servizio)  (Last.fm)  (servizio)  (MusicBrainz)  (servizio)
+
+    Ogni stadio ha il proprio pool di worker, dimensionato sul backend che usa
+    (PIPELINE_*_WORKERS). Lo stadio similars ha un solo worker: la selezione
+    dei simili (seen, MAX_SIMILAR_PER_ART) resta nell'ordine dei seed.
+    Seed e artisti vengono registrati come completati (checkpoint, ledger)
+    solo quando tutto il lavoro che hanno generato è terminato.
+    Con candidates (--discover-only) il servizio non viene mai contattato:
+    seed e album selezionati finiscono nella coda dei candidati.
+    """
+
+    def __init__(self, music_service, added_albums, graph, match_min, candidates=None):
+        self.music_service = music_service
+        self.candidates = candidates
+        self.discover_only = candidates is not None
+        self.added_albums = added_albums
+        self.graph = graph
+        self.match_min = match_min
+        self.global_ranking = SIMILAR_RANKING == "global"
+        self.multi_hop = SIMILAR_GRAPH_DEPTH > 1
+        self.checkpoint = None
+        self.lock = threading.RLock()
+        self.stats = {"success": 0, "errors": 0, "skipped": 0, "queued": 0}
+        self.seen = set()
+        self.done_seeds = set()
+        # seen include gli artisti in elaborazione; done_similars solo quelli completati
+        self.done_similars = set()
+        # Simili scelti dai seed non ancora completati ([mbid, nome]): con --resume la
+        # selezione viene ripetuta identica invece di scegliere altri simili al posto di quelli fatti
+        self.selected = {}
+        self.resume_selected = {}
+        self.fallback_ids = []
+        self.ranking_seeds = []
+        self.stage_stats = {}
+
+    # ── checkpoint ──
+    def checkpoint_state(self):
+        with self.lock:
+            return {"ranking": SIMILAR_RANKING, "discover_only": self.discover_only,
+                    "done_seeds": sorted(self.done_seeds),
+                    "seen": sorted(self.done_similars), "fallback_ids": list(self.fallback_ids),
+                    "selected": {seed: list(sims) for seed, sims in self.selected.items()},
+                    "stats": dict(self.stats)}
+
+    def restore(self, previous):
+        self.done_seeds.update(previous["done_seeds"])
+        self.seen.update(previous["seen"])
+        self.done_similars.update(previous["seen"])
+        self.fallback_ids.extend(previous["fallback_ids"])
+        self.resume_selected.update(previous.get("selected", {}))
+        self.stats.update(previous["stats"])
+
+    def _save_progress(self):
+        if self.checkpoint is not None:
+            self.checkpoint.maybe_save()
+
+    # ── completamento ──
+    def _seed_done(self, aid):
+        with self.lock:
+            self.done_seeds.add(aid)
+            self._save_progress()
+
+    def _release_seed(self, seed, ok=True):
+        with self.lock:
+            seed.ok = seed.ok and ok
+            seed.pending -= 1
+            if seed.pending:
+                return
+            # Seed elaborato completamente solo se nessun passaggio è fallito o è stato rimandato
+            # (un seed segnato salterebbe anche i suoi simili al prossimo run)
+            if seed.ok and seed.mark:
+                _processed_ledger.mark("seed", seed.mbid, seed.fingerprint)
+            self.selected.pop(seed.mbid, None)
+            self._seed_done(seed.mbid)
+
+    def _release_artist(self, task, ok=True):
+        with self.lock:
+            task.ok = task.ok and ok
+            task.pending -= 1
+            if task.pending:
+                return
+            if task.ok and task.mark and task.fingerprint is not None:
+                _processed_ledger.mark("similar", task.mbid, task.fingerprint)
+            self.done_similars.add(task.mbid)
+            if task.seed is not None:
+                self._release_seed(task.seed, task.ok)
+            self._save_progress()
+
+    def _defer(self, task):
+        """
+        Artista (o suo album) rimandato dal ledger dei fallimenti: né l'artista
+        né il suo seed vanno segnati come elaborati, altrimenti il nuovo
+        tentativo slitterebbe a PROCESSED_SKIP_DAYS
+        """
+        with self.lock:
+            task.mark = False
+            if task.seed is not None:
+                task.seed.mark = False
+
+    def _guarded(self, handler, release):
+        """Un errore imprevisto in uno stadio rilascia comunque il task (come fallito)"""
+        def run(item, emit):
+            try:
+                handler(item, emit)
+            except Exception as e:
+                log.error(f"Errore pipeline ({handler.__name__}): {e}")
+                count(self.stats, "errors")
+                release(item)
+        return run
+
+    # ── stadi ──
+    def expand_seed(self, seed, emit):
+        """Stadio similars: aggiunta seed e selezione dei suoi artisti simili"""
+        name, aid = seed
+        resumed = aid in self.done_seeds
+        if resumed and not self.global_ranking:
+            log.debug(f"Artista {name} ({aid}) già completato (checkpoint)")
+            return
         
-        music_service = MusicServiceFactory.create_service(service_type, config_dict)
-        log.info(f"Using {service_type} service: {music_service.get_service_info()}")
+        log.info(f"Processo artista: {name} ({aid})")
         
-        # Resto del workflow IDENTICO alla v1.7.x
-        cache = load_cache()
-        added_albums = set(cache.get("added_albums", []))
-        recent = recent_artists()
+        # Gestione artisti simili - WORKFLOW IDENTICO (con cache ottimizzata)
+        sims = self.graph.neighbors(aid, name)
+        if self.multi_hop:
+            sims = self.graph.expand(aid, name, SIMILAR_GRAPH_DEPTH, SIMILAR_GRAPH_DECAY,
+                                     SIMILAR_MATCH_MIN, SIMILAR_GRAPH_FANOUT)
         
-        log.info("Analizzo %d artisti...", len(recent))
+        # Seed già elaborato con gli stessi simili entro PROCESSED_SKIP_DAYS: niente da rifare
+        fingerprint = ProcessedLedger.fingerprint(
+            [[s[0] for s in sims], MAX_SIMILAR_PER_ART, self.match_min, SIMILAR_GRAPH_DEPTH]
+        )
+        unchanged = _processed_ledger.unchanged("seed", aid, fingerprint)
+        if unchanged:
+            log.info(f"Artista {name} invariato dall'ultima elaborazione, salto")
         
-        seen = set()
-        fallback_ids = []
-        success_count = 0
-        error_count = 0
-        skipped_count = 0
+        # Aggiunta artista (STESSA LOGICA, diversa implementazione)
+        if not (resumed or unchanged):
+            if skip_known_miss("artist", aid, name):
+                return
+            if self.discover_only:
+                self.candidates.push_artist(aid, name)
+            elif add_artist_checked(self.music_service, ArtistInfo(mbid=aid, name=name), self.stats) != "added":
+                return
         
-        for name, aid in recent:
-            if not aid:
-                continue
-                
-            log.info(f"Processo artista: {name} ({aid})")
-            
-            # Conversione a structured data
-            artist_info = ArtistInfo(mbid=aid, name=name)
-            
-            # Aggiunta artista (STESSA LOGICA, diversa implementazione)
-            try:
-                if not music_service.add_artist(artist_info):
-                    log.error(f"Impossibile aggiungere l'artista {name} ({aid})")
-                    error_count += 1
-                    continue
-            except ServiceError as e:
-                log.error(f"Service error adding artist {name}: {e}")
-                error_count += 1
+        if self.global_ranking:
+            # Ranking globale: i candidati vengono scelti dopo aver visto tutti i seed
+            with self.lock:
+                self.ranking_seeds.append((name, sims))
+            if not (resumed or unchanged):
+                _processed_ledger.mark("seed", aid, fingerprint)
+            self._seed_done(aid)
+            return
+        
+        if unchanged:
+            self._seed_done(aid)
+            return
+        
+        task = SeedTask(aid, name, fingerprint)
+        picks = self.resume_selected.pop(aid, None)
+        if picks is not None:
+            log.debug(f"Artista {name}: ripresa dei {len(picks)} simili scelti prima dell'interruzione")
+        else:
+            picks = self._select_similars(sims)
+        # Selezione registrata per intero prima di emettere: il checkpoint non ne vede una parziale
+        with self.lock:
+            self.selected[aid] = [[sid, sim_name] for sid, sim_name in picks]
+            # In ripresa i simili già completati non vengono ripetuti
+            todo = [(sid, sim_name) for sid, sim_name in picks if sid not in self.done_similars]
+            self.seen.update(sid for sid, _sim_name in todo)
+            task.pending += len(todo)
+        for sid, sim_name in todo:
+            emit(ArtistTask(sid, sim_name, seed=task))
+        self._release_seed(task)
+
+    def _select_similars(self, sims):
+        """Primi MAX_SIMILAR_PER_ART simili non ancora visti e sopra la soglia: [(mbid, nome)]"""
+        picks = []
+        chosen = set()
+        for sid, sim_name, sim_match in sims:
+            if len(picks) >= MAX_SIMILAR_PER_ART:
+                log.debug(f"Scarto {sim_name} ({sid}): superato MAX_SIMILAR_PER_ART")
+                break
+            if sid in self.seen or sid in chosen:
+                log.debug(f"Scarto {sim_name} ({sid}): già processato")
                 continue
-            except Exception as e:
-                log.error(f"Unexpected error adding artist {name}: {e}")
-                error_count += 1
+            if sim_match < self.match_min:
+                log.debug(f"Scarto {sim_name} ({sid}): match troppo basso ({sim_match})")
                 continue
-            
-            # Refresh artista
-            music_service.refresh_artist(aid)
-            
-            # Gestione artisti simili - WORKFLOW IDENTICO (con cache ottimizzata)
-            sims = cached_similars(cache, aid)
-            if not sims:
-                log.info(f"Cerco artisti simili per {name}...")
-                js = lf_request("artist.getSimilar", mbid=aid, limit=50)
-                sims = js.get("similarartists", {}).get("artist", []) if js else []
-                # Salva in cache solo se abbiamo dati validi
-                if sims:
-                    cache["similar_cache"][aid] = {"ts": time.time(), "data": sims}
-
-            proc = 0
-            for s in sims:
-                sim_name = s.get("name", "Sconosciuto")
-                sid = s.get("mbid")
-                sim_match = float(s.get("match", 0))
-
-                if proc >= MAX_SIMILAR_PER_ART:
-                    log.debug(f"Scarto {sim_name} ({sid}): superato MAX_SIMILAR_PER_ART")
-                    break
-                if not sid:
-                    log.debug(f"Scarto {sim_name}: MBID mancante")
-                    continue
-                if sid in seen:
-                    log.debug(f"Scarto {sim_name} ({sid}): già processato")
-                    continue
-                if sim_match < SIMILAR_MATCH_MIN:
-                    log.debug(f"Scarto {sim_name} ({sid}): match troppo basso ({sim_match})")
-                    continue
+            chosen.add(sid)
+            picks.append((sid, sim_name))
+        return picks
 
-                seen.add(sid)
-                proc += 1
-                log.info(f"Processo artista simile: {sim_name} ({sid})")
+    def fetch_top_albums(self, task, emit):
+        """
+        Stadio top_albums: album popolari dell'artista simile. Se sono invariati
+        dall'ultima elaborazione completa (entro PROCESSED_SKIP_DAYS) l'artista
+        viene saltato.
+        """
+        log.info(f"Processo artista simile: {task.name} ({task.mbid})")
+        task.albums = top_albums(task.mbid)
+        if self._similar_unchanged(task):
+            return
+        
+        # Recupera anche la lista originale con titoli
+        js_albums = lf_request("artist.getTopAlbums", mbid=task.mbid, limit=MAX_POP_ALBUMS*2)
+        task.titles = top_album_titles(js_albums)
+        emit(task)
 
-                # Aggiunta artista simile con service layer
-                similar_artist_info = ArtistInfo(mbid=sid, name=sim_name)
-                try:
-                    if not music_service.add_artist(similar_artist_info):
-                        log.error(f"Impossibile aggiungere l'artista simile {sim_name} ({sid})")
-                        error_count += 1
-                        continue
-                except ServiceError as e:
-                    log.error(f"Service error adding similar artist {sim_name}: {e}")
-                    error_count += 1
-                    continue
-                except Exception as e:
-                    log.error(f"Unexpected error adding similar artist {sim_name}: {e}")
-                    error_count += 1
-                    continue
-                
-                music_service.refresh_artist(sid)
+    def _similar_unchanged(self, task):
+        """Artista simile con gli stessi album top dell'ultima elaborazione: completato"""
+        task.fingerprint = ProcessedLedger.fingerprint([task.albums, MAX_POP_ALBUMS])
+        if not _processed_ledger.unchanged("similar", task.mbid, task.fingerprint):
+            return False
+        log.info(f"Artista simile {task.name} invariato dall'ultima elaborazione, salto")
+        task.mark = False
+        self._release_artist(task)
+        return True
 
-                # Processa album dell'artista simile - LOGICA IDENTICA
-                albums = top_albums(sid)
-                log.info(f"Trovati {len(albums)} album per {sim_name}")
+    def add_similar_artist(self, task, emit):
+        """Stadio artists: aggiunta dell'artista simile al servizio"""
+        if skip_known_miss("artist", task.mbid, task.name):
+            self._defer(task)
+            self._release_artist(task)
+            return
+        
+        # Aggiunta artista simile con service layer (con --discover-only va nella coda dei candidati)
+        similar_artist_info = ArtistInfo(mbid=task.mbid, name=task.name)
+        if self.discover_only:
+            self.candidates.push_artist(task.mbid, task.name)
+        elif add_artist_checked(self.music_service, similar_artist_info, self.stats, "l'artista simile") != "added":
+            self._release_artist(task, ok=False)
+            return
+        
+        # Processa album dell'artista simile - LOGICA IDENTICA
+        log.info(f"Trovati {len(task.albums)} album per {task.name}")
+        for rel_id in task.albums:
+            with self.lock:
+                task.pending += 1
+            emit(AlbumTask(task, rel_id))
+        self._release_artist(task)
 
-                # Recupera anche la lista originale con titoli
-                js_albums = lf_request("artist.getTopAlbums", mbid=sid, limit=MAX_POP_ALBUMS*2)
-                albums_raw = js_albums.get("topalbums", {}).get("album", []) if js_albums else []
-                mbid_to_title = {a.get("mbid"): a.get("name") for a in albums_raw if a.get("mbid")}
+    def classify_album(self, album, emit):
+        """Stadio classify: release group MusicBrainz, esistenza in libreria, tipo studio"""
+        rg_id = release_to_rg(album.rel_id)
+        if self._album_candidate(album, rg_id) and self._album_accepted(album, rg_id, is_studio_rg(rg_id)):
+            emit(album)
 
-                for rel_id in albums:
-                    rg_id = release_to_rg(rel_id)
-                    title = mbid_to_title.get(rel_id, rel_id)
-                    
-                    if not rg_id:
-                        # Fallback: MBID mancante, usa nome artista e titolo album
-                        log.info(f"Fallback: aggiungo album senza MBID (artista: {sim_name}, titolo: {title})")
-                        # Per ora skip fallback in service layer - implementazione futura
-                        continue
+    def _album_candidate(self, album, rg_id):
+        """False (album concluso) senza release group o se l'album è già in libreria"""
+        task, rel_id = album.artist, album.rel_id
+        if not rg_id:
+            # Fallback: MBID mancante, usa nome artista e titolo album
+            title = task.titles.get(rel_id, rel_id)
+            log.info(f"Fallback: aggiungo album senza MBID (artista: {task.name}, titolo: {title})")
+            # Per ora skip fallback in service layer - implementazione futura
+            self._release_artist(task)
+            return False
+        
+        # Controlla esistenza album usando service layer (con --discover-only solo added_albums;
+        # la libreria viene controllata in fase di enqueue)
+        if self.discover_only:
+            exists = rg_id in self.added_albums or rel_id in self.added_albums
+        else:
+            exists = album_in_library(self.music_service, rg_id, self.added_albums, task.mbid) or \
+                album_in_library(self.music_service, rel_id, self.added_albums, task.mbid)
+        if exists:
+            log.debug(f"Album {rel_id} già esistente")
+            count(self.stats, "skipped")
+            self._release_artist(task)
+            return False
+        return True
 
-                    # Controlla esistenza album usando service layer
-                    if music_service.album_exists(rg_id, added_albums) or music_service.album_exists(rel_id, added_albums):
-                        log.debug(f"Album {rel_id} già esistente")
-                        skipped_count += 1
-                        continue
+    def _album_accepted(self, album, rg_id, studio):
+        """Tipo studio e ledger dei fallimenti: True se l'album va aggiunto (album.info)"""
+        task, rel_id = album.artist, album.rel_id
+        title = task.titles.get(rel_id, rel_id)
+        if studio is False:
+            log.debug(f"Album {rel_id} non è studio")
+            self._release_artist(task)
+            return False
+        
+        # Se non sappiamo se è studio, usa il release ID
+        album_mbid = rg_id if studio else rel_id
+        if skip_known_miss("album", album_mbid, title):
+            self._defer(task)
+            self._release_artist(task)
+            return False
+        
+        # Conversione a AlbumInfo per service layer
+        album.rg_id = rg_id
+        album.info = AlbumInfo(mbid=album_mbid, title=title, artist_mbid=task.mbid, artist_name=task.name)
+        if studio is None:
+            log.info(f"Aggiungo album (fallback) {rel_id}")
+            with self.lock:
+                self.fallback_ids.append(rel_id)
+        else:
+            log.info(f"Aggiungo album {rg_id}")
+        return True
+
+    def enqueue_album(self, album, emit):
+        """Stadio enqueue: aggiunta e accodamento dell'album sul servizio"""
+        outcome = add_and_queue_album(self.music_service, album.info, self.added_albums, self.stats)
+        if outcome == "not_found":
+            self._defer(album.artist)
+        self._release_artist(album.artist, outcome != "failed")
+
+    def queue_candidate(self, album, emit):
+        """Stadio enqueue con --discover-only: l'album va nella coda dei candidati"""
+        info = album.info
+        if self.candidates.push_album(info.mbid, info.title, info.artist_mbid, info.artist_name,
+                                      album.rg_id, album.rel_id, fallback=info.mbid == album.rel_id):
+            count(self.stats, "queued")
+        self._release_artist(album.artist)
 
-                    studio = is_studio_rg(rg_id)
-                    if studio is False:
-                        log.debug(f"Album {rel_id} non è studio")
+    # ── esecuzione ──
+    def _enqueue_handler(self):
+        return self.queue_candidate if self.discover_only else self.enqueue_album
+
+    def _seed_stage(self):
+        return Stage("similars", self.expand_seed, 1)
+
+    def _artist_stages(self):
+        release_artist = lambda task: self._release_artist(task, ok=False)
+        release_album = lambda album: self._release_artist(album.artist, ok=False)
+        return [
+            Stage("top_albums", self._guarded(self.fetch_top_albums, release_artist), PIPELINE_LASTFM_WORKERS),
+            Stage("artists", self._guarded(self.add_similar_artist, release_artist), PIPELINE_SERVICE_WORKERS),
+            Stage("classify", self._guarded(self.classify_album, release_album), PIPELINE_MBZ_WORKERS),
+            Stage("enqueue", self._guarded(self._enqueue_handler(), release_album), PIPELINE_SERVICE_WORKERS),
+        ]
+
+    def _run(self, stages, source):
+        global _active_pipeline
+        pipeline = Pipeline(stages, PIPELINE_QUEUE_SIZE)
+        _active_pipeline = pipeline
+        try:
+            if not _shutdown.is_set():
+                pipeline.run(source)
+        finally:
+            _active_pipeline = None
+            self.stage_stats.update(pipeline.stats())
+
+    def run_seeds(self, seeds):
+        """Seed in streaming attraverso la pipeline (con ranking globale solo lo stadio similars)"""
+        stages = [self._seed_stage()]
+        if not self.global_ranking:
+            stages += self._artist_stages()
+        self._run(stages, seeds)
+
+    def run_candidates(self, ranked):
+        """Candidati del ranking globale attraverso gli stadi per artista"""
+        def candidates():
+            for sid, sim_name, score in ranked:
+                with self.lock:
+                    if sid in self.seen:
                         continue
+                    self.seen.add(sid)
+                log.debug(f"Candidato {sim_name} ({sid}): score {score:.3f}")
+                yield ArtistTask(sid, sim_name)
+        self._run(self._artist_stages(), candidates())
+
+class AsyncDiscoveryRun(DiscoveryRun):
+    """
+    DiscoveryRun su un solo event loop (SYNC_ENGINE = "asyncio")
+
+    Gli stadi Last.fm e MusicBrainz usano le chiamate aiohttp; i client
+    Lidarr/Headphones restano bloccanti e girano nel pool di thread di default.
+    Un semaforo per backend (PIPELINE_*_WORKERS) limita le richieste in volo,
+    mentre ogni stadio ha ASYNC_STAGE_TASKS task: molti artisti sono in
+    elaborazione insieme senza un thread per richiesta. Selezione, checkpoint
+    e ledger sono quelli del motore a thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limits = {}
+
+    async def _blocking(self, backend, fn, *args):
+        """Chiamata bloccante nel pool di thread, sotto il semaforo del backend"""
+        async with self.limits[backend]:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def _threaded(self, handler, backend):
+        """Handler sincrono di DiscoveryRun eseguito nel pool di thread"""
+        async def run(item, emit):
+            emitted = []
+            await self._blocking(backend, handler, item, emitted.append)
+            for result in emitted:
+                await emit(result)
+        return run
 
-                    try:
-                        # Conversione a AlbumInfo per service layer
-                        album_info = AlbumInfo(
-                            mbid=rg_id if studio else rel_id,
-                            title=title,
-                            artist_mbid=sid,
-                            artist_name=sim_name
-                        )
-                        
-                        # Se non sappiamo se è studio, usa il release ID
-                        if studio is None:
-                            log.info(f"Aggiungo album (fallback) {rel_id}")
-                            album_info.mbid = rel_id
-                            fallback_ids.append(rel_id)
-                        else:
-                            log.info(f"Aggiungo album {rg_id}")
-                        
-                        # Aggiunta album con service layer
-                        try:
-                            if music_service.add_album(album_info):
-                                # Queue album
-                                if music_service.queue_album(album_info, force_new=True):
-                                    added_albums.add(album_info.mbid)
-                                    success_count += 1
-                                    
-                                    # Nota: cache salvata in batch alla fine per performance
-                                else:
-                                    log.warning(f"Album {album_info.title} aggiunto ma queue fallita")
-                            else:
-                                error_count += 1
-                                log.error(f"Fallito add album {album_info.title}")
-                        except ServiceError as e:
-                            error_count += 1
-                            log.error(f"Service error adding album {album_info.title}: {e}")
-                        except Exception as e:
-                            error_count += 1
-                            log.error(f"Unexpected error adding album {album_info.title}: {e}")
-
-                    except Exception as e:
-                        error_count += 1
-                        log.error(f"Errore durante l'aggiunta dell'album {rel_id or rg_id}: {e}")
+    def _guarded_async(self, handler, release):
+        async def run(item, emit):
+            try:
+                await handler(item, emit)
+            except Exception as e:
+                log.error(f"Errore pipeline ({handler.__name__}): {e}")
+                count(self.stats, "errors")
+                release(item)
+        return run
+
+    # ── stadi asincroni ──
+    async def fetch_top_albums_async(self, task, emit):
+        """Stadio top_albums: una sola chiamata per MBID e titoli degli album"""
+        log.info(f"Processo artista simile: {task.name} ({task.mbid})")
+        async with self.limits["lastfm"]:
+            js = await lf_request_async("artist.getTopAlbums", mbid=task.mbid, limit=MAX_POP_ALBUMS*2)
+        task.albums = top_album_ids(js)
+        if self._similar_unchanged(task):
+            return
+        task.titles = top_album_titles(js)
+        await emit(task)
+
+    async def classify_album_async(self, album, emit):
+        """Stadio classify: lookup MusicBrainz asincroni, esistenza in libreria nel pool"""
+        async with self.limits["mbz"]:
+            rg_id = await release_to_rg_async(album.rel_id)
+        if not await self._blocking("service", self._album_candidate, album, rg_id):
+            return
+        async with self.limits["mbz"]:
+            studio = await is_studio_rg_async(rg_id)
+        if self._album_accepted(album, rg_id, studio):
+            await emit(album)
+
+    # ── esecuzione ──
+    def _seed_stage(self):
+        return Stage("similars", self._threaded(self.expand_seed, "service"), 1)
+
+    def _artist_stages(self):
+        release_artist = lambda task: self._release_artist(task, ok=False)
+        release_album = lambda album: self._release_artist(album.artist, ok=False)
+        return [
+            Stage("top_albums", self._guarded_async(self.fetch_top_albums_async, release_artist), ASYNC_STAGE_TASKS),
+            Stage("artists", self._threaded(self._guarded(self.add_similar_artist, release_artist), "service"),
+                  ASYNC_STAGE_TASKS),
+            Stage("classify", self._guarded_async(self.classify_album_async, release_album), ASYNC_STAGE_TASKS),
+            Stage("enqueue", self._threaded(self._guarded(self._enqueue_handler(), release_album), "service"),
+                  ASYNC_STAGE_TASKS),
+        ]
+
+    def _run(self, stages, source):
+        asyncio.run(self._run_async(stages, source))
+
+    async def _run_async(self, stages, source):
+        global _active_pipeline
+        # Semafori creati nel loop corrente: asyncio.run ne crea uno per chiamata
+        self.limits = {
+            "lastfm": asyncio.Semaphore(PIPELINE_LASTFM_WORKERS),
+            "mbz": asyncio.Semaphore(PIPELINE_MBZ_WORKERS),
+            "service": asyncio.Semaphore(PIPELINE_SERVICE_WORKERS),
+        }
+        pipeline = AsyncPipeline(stages, PIPELINE_QUEUE_SIZE)
+        _active_pipeline = pipeline
+        try:
+            if not _shutdown.is_set():
+                await pipeline.run(source)
+        finally:
+            _active_pipeline = None
+            self.stage_stats.update(pipeline.stats())
+            await async_http.close()
+
+def seed_similars(cache, aid, name):
+    """Artisti simili di un seed: cache (stale-while-revalidate) o Last.fm"""
+    sims = cached_similars(cache, aid)
+    if not sims:
+        log.info(f"Cerco artisti simili per {name}...")
+        sims = fetch_similars(aid)
+        store_similars(cache, aid, sims)
+    return sims
+
+def acquire_run_lock(path=None):
+    """
+    Lock di run: un solo sync alla volta (es. cron che parte mentre il run
+    precedente è ancora in corso). Con RUN_LOCK_MODE = "skip" il nuovo run
+    esce subito, con "wait" attende fino a RUN_LOCK_TIMEOUT secondi.
+    La fase di enqueue (--enqueue-only) usa un lock separato.
+    Ritorna il lock acquisito o None.
+    """
+    lock = FileLock(path or RUN_LOCK_FILE)
+    if lock.acquire(blocking=False):
+        return lock
+    
+    if RUN_LOCK_MODE == "skip":
+        log.warning("Un altro run è in corso: run saltato (RUN_LOCK_MODE = 'skip')")
+        return None
+    
+    limit = f"{RUN_LOCK_TIMEOUT}s" if RUN_LOCK_TIMEOUT is not None else "senza limite"
+    log.info(f"Un altro run è in corso: attendo il lock ({limit})...")
+    if lock.acquire(timeout=RUN_LOCK_TIMEOUT):
+        return lock
+    log.warning("Lock di run non ottenuto entro RUN_LOCK_TIMEOUT: run saltato")
+    return None
+
+def sync(resume=False, discover_only=False):
+    """
+    Sync function modificata per service abstraction.
+    Lo stato viene salvato periodicamente in un checkpoint; con resume=True
+    la sync riprende dall'ultimo checkpoint di un run interrotto.
+    Con discover_only=True il servizio non viene contattato: seed e album
+    selezionati vanno nella coda dei candidati (vedi enqueue_candidates).
+    I run sovrapposti sono serializzati dal lock di run.
+    """
+    global _miss_ledger, _processed_ledger
+    run_lock = acquire_run_lock()
+    if run_lock is None:
+        return
+    
+    start_time = time.time()
+    cache = None
+    checkpoint = None
+    music_service = None
+    completed = False
+    # Contatori del run (in modalità daemon il processo esegue più run)
+    api_flight.reset()
+    lastfm_bucket.reset_stats()
+    mbz_bucket.reset_stats()
+    for key in album_filter_stats:
+        album_filter_stats[key] = 0
+    
+    try:
+        # Inizializzazione servizio
+        config_dict = {k: v for k, v in globals().items() if k.isupper()}
+        service_type = config_dict.get("MUSIC_SERVICE", "headphones")
+        users = lastfm_users()
+        windows = {user.username: recent_window(user) for user in users}
+        
+        # Creazione del servizio (validazione, profili, health check) in parallelo
+        # con la prima pagina Last.fm, che resta nel memo del run per iter_recent_artists
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-init") as executor:
+            service_future = None
+            if not discover_only:
+                service_future = executor.submit(get_music_service, service_type, config_dict)
+            try:
+                recent_tracks_page(users[0], windows[users[0].username], 1)
+            finally:
+                music_service = service_future.result() if service_future is not None else None
+        
+        if discover_only:
+            log.info(f"Discovery only: i candidati vengono accodati per {service_type} (--enqueue-only)")
+        else:
+            log.info(f"Using {service_type} service: {music_service.describe()}")
+        
+        # Resto del workflow IDENTICO alla v1.7.x
+        cache = load_cache()
+        added_albums = cache["added_albums"]
+        candidates = CandidateQueue(cache["store"]) if discover_only else None
+        if music_service is not None:
+            load_album_filter(music_service, added_albums)
+        
+        # Ledger dei lookup non trovati/falliti: evita di ripagarli ad ogni run
+        _miss_ledger = MissLedger(cache["store"], service_type.lower(), MISS_RETRY_BASE_DAYS, MISS_RETRY_MAX_DAYS)
+        # Ledger degli artisti elaborati: salta quelli con input invariati
+        _processed_ledger = ProcessedLedger(cache["store"], PROCESSED_SKIP_DAYS)
+        
+        # Seed in streaming: l'elaborazione parte appena un artista si qualifica
+        log.info("Analizzo artisti recenti (streaming)...")
+        
+        global_ranking = SIMILAR_RANKING == "global"
+        # Grafo dei simili sopra similar_cache: ogni nodo espanso una volta per run
+        graph = SimilarGraph(lambda node, node_name: seed_similars(cache, node, node_name))
+        multi_hop = SIMILAR_GRAPH_DEPTH > 1
+        # Oltre il primo hop i pesi decadono: la soglia viene applicata agli archi durante la visita
+        match_min = 0 if multi_hop else SIMILAR_MATCH_MIN
+        play_counts = {}
+        engine = DiscoveryRun
+        if SYNC_ENGINE == "asyncio":
+            if async_transport.AVAILABLE:
+                engine = AsyncDiscoveryRun
+            else:
+                log.warning("SYNC_ENGINE = 'asyncio' richiede aiohttp (pip install aiohttp): uso il motore a thread")
+        run = engine(music_service, added_albums, graph, match_min, candidates)
+        stats, fallback_ids = run.stats, run.fallback_ids
+        
+        # Checkpoint: cursore su seed/simili, seen, fallback e contatori
+        checkpoint = SyncCheckpoint(
+            cache["store"], CHECKPOINT_INTERVAL_SECONDS, run.checkpoint_state,
+            on_save=lambda: _album_filter is not None and _album_filter.save(ALBUM_FILTER_FILE)
+        )
+        run.checkpoint = checkpoint
+        previous = checkpoint.load()
+        if previous and resume and previous.get("ranking") == SIMILAR_RANKING \
+                and previous.get("discover_only", False) == discover_only:
+            run.restore(previous)
+            log.info(f"Ripresa dal checkpoint del {datetime.fromtimestamp(previous['updated']):%Y-%m-%d %H:%M}: "
+                     f"{len(run.done_seeds)} seed e {len(run.seen)} artisti simili già completati")
+        elif previous:
+            log.warning("Checkpoint di un run interrotto ignorato (usa --resume per riprenderlo)")
+        
+        # Pipeline a stadi: seed, simili, album top, MusicBrainz e servizio lavorano in parallelo
+        run.run_seeds(iter_seed_artists(users, windows, play_counts))
+
+        if global_ranking and run.ranking_seeds and not _shutdown.is_set():
+            # Pesi seed = play count finali (a paginazione completata)
+            weighted_seeds = [(play_counts.get(name, MIN_PLAYS), sims) for name, sims in run.ranking_seeds]
+            budget = SIMILAR_RANKING_BUDGET or len(run.ranking_seeds) * MAX_SIMILAR_PER_ART
+            ranked = rank_candidates(weighted_seeds, match_min, budget)
+            log.info(f"Ranking globale: {len(ranked)} candidati selezionati (budget {budget}) da {len(run.ranking_seeds)} seed")
+            run.run_candidates(ranked)
+
+        if _shutdown.is_set():
+            # Pipeline fermata dal daemon: il finally salva checkpoint e cache
+            log.info("Arresto richiesto: sync interrotta")
+            return
+
+        for stage, st in run.stage_stats.items():
+            log.debug(f"Stadio {stage}: {st['processed']} item, {st['failed']} falliti, {st['busy']}s di lavoro")
+
+        if multi_hop:
+            log.info(f"Grafo simili: {graph.expansions} nodi espansi (profondità {SIMILAR_GRAPH_DEPTH})")
 
         # Force search finale
-        if fallback_ids:
+        if fallback_ids and music_service is not None:
             log.info(f"Aggiornamento finale per {len(fallback_ids)} album...")
             try:
                 music_service.force_search()
             except ServiceError as e:
                 log.error(f"Force search failed: {e}")
         
+        # Run completato: il checkpoint non serve più
+        completed = True
+        checkpoint.clear()
+        
         # Salvataggio cache finale per performance
-        cache["added_albums"] = list(added_albums)
+        wait_similar_refreshes()
         save_cache(cache)
         
         # Statistiche IDENTICHE
         elapsed_time = time.time() - start_time
         log.info("Sync completata in %.1f minuti.", elapsed_time / 60)
-        log.info("- Album aggiunti: %d", success_count)
-        log.info("- Errori: %d", error_count)
-        log.info("- Skippati: %d", skipped_count)
+        if discover_only:
+            pending = candidates.pending()
+            log.info("- Album candidati accodati: %d (in coda: %d artisti, %d album)",
+                     stats["queued"], pending["artist"], pending["album"])
+        else:
+            log.info("- Album aggiunti: %d", stats["success"])
+        log.info("- Errori: %d", stats["errors"])
+        log.info("- Skippati: %d", stats["skipped"])
         log.info("- Fallback: %d", len(fallback_ids))
+        for backend, bucket in (("Last.fm", lastfm_bucket), ("MusicBrainz", mbz_bucket)):
+            st = bucket.stats()
+            log.info("- Rate limit %s: %d chiamate, %d in attesa, %.1fs di attesa totale",
+                     backend, st["calls"], st["waits"], st["waited"])
+        log.info("- Richieste API: %d eseguite, %d condivise con una identica in volo, %d dal memo del run",
+                 api_flight.calls, api_flight.coalesced, api_flight.memo_hits)
+        if _processed_ledger.enabled:
+            log.info("- Artisti invariati saltati: %d", _processed_ledger.skipped)
+        if _miss_ledger.enabled:
+            log.info("- Miss ledger: %d lookup evitati, %d fallimenti registrati",
+                     _miss_ledger.skipped, _miss_ledger.recorded)
+        if _album_filter is not None:
+            log.info("- Album filter: %d controlli, %d negativi certi, %d positivi confermati, "
+                     "%d falsi positivi, %d controlli di rete",
+                     album_filter_stats["checks"], album_filter_stats["definite_negatives"],
+                     album_filter_stats["confirmed_positives"], album_filter_stats["false_positives"],
+                     album_filter_stats["network_checks"])
         
     except (ServiceError, ConfigurationError) as e:
         log.error(f"Service error: {e}")
@@ -635,14 +1849,242 @@ def sync():
         log.error(f"Unexpected error: {e}")
         raise
     finally:
+        # Run interrotto: checkpoint immediato per --resume
+        if checkpoint is not None and not completed:
+            try:
+                checkpoint.save()
+                log.info("Checkpoint salvato: riprendi con --resume")
+            except Exception as e:
+                log.error(f"Salvataggio checkpoint fallito: {e}")
+        
         # Salvataggio cache finale
-        cache["added_albums"] = list(added_albums)
-        save_cache(cache)
+        wait_similar_refreshes()
+        if cache is not None:
+            save_cache(cache)
+        
+        release_music_service(music_service)
         
         # Cleanup memoria
         import gc
         gc.collect()
         log.debug("Memory cleanup completed")
+        run_lock.release()
+
+def enqueue_candidates():
+    """
+    Fase di enqueue (--enqueue-only): svuota la coda dei candidati scritta da
+    --discover-only verso Lidarr/Headphones. Ogni scrittura sul servizio
+    (aggiunta di un artista o di un album) avviene al ritmo di una ogni
+    ENQUEUE_PACE_SECONDS e al massimo ENQUEUE_MAX_PER_RUN per run (0 = tutte);
+    raggiunto il limite i candidati restanti restano in coda.
+    Un candidato viene rimosso solo se aggiunto, sconosciuto al servizio o già
+    in libreria. Se il servizio fallisce resta in coda; quelli in backoff nel
+    ledger dei fallimenti vengono ritentati alla scadenza. Dopo
+    ENQUEUE_MAX_FAILURES errori consecutivi il servizio è considerato
+    irraggiungibile e il run si ferma.
+    """
+    global _miss_ledger
+    run_lock = acquire_run_lock(ENQUEUE_LOCK_FILE)
+    if run_lock is None:
+        return
+    
+    start_time = time.time()
+    cache = None
+    music_service = None
+    stats = {"success": 0, "errors": 0, "skipped": 0}
+    
+    try:
+        config_dict = {k: v for k, v in globals().items() if k.isupper()}
+        service_type = config_dict.get("MUSIC_SERVICE", "headphones")
+        music_service = get_music_service(service_type, config_dict)
+        log.info(f"Using {service_type} service: {music_service.describe()}")
+        
+        cache = load_cache()
+        added_albums = cache["added_albums"]
+        load_album_filter(music_service, added_albums)
+        _miss_ledger = MissLedger(cache["store"], service_type.lower(), MISS_RETRY_BASE_DAYS, MISS_RETRY_MAX_DAYS)
+        
+        queue = CandidateQueue(cache["store"])
+        pending = queue.pending()
+        log.info(f"Coda candidati: {pending['artist']} artisti, {pending['album']} album")
+        
+        # Esito dell'aggiunta di ogni artista nel run (seed e artisti degli album):
+        # "added", "not_found", "failed" o "deferred" (in backoff nel ledger)
+        artist_outcomes = {}
+        failures = 0
+        
+        def settle(candidate, outcome):
+            """Rimuove il candidato se concluso; False se il servizio è da considerare giù"""
+            nonlocal failures
+            if outcome != "deferred":
+                failures = failures + 1 if outcome == "failed" else 0
+            if outcome in ("added", "not_found", "skipped"):
+                queue.remove(candidate)
+            if failures >= ENQUEUE_MAX_FAILURES:
+                log.error(f"{failures} errori consecutivi del servizio: enqueue interrotto, "
+                          f"i candidati restanti verranno ritentati al prossimo run")
+                return False
+            return True
+        
+        # Ritmo e limite per run valgono per ogni scrittura sul servizio (artisti e album):
+        # l'aggiunta di un artista è la più costosa (refresh metadati e ricerca album in Lidarr)
+        pace = TokenBucket(ENQUEUE_PACE_SECONDS)
+        writes = 0
+        
+        def write_allowed():
+            return not ENQUEUE_MAX_PER_RUN or writes < ENQUEUE_MAX_PER_RUN
+        
+        def service_write():
+            nonlocal writes
+            throttle(pace, "enqueue")
+            writes += 1
+        
+        def ensure_artist(mbid, name, label):
+            """Esito dell'aggiunta dell'artista; None se il limite del run è stato raggiunto"""
+            if mbid not in artist_outcomes:
+                if skip_known_miss("artist", mbid, name):
+                    artist_outcomes[mbid] = "deferred"
+                elif not write_allowed():
+                    return None
+                else:
+                    service_write()
+                    artist_outcomes[mbid] = add_artist_checked(
+                        music_service, ArtistInfo(mbid=mbid, name=name), stats, label)
+            return artist_outcomes[mbid]
+        
+        stop = False
+        for candidate in queue.items("artist"):
+            if _shutdown.is_set():
+                stop = True
+                break
+            outcome = ensure_artist(candidate.mbid, candidate.name, "l'artista")
+            if outcome is None or not settle(candidate, outcome):
+                stop = True
+                break
+        
+        fallback = 0
+        for candidate in [] if stop else queue.items("album"):
+            if _shutdown.is_set():
+                break
+            known_artist = candidate.artist_mbid in artist_outcomes
+            outcome = ensure_artist(candidate.artist_mbid, candidate.artist_name, "l'artista simile")
+            if outcome is None:
+                break
+            if outcome == "added":
+                known = [mbid for mbid in (candidate.rg_id, candidate.rel_id) if mbid]
+                if any(album_in_library(music_service, mbid, added_albums, candidate.artist_mbid)
+                       for mbid in known):
+                    log.debug(f"Album {candidate.name} già esistente")
+                    stats["skipped"] += 1
+                    outcome = "skipped"
+                elif skip_known_miss("album", candidate.mbid, candidate.name):
+                    outcome = "deferred"
+                elif not write_allowed():
+                    break
+                else:
+                    service_write()
+                    log.info(f"Aggiungo album {candidate.name} ({candidate.mbid})")
+                    album_info = AlbumInfo(mbid=candidate.mbid, title=candidate.name,
+                                           artist_mbid=candidate.artist_mbid, artist_name=candidate.artist_name)
+                    outcome = add_and_queue_album(music_service, album_info, added_albums, stats)
+                    if outcome == "added":
+                        fallback += candidate.fallback
+            elif outcome == "failed" and known_artist:
+                # Errore già contato sull'artista: l'album resta in coda senza contare di nuovo
+                outcome = "deferred"
+            if not settle(candidate, outcome):
+                break
+        
+        if _shutdown.is_set():
+            log.info("Arresto richiesto: enqueue interrotto, i candidati restanti restano in coda")
+        
+        if fallback:
+            log.info(f"Aggiornamento finale per {fallback} album...")
+            try:
+                music_service.force_search()
+            except ServiceError as e:
+                log.error(f"Force search failed: {e}")
+        
+        pending = queue.pending()
+        log.info("Enqueue completato in %.1f minuti.", (time.time() - start_time) / 60)
+        log.info("- Album aggiunti: %d", stats["success"])
+        log.info("- Errori: %d", stats["errors"])
+        log.info("- Skippati: %d", stats["skipped"])
+        log.info("- Ancora in coda: %d artisti, %d album", pending["artist"], pending["album"])
+        if ENQUEUE_MAX_PER_RUN and not write_allowed():
+            log.info("- Limite di %d scritture per run raggiunto", ENQUEUE_MAX_PER_RUN)
+        if pace.waited:
+            log.info("- Attesa di ritmo: %.1fs", pace.waited)
+    
+    except (ServiceError, ConfigurationError) as e:
+        log.error(f"Service error: {e}")
+        raise
+    finally:
+        if cache is not None:
+            save_cache(cache)
+        release_music_service(music_service)
+        run_lock.release()
+
+# ────────────── DAEMON ──────────────
+def run_daemon(phase="sync"):
+    """
+    Modalità daemon (--daemon): il processo resta attivo ed esegue la fase
+    richiesta ("sync", "discover" o "enqueue") secondo DAEMON_CRON o ogni
+    DAEMON_INTERVAL_MINUTES. Cache SQLite, album filter, pool HTTP e servizio
+    musicale restano caldi fra un run e l'altro; i run riprendono sempre
+    dall'eventuale checkpoint. SIGTERM/SIGINT fermano il daemon: il signal
+    handler segnala soltanto l'arresto e ferma la pipeline attiva, il run in
+    corso termina fra un task e l'altro salvando checkpoint e cache.
+    """
+    global _keep_music_service
+    schedule = create_schedule(DAEMON_CRON, DAEMON_INTERVAL_MINUTES)
+    runs = {
+        "sync": lambda: sync(resume=True),
+        "discover": lambda: sync(resume=True, discover_only=True),
+        "enqueue": enqueue_candidates,
+    }
+    _shutdown.clear()
+    
+    def handle_signal(signum, frame):
+        # Niente eccezioni dal handler: potrebbero cadere dentro un salvataggio o un lock
+        log.info(f"Ricevuto {signal.Signals(signum).name}: arresto del daemon...")
+        _shutdown.set()
+        pipeline = _active_pipeline
+        if pipeline is not None:
+            pipeline.stop()
+    
+    previous_handlers = {sig: signal.signal(sig, handle_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+    _keep_music_service = True
+    log.info(f"Daemon avviato: {phase}, {schedule}")
+    next_run = datetime.now() if DAEMON_RUN_ON_START else schedule.next_after(datetime.now())
+    
+    try:
+        while not _shutdown.is_set():
+            delay = (next_run - datetime.now()).total_seconds()
+            if delay > 0:
+                log.info(f"Prossimo run: {next_run:%Y-%m-%d %H:%M}")
+                if _shutdown.wait(delay):
+                    break
+            
+            started = datetime.now()
+            try:
+                runs[phase]()
+            except Exception as e:
+                log.error(f"Run del daemon fallito: {e}")
+                # Servizio ricreato (con health check) al prossimo run
+                drop_music_service()
+            next_run = schedule.next_after(started)
+    finally:
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+        _keep_music_service = False
+        drop_music_service()
+        # Stato persistito all'uscita (i run lo salvano già alla fine)
+        if _cache_store is not None:
+            save_cache(load_cache())
+        http_transport.close()
+        _shutdown.clear()
+        log.info("Daemon arrestato")
 
 def handle_update_command():
     """Gestisce il comando --update"""
@@ -784,6 +2226,29 @@ def handle_backups_list():
         print(f"{backup['version']:<10} {date_str:<20} {backup['size_mb']} MB{'':<5} {status}")
 
 
+def handle_export_cache(path):
+    """Esporta la cache riutilizzabile in un bundle compresso"""
+    cache = load_cache()
+    counts = export_bundle(cache["store"], path, SHARED_LOOKUP_NAMESPACES, SIMILAR_CACHE_FORMAT)
+    print(f"✅ Cache exported to {path}")
+    print(f"   Similar artist lists: {counts['similar']}")
+    print(f"   Lookups (MusicBrainz, name → MBID): {counts['lookups']}")
+
+
+def handle_import_cache(path):
+    """Unisce un bundle cache allo store locale (vince il dato più recente)"""
+    cache = load_cache()
+    try:
+        counts = import_bundle(cache["store"], path, SHARED_LOOKUP_NAMESPACES, SIMILAR_CACHE_FORMAT)
+    except BundleError as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+    cache["store"].flush()
+    print(f"✅ Cache imported from {path}")
+    print(f"   Similar artist lists: {counts['similar']} of {counts['similar_total']} merged")
+    print(f"   Lookups: {counts['lookups']} of {counts['lookups_total']} merged")
+
+
 def parse_cli_args():
     """Parse command line arguments"""
     import argparse
@@ -794,6 +2259,12 @@ def parse_cli_args():
         epilog="""
 Examples:
   python3 DiscoveryLastFM.py                 # Run normal discovery sync
+  python3 DiscoveryLastFM.py --resume        # Resume an interrupted sync from its checkpoint
+  python3 DiscoveryLastFM.py --discover-only # Queue candidates without touching Lidarr/Headphones
+  python3 DiscoveryLastFM.py --enqueue-only  # Add queued candidates to Lidarr/Headphones
+  python3 DiscoveryLastFM.py --daemon        # Stay resident and sync on a schedule
+  python3 DiscoveryLastFM.py --export-cache cache.bundle.gz  # Export reusable cache data
+  python3 DiscoveryLastFM.py --import-cache cache.bundle.gz  # Merge a cache bundle into this instance
   python3 DiscoveryLastFM.py --update        # Check and install updates
   python3 DiscoveryLastFM.py --update-status # Show update status
   python3 DiscoveryLastFM.py --list-backups  # List available backups
@@ -813,6 +2284,19 @@ Examples:
                        help='Force update even after failed attempts')
     parser.add_argument('--cleanup', action='store_true',
                        help='Clean up temporary files and old backups')
+    parser.add_argument('--resume', action='store_true',
+                       help='Resume an interrupted sync from its last checkpoint')
+    phase = parser.add_mutually_exclusive_group()
+    phase.add_argument('--discover-only', action='store_true',
+                       help='Run discovery (Last.fm, MusicBrainz) and store candidates in the queue')
+    phase.add_argument('--enqueue-only', action='store_true',
+                       help='Add queued candidates to the music service, one write every ENQUEUE_PACE_SECONDS')
+    parser.add_argument('--daemon', action='store_true',
+                       help='Stay resident and run on DAEMON_CRON or every DAEMON_INTERVAL_MINUTES')
+    parser.add_argument('--export-cache', metavar='FILE',
+                       help='Export similar artists and lookups to a compressed cache bundle')
+    parser.add_argument('--import-cache', metavar='FILE',
+                       help='Merge a cache bundle into the local cache (newest entries win)')
     
     return parser.parse_args()
 
@@ -821,6 +2305,8 @@ Examples:
 if __name__ == "__main__":
     import argparse
     
+    setup_logging()
+    
     try:
         args = parse_cli_args()
         
@@ -843,6 +2329,14 @@ if __name__ == "__main__":
             handle_backups_list()
             sys.exit(0)
         
+        if args.export_cache:
+            handle_export_cache(args.export_cache)
+            sys.exit(0)
+        
+        if args.import_cache:
+            handle_import_cache(args.import_cache)
+            sys.exit(0)
+        
         if args.cleanup:
             from utils.updater import create_updater_from_config
             config_dict = {k: v for k, v in globals().items() if k.isupper()}
@@ -868,9 +2362,14 @@ if __name__ == "__main__":
             except Exception as e:
                 log.warning(f"Auto-update check failed: {e}")
         
-        # Normal sync operation
-        validate_configuration()
-        sync()
+        # Normal sync operation (o una sola delle due fasi)
+        validate_configuration(check_service=not args.discover_only)
+        if args.daemon:
+            run_daemon("discover" if args.discover_only else "enqueue" if args.enqueue_only else "sync")
+        elif args.enqueue_only:
+            enqueue_candidates()
+        else:
+            sync(resume=args.resume, discover_only=args.discover_only)
         
     except KeyboardInterrupt:
         log.warning("Interrotto.")
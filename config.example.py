@@ -5,12 +5,20 @@
 
 # === MUSIC SERVICE SELECTION ===
 # Choose your music management service
-# Options: "headphones", "lidarr"
+# Options: "headphones", "lidarr", "composite"
 MUSIC_SERVICE = "headphones"
 
+# === COMPOSITE SERVICE ===
+# Used if MUSIC_SERVICE = "composite": one discovery run feeds every listed backend
+# (each one also needs its own configuration below)
+COMPOSITE_SERVICES = ["lidarr", "headphones"]
+
 # === LAST.FM CONFIGURATION ===
 LASTFM_USERNAME = "your_lastfm_username"
 LASTFM_API_KEY = "your_lastfm_api_key"
+# Optional: several users in one sync (caches and dedup shared). Overrides LASTFM_USERNAME;
+# each entry is a username or a dict with per-user min_plays / recent_months
+# LASTFM_USERS = ["alice", {"username": "bob", "min_plays": 10, "recent_months": 6}]
 
 # === HEADPHONES CONFIGURATION ===
 # Required if MUSIC_SERVICE = "headphones"
@@ -53,10 +61,64 @@ SIMILAR_MATCH_MIN = 0.43       # Minimum similarity match threshold
 MAX_SIMILAR_PER_ART = 20       # Max similar artists per artist
 MAX_POP_ALBUMS = 5             # Max popular albums to fetch per artist
 CACHE_TTL_HOURS = 48           # Cache time-to-live in hours
+SIMILAR_CACHE_MAX_STALE_HOURS = 168  # Serve stale similar artists (refreshed in background) up to this age
+SIMILAR_CACHE_MAX_ENTRIES = 20000    # LRU cap on cached similar-artist lists
+SIMILAR_CACHE_MAX_BYTES = 64 * 1024 * 1024  # LRU cap on cached similar-artist data size
+LOOKUP_CACHE_TTL_DAYS = 30     # Cache lifetime for MusicBrainz classifications and artist name → MBID lookups
+SIMILAR_RANKING = "seed"       # "seed" = first MAX_SIMILAR_PER_ART per seed, "global" = rank all candidates across seeds
+SIMILAR_RANKING_BUDGET = None  # Max candidates per run in "global" mode (None = seeds × MAX_SIMILAR_PER_ART)
+SIMILAR_GRAPH_DEPTH = 1        # Similar-artist hops from each seed (1 = direct similars, up to 3)
+SIMILAR_GRAPH_DECAY = 0.5      # Weight multiplier applied at every hop beyond the first
+SIMILAR_GRAPH_FANOUT = 10      # Strongest neighbours expanded from each node
+
+# === ALBUM EXISTENCE FILTER ===
+ALBUM_FILTER_ENABLED = True         # Bloom filter of library albums to skip existence checks for unknown albums
+ALBUM_FILTER_FP_RATE = 0.01         # Target false-positive rate (positives are always confirmed by the service)
+ALBUM_FILTER_CAPACITY = 200000      # Expected number of albums in the library
+ALBUM_FILTER_REFRESH_HOURS = 24     # Rebuild from a full library snapshot this often (Lidarr)
+
+# === CHECKPOINTS ===
+CHECKPOINT_INTERVAL_SECONDS = 60     # Save sync progress this often (resume with --resume)
+
+# === MISS LEDGER ===
+MISS_RETRY_BASE_DAYS = 1       # Artists/albums the service cannot find are retried after 1, 2, 4, ... days (0 = always retry)
+MISS_RETRY_MAX_DAYS = 32       # Upper bound of the retry backoff
+
+# === INCREMENTAL SYNC ===
+PROCESSED_SKIP_DAYS = 7        # Skip artists processed within this window whose similars/top albums are unchanged (0 = off)
+
+# === DISCOVERY / ENQUEUE PHASES ===
+# --discover-only stores candidates in a queue, --enqueue-only adds them to the music service
+ENQUEUE_PACE_SECONDS = 5       # Seconds between two service writes (artist or album add) in --enqueue-only
+ENQUEUE_MAX_PER_RUN = 0        # Max service writes (artist and album adds) per --enqueue-only run (0 = drain the queue)
+ENQUEUE_MAX_FAILURES = 3       # Consecutive service errors after which --enqueue-only stops (service down)
+
+# === DAEMON MODE (--daemon) ===
+DAEMON_INTERVAL_MINUTES = 1440 # Minutes between the starts of two runs
+DAEMON_CRON = None             # 5-field cron expression, e.g. "0 3 * * *" (overrides the interval)
+DAEMON_RUN_ON_START = True     # Run immediately at startup instead of waiting for the schedule
+
+# === RUN LOCK ===
+RUN_LOCK_MODE = "wait"         # A run started while another is active: "wait" for it or "skip" this run
+RUN_LOCK_TIMEOUT = 3600        # Max seconds to wait in "wait" mode (None = no limit)
 
 # === API RATE LIMITING ===
 REQUEST_LIMIT = 1/5            # Last.fm requests per second (5 requests/5 seconds)
 MBZ_DELAY = 1.1                # MusicBrainz delay between requests (seconds)
+LASTFM_BURST = 5               # Last.fm requests allowed back-to-back after an idle period (token bucket)
+MBZ_BURST = 1                  # MusicBrainz burst (keep 1: MusicBrainz enforces about 1 request/second)
+
+# === PIPELINE ===
+# The sync runs as stages (seeds, similars, top albums, MusicBrainz, service) working in parallel
+PIPELINE_QUEUE_SIZE = 100      # Items buffered between two stages
+PIPELINE_LASTFM_WORKERS = 2    # Workers fetching top albums (Last.fm, still rate limited by REQUEST_LIMIT)
+PIPELINE_MBZ_WORKERS = 2       # Workers classifying albums (MusicBrainz, still rate limited by MBZ_DELAY)
+PIPELINE_SERVICE_WORKERS = 2   # Workers adding artists/albums to Lidarr/Headphones (per stage)
+SYNC_ENGINE = "threads"        # "threads" or "asyncio" (one event loop, requires: pip install aiohttp)
+ASYNC_STAGE_TASKS = 8          # asyncio engine: tasks per stage (PIPELINE_*_WORKERS bound requests in flight per backend)
+
+# === HTTP ===
+HTTP_POOL_MAXSIZE = 10         # Keep-alive connections kept open per API host
 
 # === DEBUGGING ===
 # DEBUG_PRINT = True             # Enable debug print statements
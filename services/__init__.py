@@ -8,7 +8,7 @@ __author__ = "MrRobotoGit"
 
 from .factory import MusicServiceFactory
 from .base import ArtistInfo, AlbumInfo, MusicServiceBase
-from .exceptions import ServiceError, ConfigurationError
+from .exceptions import ServiceError, ConfigurationError, NotFoundError
 
 __all__ = [
     'MusicServiceFactory',
@@ -16,5 +16,6 @@ __all__ = [
     'AlbumInfo',
     'MusicServiceBase',
     'ServiceError',
-    'ConfigurationError'
+    'ConfigurationError',
+    'NotFoundError'
 ]
\ No newline at end of file
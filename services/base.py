@@ -8,6 +8,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 import time
 
+from utils.transport import HTTPTransport, get_transport
+
 
 @dataclass
 class ArtistInfo:
@@ -33,8 +35,13 @@ class AlbumInfo:
 class MusicServiceBase(ABC):
     """Base class per tutti i servizi musicali"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], transport: Optional[HTTPTransport] = None):
         self.config = config
+        # Session HTTP pooled condivise (keep-alive) per le chiamate al servizio
+        self.transport = transport or get_transport()
+        self.last_health: Optional[Dict[str, Any]] = None
+        # MBID degli artisti creati in questo run: i loro album mancano dallo snapshot della libreria
+        self.created_artists: set = set()
         self._validate_config()
     
     @abstractmethod
@@ -49,7 +56,7 @@ class MusicServiceBase(ABC):
     
     @abstractmethod
     def add_artist(self, artist_info: ArtistInfo) -> bool:
-        """Aggiunge artista alla libreria"""
+        """Aggiunge artista alla libreria (NotFoundError se il servizio non lo conosce)"""
         pass
     
     @abstractmethod
@@ -64,7 +71,7 @@ class MusicServiceBase(ABC):
     
     @abstractmethod
     def add_album(self, album_info: AlbumInfo) -> bool:
-        """Aggiunge album alla libreria"""
+        """Aggiunge album alla libreria (NotFoundError se il servizio non lo conosce)"""
         pass
     
     @abstractmethod
@@ -87,26 +94,58 @@ class MusicServiceBase(ABC):
         """Verifica se un album esiste già nel servizio"""
         pass
     
+    def get_library_album_ids(self) -> Optional[set]:
+        """
+        Snapshot degli MBID album presenti in libreria (stessi id di album_exists).
+        None se il servizio non può fornirlo in modo economico.
+        """
+        return None
+    
+    def begin_run(self) -> None:
+        """
+        Inizio di un nuovo run su un'istanza riusata (modalità daemon):
+        azzera lo stato valido per un solo run, come i memo delle richieste
+        """
+        self.created_artists.clear()
+    
+    def artist_created(self, mbid: str) -> bool:
+        """True se add_artist ha creato l'artista in questo run (non esisteva già)"""
+        return mbid in self.created_artists
+    
+    def close(self) -> None:
+        """
+        Rilascia le risorse proprie del servizio (thread, pool); le session
+        HTTP appartengono al transport condiviso e non vengono chiuse
+        """
+        pass
+    
     def get_config_requirements(self) -> Dict[str, Any]:
         """Ritorna i requisiti di configurazione per questo servizio"""
         return {"note": "Override in subclass for specific requirements"}
     
     def health_check(self) -> Dict[str, Any]:
-        """Esegue un health check completo del servizio"""
+        """Esegue un health check completo del servizio (risultato in last_health)"""
         try:
             connection_ok = self.test_connection()
             service_info = self.get_service_info()
             
-            return {
+            self.last_health = {
                 "status": "healthy" if connection_ok else "unhealthy",
                 "connection": connection_ok,
                 "service_info": service_info,
                 "timestamp": time.time()
             }
         except Exception as e:
-            return {
+            self.last_health = {
                 "status": "error",
                 "connection": False,
                 "error": str(e),
                 "timestamp": time.time()
-            }
\ No newline at end of file
+            }
+        return self.last_health
+    
+    def describe(self) -> Dict[str, Any]:
+        """Info servizio dall'ultimo health check se c'è, senza nuove richieste"""
+        if self.last_health and "service_info" in self.last_health:
+            return self.last_health["service_info"]
+        return self.get_service_info()
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+DiscoveryLastFM v2.1 - Composite Service
+Più servizi musicali alimentati dallo stesso run di discovery
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .base import MusicServiceBase, ArtistInfo, AlbumInfo
+from .exceptions import ServiceError, ConfigurationError, NotFoundError
+from .factory import MusicServiceFactory
+
+log = logging.getLogger(__name__)
+
+
+class CompositeService(MusicServiceBase):
+    """
+    Servizio composto dai backend elencati in COMPOSITE_SERVICES
+
+    add_artist, add_album, queue_album, refresh_artist e force_search vengono
+    inviati a tutti i backend in parallelo. Gli errori restano isolati per
+    backend: l'operazione riesce se almeno un backend la completa e
+    NotFoundError viene rilanciato solo se nessun backend conosce la risorsa.
+    Un album risulta già presente solo se lo è in tutti i backend e viene
+    inviato solo a quelli a cui manca. Se qualche backend fallisce l'album,
+    queue_album solleva ServiceError anche se altri l'hanno accodato: il
+    chiamante non lo registra in added_albums e lo ritenta (con il backoff
+    del ledger dei fallimenti) solo sui backend che ancora non lo hanno.
+    Un backend non raggiungibile all'avvio viene escluso dal run.
+    """
+
+    def __init__(self, config, transport=None):
+        super().__init__(config, transport)
+        names = [name.lower() for name in config["COMPOSITE_SERVICES"]]
+        # Ogni worker dello stadio servizio della pipeline può inviare a tutti i backend
+        workers = len(names) * config.get("PIPELINE_SERVICE_WORKERS", 2)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="composite")
+        self._lock = threading.Lock()
+        # Per album: backend a cui manca (da album_exists) e esito di add_album
+        # (accettato / fallito), consumati da add_album e queue_album
+        self._album_missing: Dict[str, list] = {}
+        self._album_backends: Dict[str, Dict[str, list]] = {}
+
+        # Creazione (validazione + health check) dei backend in parallelo
+        futures = {
+            name: self._executor.submit(MusicServiceFactory.create_service, name, config, self.transport)
+            for name in names
+        }
+        self.backends: Dict[str, MusicServiceBase] = {}
+        for name, future in futures.items():
+            try:
+                self.backends[name] = future.result()
+            except (ConfigurationError, ServiceError) as e:
+                log.error(f"Backend {name} non disponibile, escluso dal run: {e}")
+        if not self.backends:
+            raise ServiceError("No composite backend available", "composite")
+        self.backend_stats = {name: {"ok": 0, "failed": 0} for name in self.backends}
+
+    def _validate_config(self) -> None:
+        """Validazione di COMPOSITE_SERVICES e della configurazione di ogni backend"""
+        names = self.config.get("COMPOSITE_SERVICES")
+        if not isinstance(names, (list, tuple)) or not names:
+            raise ConfigurationError("COMPOSITE_SERVICES must list the backends, e.g. ['lidarr', 'headphones']",
+                                     ["COMPOSITE_SERVICES"])
+
+        lowered = [name.lower() for name in names]
+        if len(set(lowered)) != len(lowered):
+            raise ConfigurationError(f"Duplicate backend in COMPOSITE_SERVICES: {names}")
+        available = MusicServiceFactory.get_available_services()
+        for name in lowered:
+            if name == "composite" or name not in available:
+                raise ConfigurationError(f"Invalid composite backend '{name}'. Available: "
+                                         f"{', '.join(s for s in available if s != 'composite')}")
+            if not MusicServiceFactory.validate_service_config(name, self.config):
+                raise ConfigurationError(f"Invalid configuration for composite backend {name}")
+
+    # ── dispatch ──
+    def _dispatch(self, call: Callable[[MusicServiceBase], Any], names=None) -> Dict[str, Any]:
+        """call(backend) su tutti i backend (o su names) in parallelo: risultato o eccezione per backend"""
+        futures = {
+            name: self._executor.submit(call, backend)
+            for name, backend in self.backends.items() if names is None or name in names
+        }
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+        return results
+
+    def _combine(self, operation: str, label: str, results: Dict[str, Any]) -> bool:
+        """Riuscito se almeno un backend riesce; NotFoundError se nessuno conosce la risorsa"""
+        failed = {name: result for name, result in results.items()
+                  if isinstance(result, Exception) or not result}
+        with self._lock:
+            for name in results:
+                self.backend_stats[name]["failed" if name in failed else "ok"] += 1
+        for name, result in failed.items():
+            reason = result if isinstance(result, Exception) else "failed"
+            log.warning(f"[{name}] {operation} {label}: {reason}")
+
+        if len(failed) < len(results):
+            return True
+        if failed and all(isinstance(result, NotFoundError) for result in failed.values()):
+            raise NotFoundError(f"{label} not found in any backend ({', '.join(failed)})", "composite")
+        return False
+
+    # ── operazioni ──
+    def test_connection(self) -> bool:
+        """Connesso se almeno un backend risponde (esito dell'health check di creazione se c'è)"""
+        def connected(backend):
+            health = backend.last_health
+            return health["connection"] if health else backend.test_connection()
+        results = self._dispatch(connected)
+        return any(result is True for result in results.values())
+
+    def add_artist(self, artist_info: ArtistInfo) -> bool:
+        results = self._dispatch(lambda backend: backend.add_artist(artist_info))
+        return self._combine("add_artist", artist_info.name, results)
+
+    def get_artist(self, mbid: str) -> Optional[ArtistInfo]:
+        """Primo backend (nell'ordine di COMPOSITE_SERVICES) che conosce l'artista"""
+        results = self._dispatch(lambda backend: backend.get_artist(mbid))
+        for result in results.values():
+            if isinstance(result, ArtistInfo):
+                return result
+        return None
+
+    def refresh_artist(self, mbid: str) -> bool:
+        results = self._dispatch(lambda backend: backend.refresh_artist(mbid))
+        return any(result is True for result in results.values())
+
+    def add_album(self, album_info: AlbumInfo) -> bool:
+        """Aggiunge l'album ai backend a cui manca (tutti se album_exists non li ha indicati)"""
+        with self._lock:
+            names = self._album_missing.pop(album_info.mbid, None)
+        results = self._dispatch(lambda backend: backend.add_album(album_info), names)
+        outcome = {
+            "accepted": [name for name, result in results.items() if result is True],
+            # Un backend che non conosce l'album non lo riceverà mai: non è un fallimento da ritentare
+            "failed": [name for name, result in results.items()
+                       if result is not True and not isinstance(result, NotFoundError)],
+        }
+        if outcome["accepted"]:
+            with self._lock:
+                self._album_backends[album_info.mbid] = outcome
+        return self._combine("add_album", album_info.title, results)
+
+    def queue_album(self, album_info: AlbumInfo, force_new: bool = False) -> bool:
+        """
+        Accoda l'album sui backend che lo hanno accettato. ServiceError se un
+        backend ha fallito add o queue mentre altri l'hanno accodato.
+        """
+        with self._lock:
+            outcome = self._album_backends.pop(album_info.mbid, None)
+        names = outcome["accepted"] if outcome else None
+        results = self._dispatch(lambda backend: backend.queue_album(album_info, force_new), names)
+        queued = self._combine("queue_album", album_info.title, results)
+        failed = (outcome["failed"] if outcome else []) + \
+            [name for name, result in results.items() if result is not True]
+        if queued and failed:
+            raise ServiceError(f"Album {album_info.title} not completed on {', '.join(failed)}", "composite")
+        return queued
+
+    def force_search(self) -> bool:
+        results = self._dispatch(lambda backend: backend.force_search())
+        return any(result is True for result in results.values())
+
+    def album_exists(self, mbid: str, added_albums: set) -> bool:
+        """
+        Presente solo se lo è in tutti i backend (un errore conta come assente);
+        i backend a cui manca vengono ricordati per il successivo add_album
+        """
+        if mbid in added_albums:
+            return True
+        results = self._dispatch(lambda backend: backend.album_exists(mbid, added_albums))
+        missing = [name for name, result in results.items() if result is not True]
+        if missing:
+            with self._lock:
+                self._album_missing[mbid] = missing
+        return not missing
+
+    def get_library_album_ids(self) -> Optional[set]:
+        """Album presenti in tutti i backend (None se un backend non fornisce lo snapshot)"""
+        results = self._dispatch(lambda backend: backend.get_library_album_ids())
+        snapshots = list(results.values())
+        if any(not isinstance(snapshot, set) for snapshot in snapshots):
+            return None
+        return set.intersection(*snapshots)
+
+    def artist_created(self, mbid: str) -> bool:
+        return any(backend.artist_created(mbid) for backend in self.backends.values())
+
+    def begin_run(self) -> None:
+        super().begin_run()
+        for backend in self.backends.values():
+            backend.begin_run()
+            backend.last_health = None
+        with self._lock:
+            self._album_missing.clear()
+            self._album_backends.clear()
+
+    def close(self) -> None:
+        """Chiude il pool di dispatch e i backend"""
+        for backend in self.backends.values():
+            backend.close()
+        self._executor.shutdown(wait=True)
+
+    def get_service_info(self) -> Dict[str, Any]:
+        """Info dei backend (dall'health check se disponibile) e esiti per backend"""
+        return {
+            "service": "composite",
+            "backends": {name: backend.describe() for name, backend in self.backends.items()},
+            "backend_stats": {name: dict(stats) for name, stats in self.backend_stats.items()},
+        }
+
+    @classmethod
+    def get_config_requirements(cls) -> Dict[str, Any]:
+        """Requisiti di configurazione del servizio composto"""
+        return {
+            "required": ["COMPOSITE_SERVICES"],
+            "note": "Each listed backend also needs its own configuration (LIDARR_*, HP_*)"
+        }
@@ -4,8 +4,10 @@ Factory pattern per creazione servizi con validazione completa
 """
 
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
+from utils.single_flight import freeze
+from utils.transport import HTTPTransport, get_transport
 from .base import MusicServiceBase
 from .exceptions import ConfigurationError, ServiceError
 
@@ -16,6 +18,7 @@ class MusicServiceFactory:
     """Factory per creazione servizi con validazione completa"""
     
     _services = {}  # Will be populated when services are imported
+    _validated = set()  # (servizio, config) già validati: la validazione non si ripete
     
     @classmethod
     def register_service(cls, name: str, service_class):
@@ -24,8 +27,9 @@ class MusicServiceFactory:
         log.debug(f"Registered service: {name}")
     
     @classmethod
-    def create_service(cls, service_type: str, config: Dict[str, Any]) -> MusicServiceBase:
-        """Crea un servizio con validazione completa"""
+    def create_service(cls, service_type: str, config: Dict[str, Any],
+                       transport: Optional[HTTPTransport] = None) -> MusicServiceBase:
+        """Crea un servizio con validazione completa (transport: session HTTP condivise)"""
         service_type = service_type.lower()
         
         # Verifica che i servizi siano stati registrati
@@ -39,13 +43,12 @@ class MusicServiceFactory:
         service_class = cls._services[service_type]
         
         try:
-            # Validazione configurazione prima dell'instanziazione
-            log.debug(f"Validating configuration for {service_type}...")
+            # Validazione configurazione prima dell'instanziazione (riusata se già fatta)
             if not cls.validate_service_config(service_type, config):
                 raise ConfigurationError(f"Invalid configuration for {service_type}")
             
             log.info(f"Creating {service_type} service...")
-            service = service_class(config)
+            service = service_class(config, transport=transport)
             
             # Test connessione durante la creazione con health check
             log.info(f"Testing {service_type} connection...")
@@ -70,10 +73,26 @@ class MusicServiceFactory:
         """Ritorna lista servizi disponibili"""
         return list(cls._services.keys())
     
+    @staticmethod
+    def _config_key(service_type: str, config: Dict[str, Any]):
+        """Chiave della validazione (None se la config contiene valori non hashable)"""
+        try:
+            key = (service_type.lower(), freeze(config))
+            hash(key)
+            return key
+        except TypeError:
+            return None
+    
     @classmethod 
     def validate_service_config(cls, service_type: str, config: Dict[str, Any]) -> bool:
-        """Validazione config senza instanziare servizio"""
+        """Validazione config senza instanziare servizio (esito positivo memorizzato)"""
+        key = cls._config_key(service_type, config)
+        if key is not None and key in cls._validated:
+            log.debug(f"Configuration for {service_type} already validated")
+            return True
+        
         try:
+            log.debug(f"Validating configuration for {service_type}...")
             service_class = cls._services.get(service_type.lower())
             if not service_class:
                 log.warning(f"Service {service_type} not found for validation")
@@ -82,9 +101,12 @@ class MusicServiceFactory:
             # Validazione dry-run creando istanza temporanea
             temp_service = service_class.__new__(service_class)
             temp_service.config = config
+            temp_service.transport = get_transport()
             temp_service._validate_config()
             
             log.debug(f"Configuration valid for {service_type}")
+            if key is not None:
+                cls._validated.add(key)
             return True
             
         except Exception as e:
@@ -129,6 +151,15 @@ def _register_available_services():
     except Exception as e:
         log.error(f"Failed to register LidarrService: {e}")
     
+    try:
+        from .composite import CompositeService
+        MusicServiceFactory.register_service("composite", CompositeService)
+        services_registered.append("composite")
+    except ImportError as e:
+        log.error(f"CompositeService not available: {e}")
+    except Exception as e:
+        log.error(f"Failed to register CompositeService: {e}")
+    
     if not services_registered:
         raise ImportError("No music services could be registered")
     
@@ -9,6 +9,7 @@ import urllib.parse
 import requests
 from typing import Dict, Any, Optional
 
+from utils import json_codec
 from .base import MusicServiceBase, ArtistInfo, AlbumInfo
 from .exceptions import ServiceError, ConfigurationError, ConnectionError
 
@@ -52,7 +53,7 @@ class HeadphonesService(MusicServiceBase):
                 if self.config.get("DEBUG_PRINT", False):
                     print(f"[DEBUG] HP  → {base}?{urllib.parse.urlencode(params)} (tentativo {attempt+1}/{max_retries})")
                 
-                response = requests.get(base, params=params, timeout=timeout)
+                response = self.transport.get(base, params=params, timeout=timeout)
                 
                 if self.config.get("DEBUG_PRINT", False):
                     print(f"[DEBUG] HP  ← {response.status_code}")
@@ -66,7 +67,7 @@ class HeadphonesService(MusicServiceBase):
                 
                 response.raise_for_status()
                 ct = response.headers.get("Content-Type", "")
-                return response.json() if ct.startswith("application/json") else response.text
+                return json_codec.response_json(response) if ct.startswith("application/json") else response.text
                 
             except requests.exceptions.Timeout:
                 log.warning(f"Timeout per {cmd}, tentativo {attempt+1}/{max_retries}")
@@ -97,7 +98,11 @@ class HeadphonesService(MusicServiceBase):
         """Aggiunge artista a Headphones"""
         try:
             result = self._hp_request("addArtist", id=artist_info.mbid)
-            return result is not None
+            if result is None:
+                return False
+            # addArtist non distingue un artista nuovo da uno già presente
+            self.created_artists.add(artist_info.mbid)
+            return True
         except Exception as e:
             log.error(f"HP add_artist failed for {artist_info.name}: {e}")
             return False
@@ -8,17 +8,31 @@ import time
 import requests
 from typing import Dict, Any, Optional
 
+from utils import json_codec
+from utils.single_flight import SingleFlight, freeze
 from .base import MusicServiceBase, ArtistInfo, AlbumInfo
-from .exceptions import ServiceError, ConfigurationError, ConnectionError, RateLimitError
+from .exceptions import ServiceError, ConfigurationError, ConnectionError, RateLimitError, NotFoundError
 
 log = logging.getLogger(__name__)
 
+# Risorse i cui GET in memo vanno invalidati da una scrittura sull'endpoint
+# (un comando come RefreshArtist/AlbumSearch può cambiare gli album dell'artista)
+WRITE_INVALIDATES = {
+    "artist": ("artist", "album"),
+    "album": ("album",),
+    "command": ("album",),
+}
+
 
 class LidarrService(MusicServiceBase):
     """Implementazione completa per Lidarr API v1.0+"""
     
-    def __init__(self, config):
-        super().__init__(config)
+    # Profili per endpoint, condivisi fra la validazione a secco della factory
+    # e l'istanza creata subito dopo (azzerati a ogni run da begin_run)
+    _profiles = SingleFlight(max_entries=16)
+    
+    def __init__(self, config, transport=None):
+        super().__init__(config, transport)
         # Performance metrics tracking
         self.operation_stats = {
             "total_requests": 0,
@@ -28,6 +42,8 @@ class LidarrService(MusicServiceBase):
             "slow_operations": 0,
             "server_unavailable_503": 0
         }
+        # GET identici (es. GET /artist da get_artist) condivisi e in memo per il run
+        self._flight = SingleFlight()
     
     def _validate_config(self) -> None:
         """Validazione configurazione Lidarr"""
@@ -51,21 +67,50 @@ class LidarrService(MusicServiceBase):
         try:
             # Test quality profile
             quality_id = self.config.get("LIDARR_QUALITY_PROFILE_ID", 1)
-            profiles = self._lidarr_request("GET", "qualityprofile")
+            profiles = self._get_profiles("qualityprofile")
             if profiles and not any(p.get("id") == quality_id for p in profiles):
                 log.warning(f"Quality profile {quality_id} not found in Lidarr")
             
             # Test metadata profile
             metadata_id = self.config.get("LIDARR_METADATA_PROFILE_ID", 1)
-            metadata_profiles = self._lidarr_request("GET", "metadataprofile")
+            metadata_profiles = self._get_profiles("metadataprofile")
             if metadata_profiles and not any(p.get("id") == metadata_id for p in metadata_profiles):
                 log.warning(f"Metadata profile {metadata_id} not found in Lidarr")
                 
         except Exception as e:
             log.warning(f"Profile validation failed (continuing): {e}")
     
+    def _get_profiles(self, endpoint: str) -> Any:
+        """Profili quality/metadata, una sola richiesta per endpoint Lidarr e run"""
+        key = (self.config["LIDARR_ENDPOINT"].rstrip("/"), endpoint)
+        return self._profiles.do(key, lambda: self._lidarr_call("GET", endpoint))
+    
     def _lidarr_request(self, method: str, endpoint: str, **kwargs) -> Any:
-        """Richiesta unificata con retry logic e timeout differenziati"""
+        """
+        Richiesta unificata: i GET passano dal single-flight (una chiamata in volo
+        per endpoint e parametri, risultato in memo), le scritture invalidano il
+        memo delle risorse che toccano
+        """
+        flight = getattr(self, "_flight", None)
+        if flight is None:
+            # Validazione a secco (istanza creata senza __init__)
+            return self._lidarr_call(method, endpoint, **kwargs)
+        
+        if method == "GET":
+            key = (endpoint, freeze(kwargs.get("params")))
+            return flight.do(key, lambda: self._lidarr_call(method, endpoint, **kwargs))
+        
+        try:
+            return self._lidarr_call(method, endpoint, **kwargs)
+        finally:
+            resources = WRITE_INVALIDATES.get(endpoint.split("/")[0])
+            if resources is None:
+                flight.invalidate()
+            else:
+                flight.invalidate(lambda key: key[0].split("/")[0] in resources)
+    
+    def _lidarr_call(self, method: str, endpoint: str, **kwargs) -> Any:
+        """Richiesta HTTP con retry logic e timeout differenziati"""
         url = f"{self.config['LIDARR_ENDPOINT'].rstrip('/')}/api/v1/{endpoint.lstrip('/')}"
         headers = {
             "X-Api-Key": self.config["LIDARR_API_KEY"],
@@ -100,7 +145,7 @@ class LidarrService(MusicServiceBase):
                 if self.config.get("DEBUG_PRINT", False):
                     print(f"[DEBUG] Lidarr {method} → {url} (attempt {attempt+1}/{max_retries}, timeout={timeout}s)")
                 
-                response = requests.request(
+                response = self.transport.request(
                     method, url, headers=headers, timeout=timeout, **kwargs
                 )
                 
@@ -148,7 +193,7 @@ class LidarrService(MusicServiceBase):
                     raise ServiceError(f"Lidarr server unavailable (503) for {method} {endpoint} after {max_retries} attempts", "lidarr")
                 
                 response.raise_for_status()
-                return response.json() if response.content else None
+                return json_codec.response_json(response) if response.content else None
                 
             except requests.exceptions.Timeout:
                 elapsed = time.time() - start_time
@@ -178,6 +223,12 @@ class LidarrService(MusicServiceBase):
         
         return None
     
+    def begin_run(self) -> None:
+        """La libreria può essere cambiata fra due run: memo dei GET azzerato"""
+        super().begin_run()
+        self._flight.reset()
+        self._profiles.reset()
+    
     def test_connection(self) -> bool:
         """Test connettività e autenticazione Lidarr"""
         try:
@@ -208,8 +259,7 @@ class LidarrService(MusicServiceBase):
             )
             
             if not search_results:
-                log.warning(f"Artist {artist_info.name} not found in Lidarr database")
-                return False
+                raise NotFoundError(f"Artist {artist_info.name} not found in Lidarr database", "lidarr")
             
             artist_data = search_results[0]
             
@@ -236,9 +286,12 @@ class LidarrService(MusicServiceBase):
             result = self._lidarr_request("POST", "artist", json=payload)
             if result:
                 log.info(f"Added artist {artist_info.name} to Lidarr")
+                self.created_artists.add(artist_info.mbid)
                 return True
             return False
             
+        except NotFoundError:
+            raise
         except Exception as e:
             log.error(f"Failed to add artist {artist_info.name}: {e}")
             return False
@@ -305,8 +358,7 @@ class LidarrService(MusicServiceBase):
             )
             
             if not search_results:
-                log.warning(f"Album {album_info.title} not found in Lidarr database")
-                return False
+                raise NotFoundError(f"Album {album_info.title} not found in Lidarr database", "lidarr")
             
             album_data = search_results[0]
             
@@ -332,6 +384,8 @@ class LidarrService(MusicServiceBase):
                 return True
             return False
             
+        except NotFoundError:
+            raise
         except Exception as e:
             log.error(f"Failed to add album {album_info.title}: {e}")
             return False
@@ -412,6 +466,7 @@ class LidarrService(MusicServiceBase):
                     "errors": self.operation_stats["errors"],
                     "slow_operations": self.operation_stats["slow_operations"],
                     "server_unavailable_503": self.operation_stats["server_unavailable_503"],
+                    "deduplicated_requests": self._flight.coalesced + self._flight.memo_hits,
                     "health_status": "degraded" if self.operation_stats["server_unavailable_503"] >= 3 else "healthy"
                 }
             }
@@ -432,19 +487,12 @@ class LidarrService(MusicServiceBase):
             return True
             
         try:
-            # Cerca in tutti gli album di Lidarr
-            artists = self._lidarr_request("GET", "artist")
-            if not artists:
-                return False
-                
-            for artist in artists:
-                albums = self._lidarr_request("GET", "album", params={"artistId": artist["id"]})
-                if albums:
-                    for album in albums:
-                        if album.get("foreignAlbumId") == mbid:
-                            if self.config.get("DEBUG_PRINT", False):
-                                print(f"[DEBUG] Album {mbid} trovato in Lidarr")
-                            return True
+            # Lookup diretto per foreignAlbumId invece di scorrere tutti gli artisti
+            albums = self._lidarr_request("GET", "album", params={"foreignAlbumId": mbid})
+            if albums and any(album.get("foreignAlbumId") == mbid for album in albums):
+                if self.config.get("DEBUG_PRINT", False):
+                    print(f"[DEBUG] Album {mbid} trovato in Lidarr")
+                return True
             
             if self.config.get("DEBUG_PRINT", False):
                 print(f"[DEBUG] Album {mbid} non trovato in Lidarr")
@@ -454,6 +502,17 @@ class LidarrService(MusicServiceBase):
             log.error(f"Lidarr album_exists failed for {mbid}: {e}")
             return False
     
+    def get_library_album_ids(self) -> Optional[set]:
+        """Tutti i foreignAlbumId della libreria Lidarr in una sola richiesta"""
+        try:
+            albums = self._lidarr_request("GET", "album")
+            if albums is None:
+                return None
+            return {album["foreignAlbumId"] for album in albums if album.get("foreignAlbumId")}
+        except Exception as e:
+            log.error(f"Lidarr library snapshot failed: {e}")
+            return None
+    
     @classmethod
     def get_config_requirements(cls) -> Dict[str, Any]:
         """Requisiti di configurazione per Lidarr"""
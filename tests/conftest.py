@@ -0,0 +1,57 @@
+"""
+DiscoveryLastFM v2.1 - Test Fixtures
+Modulo DiscoveryLastFM isolato per le sync contro il servizio finto
+"""
+
+import pytest
+
+import DiscoveryLastFM as D
+from services import MusicServiceFactory
+
+from .fakes import FakeService, fake_lastfm, fake_musicbrainz, fake_lastfm_async, fake_musicbrainz_async
+
+
+@pytest.fixture
+def discovery(tmp_path, monkeypatch):
+    """
+    Modulo DiscoveryLastFM isolato: file di stato in tmp_path, servizio
+    "fake" e API simulate
+    """
+    for name in ("CACHE_FILE", "CACHE_DB", "ADDED_ALBUMS_FILE", "ALBUM_FILTER_FILE",
+                 "RUN_LOCK_FILE", "ENQUEUE_LOCK_FILE"):
+        monkeypatch.setattr(D, name, tmp_path / getattr(D, name).name)
+    for name in ("_cache_store", "_added_albums", "_album_filter", "_miss_ledger",
+                 "_processed_ledger", "_music_service"):
+        monkeypatch.setattr(D, name, None)
+    monkeypatch.setattr(D, "_keep_music_service", False)
+
+    # Configurazione indipendente da un eventuale config.py locale
+    config = {
+        "MUSIC_SERVICE": "fake", "LASTFM_USERNAME": "tester", "LASTFM_USERS": None,
+        "MIN_PLAYS": 2, "SIMILAR_MATCH_MIN": 0.43, "MAX_SIMILAR_PER_ART": 20, "MAX_POP_ALBUMS": 5,
+        "SIMILAR_RANKING": "seed", "SIMILAR_GRAPH_DEPTH": 1, "SYNC_ENGINE": "threads",
+        "CHECKPOINT_INTERVAL_SECONDS": 0, "DEBUG_PRINT": False,
+        "ENQUEUE_PACE_SECONDS": 0, "ENQUEUE_MAX_PER_RUN": 0, "ENQUEUE_MAX_FAILURES": 3,
+    }
+    for name, value in config.items():
+        monkeypatch.setattr(D, name, value, raising=False)
+
+    calls = []
+    monkeypatch.setattr(FakeService, "calls", calls)
+    monkeypatch.setitem(MusicServiceFactory._services, "fake", FakeService)
+    monkeypatch.setattr(D, "lf_request", fake_lastfm)
+    monkeypatch.setattr(D, "mbz_request", fake_musicbrainz)
+    monkeypatch.setattr(D, "lf_request_async", fake_lastfm_async)
+    monkeypatch.setattr(D, "mbz_request_async", fake_musicbrainz_async)
+    yield D
+
+    if D._cache_store is not None:
+        D._cache_store.close()
+    if D._added_albums is not None:
+        D._added_albums.close()
+
+
+@pytest.fixture
+def service_calls(discovery):
+    """Chiamate ricevute dal servizio finto, in ordine: (metodo, mbid)"""
+    return FakeService.calls
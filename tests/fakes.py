@@ -0,0 +1,101 @@
+"""
+DiscoveryLastFM v2.1 - Test Fakes
+Servizio musicale finto e risposte Last.fm/MusicBrainz simulate
+"""
+
+import uuid
+
+from services import MusicServiceBase
+
+
+def mbid(key):
+    """MBID deterministico per gli id finti"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+
+# Ascolti recenti: A 2 volte, B 3 volte, C 1 volta (sotto MIN_PLAYS = 2)
+RECENT_ARTISTS = "AABBBC"
+SIMILARS = {
+    "m-A": [("s1", 0.9), ("s2", 0.5)],
+    "m-B": [("s2", 0.95), ("s3", 0.7)],
+}
+TOP_ALBUMS = ("r1", "r2")
+
+
+def expected_album(artist, release):
+    """Release group dell'album top `release` dell'artista simile"""
+    return mbid("rg-" + mbid(f"{artist}-{release}"))
+
+
+EXPECTED_ARTISTS = {"m-A", "m-B", "s1", "s2", "s3"}
+EXPECTED_ALBUMS = {expected_album(s, r) for s in ("s1", "s2", "s3") for r in TOP_ALBUMS}
+
+
+class FakeService(MusicServiceBase):
+    """Servizio musicale in memoria: registra le chiamate in `calls`"""
+
+    calls = []
+
+    def _validate_config(self):
+        pass
+
+    def test_connection(self):
+        return True
+
+    def add_artist(self, artist_info):
+        self.calls.append(("add_artist", artist_info.mbid))
+        return True
+
+    def get_artist(self, mbid):
+        return None
+
+    def refresh_artist(self, mbid):
+        return True
+
+    def add_album(self, album_info):
+        self.calls.append(("add_album", album_info.mbid))
+        return True
+
+    def queue_album(self, album_info, force_new=False):
+        return True
+
+    def force_search(self):
+        return True
+
+    def get_service_info(self):
+        return {"service": "fake"}
+
+    def album_exists(self, mbid, added_albums):
+        return mbid in added_albums
+
+
+def fake_lastfm(method, **params):
+    if method == "user.getRecentTracks":
+        tracks = [{"artist": {"#text": name}} for name in RECENT_ARTISTS]
+        return {"recenttracks": {"@attr": {"totalPages": 1}, "track": tracks}}
+    if method == "artist.getInfo":
+        return {"artist": {"mbid": "m-" + params["artist"]}}
+    if method == "artist.getSimilar":
+        similars = SIMILARS.get(params["mbid"], [])
+        return {"similarartists": {"artist": [
+            {"mbid": sid, "name": sid.upper(), "match": str(match)} for sid, match in similars
+        ]}}
+    if method == "artist.getTopAlbums":
+        return {"topalbums": {"album": [
+            {"mbid": mbid(f"{params['mbid']}-{release}"), "name": release.upper()} for release in TOP_ALBUMS
+        ]}}
+    return None
+
+
+def fake_musicbrainz(path, **params):
+    if path.startswith("release/"):
+        return {"release-group": {"id": mbid("rg-" + path.split("/")[1])}}
+    return {"primary-type": "Album", "secondary-types": []}
+
+
+async def fake_lastfm_async(method, **params):
+    return fake_lastfm(method, **params)
+
+
+async def fake_musicbrainz_async(path, **params):
+    return fake_musicbrainz(path, **params)
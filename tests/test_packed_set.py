@@ -0,0 +1,113 @@
+"""
+DiscoveryLastFM v2.1 - Packed UUID Set Tests
+Set append-only su file ordinato + log, merge fra più istanze
+"""
+
+import uuid
+from collections.abc import MutableSet, Set
+
+import pytest
+
+from utils.packed_set import PackedUUIDSet, RECORD_SIZE
+
+
+def ids(count):
+    return [str(uuid.uuid4()) for _ in range(count)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "added_albums.bin"
+
+
+def test_add_contains_and_sorted_iteration(path):
+    packed = PackedUUIDSet(path)
+    values = ids(20)
+    for value in values:
+        packed.add(value)
+    packed.add(values[0])
+    assert len(packed) == 20
+    assert all(value in packed for value in values)
+    assert str(uuid.uuid4()) not in packed
+    assert list(packed) == sorted(values, key=lambda v: uuid.UUID(v).bytes)
+
+
+def test_log_survives_reopen_without_merge(path):
+    values = ids(3)
+    packed = PackedUUIDSet(path)
+    for value in values:
+        packed.add(value)
+    assert not path.exists()
+    reopened = PackedUUIDSet(path)
+    assert set(reopened) == set(values)
+
+
+def test_truncated_log_record_is_ignored(path):
+    value = ids(1)[0]
+    packed = PackedUUIDSet(path)
+    packed.add(value)
+    with open(packed.log_path, "ab") as f:
+        f.write(b"\x01" * (RECORD_SIZE // 2))
+    assert set(PackedUUIDSet(path)) == {value}
+
+
+def test_merge_threshold_and_update(path):
+    packed = PackedUUIDSet(path, merge_threshold=4)
+    for value in ids(4):
+        packed.add(value)
+    assert path.stat().st_size == 4 * RECORD_SIZE
+    assert not packed.log_path.exists()
+    # update fonde una sola volta alla fine
+    packed.update(ids(10))
+    assert path.stat().st_size == 14 * RECORD_SIZE
+    assert not packed.log_path.exists()
+
+
+def test_merge_across_two_instances(path):
+    first, second = PackedUUIDSet(path), PackedUUIDSet(path)
+    a, b = ids(5), ids(5)
+    for value in a:
+        first.add(value)
+    for value in b:
+        second.add(value)
+    first.merge()
+    # second ha ancora in memoria solo i suoi id: il merge rilegge lo stato su disco
+    second.merge()
+    expected = set(a) | set(b)
+    assert set(first) >= set(a)
+    assert set(second) == expected
+    assert set(PackedUUIDSet(path)) == expected
+    assert path.stat().st_size == len(expected) * RECORD_SIZE
+
+
+def test_merge_after_other_instance_merged(path):
+    first, second = PackedUUIDSet(path), PackedUUIDSet(path)
+    a = ids(3)
+    first.update(a)
+    b = ids(3)
+    for value in b:
+        second.add(value)
+    second.merge()
+    assert set(second) == set(a) | set(b)
+    first.merge()
+    assert set(first) == set(a) | set(b)
+
+
+def test_non_uuid_ids_stay_in_memory(path):
+    packed = PackedUUIDSet(path)
+    packed.add("not-a-uuid")
+    assert "not-a-uuid" in packed
+    packed.merge()
+    assert "not-a-uuid" not in PackedUUIDSet(path)
+
+
+def test_append_only_set_interface(path):
+    packed = PackedUUIDSet(path)
+    value = ids(1)[0]
+    packed.add(value)
+    assert isinstance(packed, Set)
+    assert not isinstance(packed, MutableSet)
+    assert not hasattr(packed, "discard")
+    union = packed | {"x"}
+    assert type(union) is set and union == {value, "x"}
+    assert packed & {value} == {value}
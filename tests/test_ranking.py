@@ -0,0 +1,81 @@
+"""
+DiscoveryLastFM v2.1 - Ranking Tests
+Ranking globale dei candidati: percorso NumPy e puro Python
+"""
+
+import random
+
+import pytest
+
+from utils import ranking
+from utils.ranking import rank_candidates
+
+SEEDS = [
+    (40, [("a", "A", 0.9), ("b", "B", 0.5), ("c", "C", 0.3)]),
+    (20, [("b", "B", 0.8), ("d", "D", 0.6), ("", "NoMbid", 1.0)]),
+    (10, [("c", "C", 0.4), ("b", "B", 0.2), ("b", "B", 0.7)]),
+]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Esegue il test con NumPy (se installato) e con il fallback puro Python"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(ranking, "np", None)
+    return request.param
+
+
+def scores(ranked):
+    return {mbid: score for mbid, _name, score in ranked}
+
+
+def test_scores_weighted_by_normalized_play_counts(backend):
+    ranked = rank_candidates(SEEDS, 0.25, 10)
+    # Pesi normalizzati: 1, 0.5, 0.25; per seed conta il match più alto del candidato
+    assert scores(ranked) == pytest.approx({
+        "a": 0.9,
+        "b": 0.5 + 0.5 * 0.8 + 0.25 * 0.7,
+        "c": 0.3 + 0.25 * 0.4,
+        "d": 0.5 * 0.6,
+    })
+    assert [mbid for mbid, _name, _score in ranked] == ["b", "a", "c", "d"]
+    assert ranked[0][1] == "B"
+
+
+def test_min_match_and_budget(backend):
+    ranked = rank_candidates(SEEDS, 0.5, 2)
+    assert [mbid for mbid, _name, _score in ranked] == ["b", "a"]
+    assert "c" not in scores(rank_candidates(SEEDS, 0.5, 10))
+
+
+def test_empty_input(backend):
+    assert rank_candidates([], 0.0, 10) == []
+    assert rank_candidates(SEEDS, 0.0, 0) == []
+    assert rank_candidates([(5, [])], 0.0, 10) == []
+
+
+def test_ties_keep_first_seen_order(backend):
+    seeds = [(1, [("x", "X", 0.5), ("y", "Y", 0.5), ("z", "Z", 0.5)])]
+    assert [mbid for mbid, _name, _score in rank_candidates(seeds, 0.0, 3)] == ["x", "y", "z"]
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(42)
+    pool = [(f"m{i}", f"Artist {i}") for i in range(60)]
+    for _ in range(20):
+        # Pesi potenze di 2 e match multipli di 1/8: somme esatte, pari merito confrontabili
+        seeds = [
+            (2 ** rng.randint(0, 6),
+             [(mbid, name, rng.randint(0, 8) / 8) for mbid, name in rng.sample(pool, rng.randint(0, 25))])
+            for _ in range(rng.randint(1, 8))
+        ]
+        budget = rng.randint(1, 40)
+        with_numpy = rank_candidates(seeds, 0.25, budget)
+        monkeypatch.setattr(ranking, "np", None)
+        pure = rank_candidates(seeds, 0.25, budget)
+        monkeypatch.undo()
+        assert [(mbid, name) for mbid, name, _score in with_numpy] == [(mbid, name) for mbid, name, _score in pure]
+        assert [score for _m, _n, score in with_numpy] == pytest.approx([score for _m, _n, score in pure])
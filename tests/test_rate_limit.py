@@ -0,0 +1,116 @@
+"""
+DiscoveryLastFM v2.1 - Rate Limit Tests
+Token bucket con orologio monotono simulato
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import TokenBucket
+
+
+class FakeClock:
+    """time.monotonic/time.sleep simulati: sleep fa avanzare l'orologio"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_burst_then_one_call_per_delay(clock):
+    bucket = TokenBucket(1.0, burst=3)
+    waits = [bucket.reserve() for _ in range(5)]
+    # Le prime burst partono subito, le successive si mettono in coda
+    assert waits == [0.0, 0.0, 0.0, 1.0, 2.0]
+    assert bucket.stats() == {"calls": 5, "waits": 2, "waited": 3.0}
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(1.0, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 100
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 1.0]
+
+
+def test_partial_refill(clock):
+    bucket = TokenBucket(2.0, burst=1)
+    assert bucket.reserve() == 0.0
+    clock.now += 0.5
+    assert bucket.reserve() == pytest.approx(1.5)
+
+
+def test_acquire_sleeps_its_turn(clock):
+    bucket = TokenBucket(0.5, burst=1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.5
+    assert bucket.acquire() == 0.5
+    assert clock.slept == [0.5, 0.5]
+
+
+def test_disabled_when_delay_not_positive(clock):
+    bucket = TokenBucket(0)
+    assert [bucket.reserve() for _ in range(10)] == [0.0] * 10
+    assert bucket.stats() == {"calls": 10, "waits": 0, "waited": 0.0}
+
+
+def test_invalid_burst():
+    with pytest.raises(ValueError):
+        TokenBucket(1.0, burst=0)
+
+
+def test_reset_stats(clock):
+    bucket = TokenBucket(1.0)
+    bucket.reserve()
+    bucket.reserve()
+    bucket.reset_stats()
+    assert bucket.stats() == {"calls": 0, "waits": 0, "waited": 0.0}
+    # Il saldo dei token non viene toccato
+    assert bucket.reserve() == 2.0
+
+
+def test_threads_reserve_distinct_slots(clock):
+    bucket = TokenBucket(1.0, burst=2)
+    waits = []
+    lock = threading.Lock()
+
+    def worker():
+        wait = bucket.reserve()
+        with lock:
+            waits.append(wait)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(waits) == [0.0, 0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+
+def test_acquire_async_shares_the_bucket():
+    bucket = TokenBucket(0.05, burst=1)
+
+    async def main():
+        return await asyncio.gather(*(bucket.acquire_async() for _ in range(3)))
+
+    waits = asyncio.run(main())
+    assert waits[0] == 0.0
+    assert sorted(waits)[1:] == [pytest.approx(0.05, abs=0.02), pytest.approx(0.1, abs=0.02)]
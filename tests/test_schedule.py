@@ -0,0 +1,77 @@
+"""
+DiscoveryLastFM v2.1 - Schedule Tests
+Espressioni cron e intervalli della modalità daemon
+"""
+
+from datetime import datetime
+
+import pytest
+
+from utils.schedule import CronSchedule, IntervalSchedule, ScheduleError, create_schedule
+
+
+def next_run(expression, after):
+    return CronSchedule(expression).next_after(after)
+
+
+def test_next_run_is_strictly_after():
+    assert next_run("0 3 * * *", datetime(2026, 10, 19, 3, 0)) == datetime(2026, 10, 20, 3, 0)
+    assert next_run("0 3 * * *", datetime(2026, 10, 19, 2, 59, 30)) == datetime(2026, 10, 19, 3, 0)
+
+
+def test_steps_and_ranges():
+    assert next_run("*/15 * * * *", datetime(2026, 10, 19, 10, 7)) == datetime(2026, 10, 19, 10, 15)
+    # 5-20/5 = 5, 10, 15, 20: dopo le 10:20 si passa all'ora successiva
+    assert next_run("5-20/5 * * * *", datetime(2026, 10, 19, 10, 20)) == datetime(2026, 10, 19, 11, 5)
+    assert next_run("0 9,18 * * *", datetime(2026, 10, 19, 10, 0)) == datetime(2026, 10, 19, 18, 0)
+
+
+@pytest.mark.parametrize("sunday", ["0", "7"])
+def test_sunday_is_zero_or_seven(sunday):
+    # 2026-10-19 è un lunedì
+    result = next_run(f"0 0 * * {sunday}", datetime(2026, 10, 19, 12, 0))
+    assert result == datetime(2026, 10, 25, 0, 0)
+    assert result.weekday() == 6
+
+
+def test_day_of_month_or_day_of_week():
+    # Entrambi limitati: basta che uno dei due combaci (venerdì 2 prima del 13)
+    assert next_run("0 0 13 * 5", datetime(2026, 10, 1, 12, 0)) == datetime(2026, 10, 2, 0, 0)
+    # Sabato 10: il 13 (martedì) arriva prima del venerdì 16
+    assert next_run("0 0 13 * 5", datetime(2026, 10, 10, 12, 0)) == datetime(2026, 10, 13, 0, 0)
+
+
+def test_single_day_field_restricts_alone():
+    assert next_run("0 0 13 * *", datetime(2026, 10, 1)) == datetime(2026, 10, 13)
+    assert next_run("0 0 * * 5", datetime(2026, 10, 1)) == datetime(2026, 10, 2)
+
+
+def test_month_field():
+    assert next_run("30 6 1 1 *", datetime(2026, 10, 19)) == datetime(2027, 1, 1, 6, 30)
+
+
+def test_expression_that_never_matches():
+    schedule = CronSchedule("0 0 30 2 *")
+    with pytest.raises(ScheduleError, match="never matches"):
+        schedule.next_after(datetime(2026, 10, 19))
+
+
+@pytest.mark.parametrize("expression", [
+    "* * *",            # campi mancanti
+    "61 * * * *",       # fuori intervallo
+    "*/0 * * * *",      # passo nullo
+    "10-5 * * * *",     # intervallo rovesciato
+    "0 0 * * mon",      # nomi non supportati
+])
+def test_invalid_expressions(expression):
+    with pytest.raises(ScheduleError):
+        CronSchedule(expression)
+
+
+def test_create_schedule():
+    assert isinstance(create_schedule("0 3 * * *", 60), CronSchedule)
+    interval = create_schedule(None, 90)
+    assert isinstance(interval, IntervalSchedule)
+    assert interval.next_after(datetime(2026, 10, 19, 10, 0)) == datetime(2026, 10, 19, 11, 30)
+    with pytest.raises(ScheduleError):
+        IntervalSchedule(0)
@@ -0,0 +1,193 @@
+"""
+DiscoveryLastFM v2.1 - Single Flight Tests
+Coalescenza delle chiamate in volo, memo e invalidazione
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight, freeze
+
+
+class Counter:
+    """Funzione da passare a do() che conta le chiamate"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condizione non raggiunta"
+        time.sleep(0.001)
+
+
+def start_blocked_call(flight, key, result):
+    """Chiamata leader bloccata dentro fn finché release non viene impostato"""
+    entered, release, results = threading.Event(), threading.Event(), []
+
+    def fn():
+        entered.set()
+        release.wait(2)
+        return result
+
+    thread = threading.Thread(target=lambda: results.append(flight.do(key, fn)))
+    thread.start()
+    assert entered.wait(2)
+    return thread, release, results
+
+
+def test_results_are_memoized():
+    flight = SingleFlight()
+    fn = Counter({"ok": 1})
+    assert flight.do("k", fn) == {"ok": 1}
+    assert flight.do("k", fn) == {"ok": 1}
+    assert fn.calls == 1
+    assert (flight.calls, flight.memo_hits) == (1, 1)
+
+
+def test_none_is_not_memoized():
+    flight = SingleFlight()
+    fn = Counter(None)
+    assert flight.do("k", fn) is None
+    assert flight.do("k", fn) is None
+    assert fn.calls == 2
+
+
+def test_exceptions_are_not_memoized():
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", boom)
+    assert flight.do("k", Counter("ok")) == "ok"
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    leader, release, results = start_blocked_call(flight, "k", "shared")
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", Counter("other"))))
+    follower.start()
+    wait_until(lambda: flight.coalesced == 1)
+    release.set()
+    leader.join()
+    follower.join()
+    assert results == ["shared", "shared"]
+    assert flight.calls == 1
+
+
+def test_exception_reaches_coalesced_callers():
+    flight = SingleFlight()
+    entered, release, errors = threading.Event(), threading.Event(), []
+
+    def boom():
+        entered.set()
+        release.wait(2)
+        raise RuntimeError("down")
+
+    def call(fn):
+        try:
+            flight.do("k", fn)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call, args=(boom,))
+    leader.start()
+    assert entered.wait(2)
+    follower = threading.Thread(target=call, args=(Counter("unused"),))
+    follower.start()
+    wait_until(lambda: flight.coalesced == 1)
+    release.set()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2
+
+
+def test_call_started_before_invalidate_is_not_memoized():
+    flight = SingleFlight()
+    leader, release, results = start_blocked_call(flight, "k", "old")
+    flight.invalidate()
+    # Un nuovo chiamante non si aggancia alla chiamata invalidata
+    assert flight.do("k", Counter("new")) == "new"
+    release.set()
+    leader.join()
+    assert results == ["old"]
+    # Il risultato della generazione precedente non sovrascrive il memo
+    fn = Counter("unused")
+    assert flight.do("k", fn) == "new"
+    assert fn.calls == 0
+
+
+def test_invalidate_matching_keys():
+    flight = SingleFlight()
+    for key in (("lidarr", "artist"), ("lidarr", "album"), ("lastfm", "info")):
+        flight.do(key, Counter(key))
+    assert flight.invalidate(lambda key: key[0] == "lidarr") == 2
+    fn = Counter("again")
+    flight.do(("lastfm", "info"), fn)
+    flight.do(("lidarr", "album"), fn)
+    assert fn.calls == 1
+
+
+def test_lru_eviction():
+    flight = SingleFlight(max_entries=2)
+    flight.do("a", Counter(1))
+    flight.do("b", Counter(2))
+    flight.do("a", Counter(1))  # "a" diventa il più recente
+    flight.do("c", Counter(3))
+    fn = Counter("again")
+    flight.do("a", fn)
+    flight.do("b", fn)
+    assert fn.calls == 1
+
+
+def test_memo_disabled():
+    flight = SingleFlight(max_entries=0)
+    fn = Counter("ok")
+    flight.do("k", fn)
+    flight.do("k", fn)
+    assert fn.calls == 2
+
+
+def test_reset_clears_memo_and_counters():
+    flight = SingleFlight()
+    flight.do("k", Counter("ok"))
+    flight.do("k", Counter("ok"))
+    flight.reset()
+    assert (flight.calls, flight.coalesced, flight.memo_hits) == (0, 0, 0)
+    fn = Counter("ok")
+    flight.do("k", fn)
+    assert fn.calls == 1
+
+
+def test_async_calls_are_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "shared"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", fetch) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["shared"] * 3
+    assert len(calls) == 1
+    assert flight.coalesced == 2
+
+
+def test_freeze_nested_params():
+    assert freeze({"b": [1, 2], "a": {"x": 1}}) == freeze({"a": {"x": 1}, "b": (1, 2)})
+    hash(freeze({"params": {"ids": [1, 2], "term": "mbid:x"}}))
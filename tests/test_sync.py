@@ -0,0 +1,152 @@
+"""
+DiscoveryLastFM v2.1 - Sync Tests
+Sync completa contro il servizio finto: aggiunte, ripresa e motori
+"""
+
+import os
+import signal
+
+import pytest
+
+from utils import async_transport
+
+from . import fakes
+from .fakes import EXPECTED_ARTISTS, EXPECTED_ALBUMS, FakeService, expected_album
+
+
+def added(calls, method):
+    return [mbid for name, mbid in calls if name == method]
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_sync_adds_seeds_similars_and_top_albums(discovery, service_calls, monkeypatch, engine):
+    if engine == "asyncio" and not async_transport.AVAILABLE:
+        pytest.skip("aiohttp non installato")
+    monkeypatch.setattr(discovery, "SYNC_ENGINE", engine)
+
+    discovery.sync()
+
+    # Seed sopra MIN_PLAYS (C escluso), i loro simili e gli album top dei simili
+    assert set(added(service_calls, "add_artist")) == EXPECTED_ARTISTS
+    albums = added(service_calls, "add_album")
+    assert sorted(albums) == sorted(EXPECTED_ALBUMS)
+    assert EXPECTED_ALBUMS <= set(discovery.load_cache()["added_albums"])
+
+
+def test_second_sync_adds_nothing(discovery, service_calls):
+    discovery.sync()
+    service_calls.clear()
+
+    discovery.sync()
+
+    assert added(service_calls, "add_album") == []
+
+
+def test_resume_after_interruption(discovery, service_calls, monkeypatch):
+    add_album = FakeService.add_album
+
+    def interrupted(self, album_info):
+        if len(added(service_calls, "add_album")) == 3:
+            raise KeyboardInterrupt()
+        return add_album(self, album_info)
+
+    monkeypatch.setattr(FakeService, "add_album", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        discovery.sync()
+    first = added(service_calls, "add_album")
+    assert len(first) == 3
+    assert discovery.load_cache()["store"].get_meta("sync_checkpoint") is not None
+
+    monkeypatch.setattr(FakeService, "add_album", add_album)
+    service_calls.clear()
+    discovery.sync(resume=True)
+
+    # Gli album già aggiunti non vengono ripetuti e il checkpoint viene rimosso
+    resumed = added(service_calls, "add_album")
+    assert not set(first) & set(resumed)
+    assert set(first) | set(resumed) == EXPECTED_ALBUMS
+    assert discovery.load_cache()["store"].get_meta("sync_checkpoint") is None
+
+
+def test_resume_mid_seed_replays_selected_similars(discovery, service_calls, monkeypatch):
+    # Solo B ha simili, tre sopra la soglia ma MAX_SIMILAR_PER_ART = 2: una sync pulita sceglie s2 e s3
+    monkeypatch.setattr(fakes, "SIMILARS", {"m-B": [("s2", 0.95), ("s3", 0.7), ("s4", 0.6)]})
+    monkeypatch.setattr(discovery, "MAX_SIMILAR_PER_ART", 2)
+    clean_artists = {"m-A", "m-B", "s2", "s3"}
+    clean_albums = {expected_album(s, r) for s in ("s2", "s3") for r in fakes.TOP_ALBUMS}
+    add_album = FakeService.add_album
+
+    def interrupted(self, album_info):
+        # Interruzione a metà del seed B: un simile completato, l'altro no
+        if len(added(service_calls, "add_album")) == 3:
+            raise KeyboardInterrupt()
+        return add_album(self, album_info)
+
+    monkeypatch.setattr(FakeService, "add_album", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        discovery.sync()
+    first_calls = list(service_calls)
+
+    monkeypatch.setattr(FakeService, "add_album", add_album)
+    service_calls.clear()
+    discovery.sync(resume=True)
+
+    # La ripresa completa i simili già scelti invece di sceglierne di nuovi
+    calls = first_calls + service_calls
+    assert set(added(calls, "add_artist")) == clean_artists
+    assert sorted(added(calls, "add_album")) == sorted(clean_albums)
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_daemon_sigterm_stops_run_and_saves_checkpoint(discovery, service_calls, monkeypatch, engine):
+    if engine == "asyncio" and not async_transport.AVAILABLE:
+        pytest.skip("aiohttp non installato")
+    monkeypatch.setattr(discovery, "SYNC_ENGINE", engine)
+    monkeypatch.setattr(discovery, "DAEMON_CRON", None)
+    monkeypatch.setattr(discovery, "DAEMON_RUN_ON_START", True)
+    handler = signal.getsignal(signal.SIGTERM)
+    add_album = FakeService.add_album
+    sent = []
+
+    def terminated(self, album_info):
+        if not sent:
+            sent.append(signal.SIGTERM)
+            os.kill(os.getpid(), signal.SIGTERM)
+        return add_album(self, album_info)
+
+    monkeypatch.setattr(FakeService, "add_album", terminated)
+    discovery.run_daemon("sync")
+
+    # Il run si ferma fra un task e l'altro, il checkpoint resta per la ripresa
+    first = added(service_calls, "add_album")
+    assert len(first) < len(EXPECTED_ALBUMS)
+    assert discovery.load_cache()["store"].get_meta("sync_checkpoint") is not None
+    assert signal.getsignal(signal.SIGTERM) == handler
+
+    monkeypatch.setattr(FakeService, "add_album", add_album)
+    service_calls.clear()
+    discovery.sync(resume=True)
+    assert set(first) | set(added(service_calls, "add_album")) == EXPECTED_ALBUMS
+
+
+def test_enqueue_paces_and_caps_every_service_write(discovery, service_calls, monkeypatch):
+    discovery.sync(discover_only=True)
+    assert service_calls == []
+
+    paced = []
+    throttle = discovery.throttle
+    monkeypatch.setattr(discovery, "throttle", lambda bucket, label: paced.append(label) or throttle(bucket, label))
+    monkeypatch.setattr(discovery, "ENQUEUE_MAX_PER_RUN", 4)
+    discovery.enqueue_candidates()
+
+    # Il limite conta anche gli artisti, e ogni scrittura passa dal ritmo
+    assert len(service_calls) == 4
+    assert paced == ["enqueue"] * 4
+    assert added(service_calls, "add_artist")
+
+    monkeypatch.setattr(discovery, "ENQUEUE_MAX_PER_RUN", 0)
+    discovery.enqueue_candidates()
+    assert len(paced) == len(service_calls)
+    assert set(added(service_calls, "add_artist")) == EXPECTED_ARTISTS
+    assert sorted(added(service_calls, "add_album")) == sorted(EXPECTED_ALBUMS)
+    assert discovery.CandidateQueue(discovery.load_cache()["store"]).pending() == {"artist": 0, "album": 0}
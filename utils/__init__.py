@@ -4,6 +4,7 @@ Moduli di supporto per funzionalità avanzate
 """
 
 from .updater import GitHubUpdater
+from .ranking import rank_candidates
 
 __version__ = "2.1.0"
-__all__ = ['GitHubUpdater']
\ No newline at end of file
+__all__ = ['GitHubUpdater', 'rank_candidates']
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+DiscoveryLastFM v2.1 - Async HTTP Transport
+Client HTTP asyncio (aiohttp, dipendenza opzionale) per il motore di sync asincrono
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+try:
+    import aiohttp
+except ImportError:  # dipendenza opzionale
+    aiohttp = None
+
+log = logging.getLogger(__name__)
+
+AVAILABLE = aiohttp is not None
+
+
+class AsyncResponse:
+    """Risposta letta per intero, con gli attributi di requests.Response usati dai client"""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+
+class AsyncHTTPTransport:
+    """
+    Trasporto asyncio con un pool keep-alive condiviso
+
+    La ClientSession viene creata al primo uso dentro l'event loop corrente e
+    va chiusa con close() prima che il loop termini. Errori di rete e timeout
+    sono rilanciati come ConnectionError/TimeoutError, come per i client
+    bloccanti.
+    """
+
+    def __init__(self, pool_maxsize: int = 10, headers: Optional[Dict[str, str]] = None):
+        self.pool_maxsize = pool_maxsize
+        self.headers = dict(headers or {})
+        self._session = None
+
+    def _get_session(self):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed (pip install aiohttp)")
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_maxsize)
+            # aiohttp richiede e decomprime gzip/deflate automaticamente
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+        return self._session
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None, timeout: float = 30) -> AsyncResponse:
+        session = self._get_session()
+        params = {k: str(v) for k, v in (params or {}).items()}
+        try:
+            async with session.get(url, params=params, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                return AsyncResponse(r.status, dict(r.headers), await r.read())
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(f"Request to {url} timed out after {timeout}s") from e
+        except aiohttp.ClientError as e:
+            raise ConnectionError(str(e)) from e
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
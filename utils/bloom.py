@@ -0,0 +1,159 @@
+"""
+DiscoveryLastFM v2.1 - Bloom Filter
+Bloom filter persistente per i controlli di esistenza album
+"""
+
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Union
+
+from .locking import FileLock
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"DLBF"
+FORMAT_VERSION = 1
+# magic, version, k, m (bit), count, capacity, fp_rate, snapshot_ts
+HEADER = struct.Struct("<4sBHQQQdd")
+
+
+class BloomFilter:
+    """
+    Bloom filter a bit array con double hashing (blake2b)
+
+    Un "no" è definitivo, un "sì" va confermato. snapshot_ts registra quando
+    il filtro è stato ricostruito dall'intera libreria del servizio: solo da
+    quel momento un "no" può evitare il controllo di rete. stale segnala che
+    la libreria è cambiata dopo lo snapshot in modo non registrato nel filtro
+    (artisti nuovi con i loro album): il filtro viene salvato senza snapshot_ts
+    e va ricostruito al caricamento successivo.
+
+    Thread-safe: add, __contains__, union e save avvengono sotto lo stesso
+    lock (i worker della pipeline aggiungono mentre il checkpoint salva).
+    """
+
+    def __init__(self, capacity: int = 200000, fp_rate: float = 0.01):
+        if capacity <= 0 or not 0 < fp_rate < 1:
+            raise ValueError(f"Invalid Bloom filter parameters: capacity={capacity}, fp_rate={fp_rate}")
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.m = max(8, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.m / capacity * math.log(2))))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+        self.snapshot_ts = 0.0
+        self.stale = False
+        self._lock = threading.RLock()
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def add(self, key: str) -> None:
+        positions = list(self._positions(key))
+        with self._lock:
+            new = False
+            for pos in positions:
+                byte, bit = divmod(pos, 8)
+                if not self.bits[byte] & (1 << bit):
+                    self.bits[byte] |= 1 << bit
+                    new = True
+            if new:
+                self.count += 1
+
+    def update(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        positions = list(self._positions(key))
+        with self._lock:
+            return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in positions)
+
+    @property
+    def saturated(self) -> bool:
+        """Oltre la capacità il tasso di falsi positivi supera fp_rate"""
+        return self.count > self.capacity
+
+    def union(self, other: "BloomFilter") -> None:
+        """OR bit a bit (in place) con un filtro con gli stessi parametri"""
+        if (other.m, other.k) != (self.m, self.k):
+            raise ValueError("Cannot merge Bloom filters with different parameters")
+        with other._lock:
+            other_bits = int.from_bytes(other.bits, "little")
+            other_count, other_ts = other.count, other.snapshot_ts
+        with self._lock:
+            merged = int.from_bytes(self.bits, "little") | other_bits
+            self.bits[:] = merged.to_bytes(len(self.bits), "little")
+            self.count = max(self.count, other_count)
+            self.snapshot_ts = max(self.snapshot_ts, other_ts)
+
+    # ── persistenza ──
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Salva il filtro unendolo (sotto file lock) a quello su disco, così gli
+        album registrati da un altro processo nel frattempo non vanno persi
+        """
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with FileLock(path.with_suffix(path.suffix + ".lock")):
+            on_disk = self.load(path, self.capacity, self.fp_rate)
+            # Unione e copia sotto il lock del filtro; la scrittura non blocca i worker
+            with self._lock:
+                if on_disk.count:
+                    self.union(on_disk)
+                header = HEADER.pack(MAGIC, FORMAT_VERSION, self.k, self.m, self.count,
+                                     self.capacity, self.fp_rate, 0.0 if self.stale else self.snapshot_ts)
+                bits = bytes(self.bits)
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                f.write(bits)
+                f.flush()
+                os.fsync(f.fileno())
+            tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], capacity: int, fp_rate: float) -> "BloomFilter":
+        """
+        Carica il filtro salvato; se manca, è corrotto o è stato creato con
+        parametri diversi ritorna un filtro vuoto (da ricostruire).
+        """
+        bloom = cls(capacity, fp_rate)
+        path = Path(path)
+        if not path.exists():
+            return bloom
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER.size)
+                magic, version, k, m, count, saved_capacity, saved_fp, snapshot_ts = HEADER.unpack(header)
+                if magic != MAGIC or version != FORMAT_VERSION:
+                    raise ValueError("unknown format")
+                if (saved_capacity, saved_fp) != (capacity, fp_rate) or (k, m) != (bloom.k, bloom.m):
+                    log.info("Album filter parameters changed, rebuilding")
+                    return bloom
+                bits = f.read()
+                if len(bits) != len(bloom.bits):
+                    raise ValueError("truncated bit array")
+            bloom.bits = bytearray(bits)
+            bloom.count = count
+            bloom.snapshot_ts = snapshot_ts
+        except Exception as e:
+            log.warning(f"Album filter {path.name} unreadable, rebuilding: {e}")
+            return cls(capacity, fp_rate)
+        return bloom
+
+    def age_hours(self) -> float:
+        if self.stale or not self.snapshot_ts:
+            return float("inf")
+        return (time.time() - self.snapshot_ts) / 3600
@@ -0,0 +1,84 @@
+"""
+DiscoveryLastFM v2.1 - Cache Bundle
+Export/import della cache riutilizzabile come bundle compresso e versionato
+"""
+
+import gzip
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Union
+
+from . import json_codec
+
+log = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = "discoverylastfm-cache"
+BUNDLE_VERSION = 1
+
+
+class BundleError(Exception):
+    """Bundle illeggibile o incompatibile"""
+    pass
+
+
+def export_bundle(store, path: Union[str, Path], namespaces: Iterable[str],
+                  similar_format: str) -> Dict[str, int]:
+    """
+    Scrive un bundle gzip con i dati indipendenti dall'utente: liste di artisti
+    simili e lookup dei namespace indicati (classificazioni MusicBrainz,
+    name→MBID). added_albums e checkpoint non vengono esportati.
+
+    Returns:
+        {"similar": entry esportate, "lookups": entry esportate}
+    """
+    path = Path(path)
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "created": time.time(),
+        "similar_format": similar_format,
+        "similar": store.similar_rows(),
+        "lookups": store.lookup_rows(namespaces),
+    }
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp_path, "wb") as f:
+        f.write(json_codec.dumpb(bundle))
+    tmp_path.replace(path)
+    return {"similar": len(bundle["similar"]), "lookups": len(bundle["lookups"])}
+
+
+def import_bundle(store, path: Union[str, Path], namespaces: Iterable[str],
+                  similar_format: str) -> Dict[str, int]:
+    """
+    Unisce un bundle nello store: per ogni chiave vince il timestamp più
+    recente, quindi un bundle vecchio non sovrascrive dati locali più freschi.
+    Lookup di namespace non riconosciuti vengono ignorati.
+
+    Returns:
+        {"similar": entry aggiornate, "lookups": entry aggiornate,
+         "similar_total": entry nel bundle, "lookups_total": entry nel bundle}
+    """
+    path = Path(path)
+    try:
+        with gzip.open(path, "rb") as f:
+            bundle = json_codec.loads(f.read())
+    except (OSError, ValueError) as e:
+        raise BundleError(f"Cannot read cache bundle {path}: {e}")
+
+    if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+        raise BundleError(f"{path} is not a DiscoveryLastFM cache bundle")
+    if bundle.get("version", 0) > BUNDLE_VERSION:
+        raise BundleError(f"Cache bundle version {bundle.get('version')} is newer than supported ({BUNDLE_VERSION})")
+    if bundle.get("similar_format") != similar_format:
+        raise BundleError(f"Unsupported similar cache format: {bundle.get('similar_format')}")
+
+    namespaces = set(namespaces)
+    lookups = [row for row in bundle.get("lookups", []) if row[0] in namespaces]
+    similar = bundle.get("similar", [])
+    return {
+        "similar": store.merge_similar_rows(similar),
+        "lookups": store.merge_lookup_rows(lookups),
+        "similar_total": len(similar),
+        "lookups_total": len(lookups),
+    }
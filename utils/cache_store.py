@@ -0,0 +1,370 @@
+"""
+DiscoveryLastFM v2.1 - SQLite Cache Store
+Backend cache SQLite (WAL) con letture lazy e scritture incrementali
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+from collections.abc import MutableMapping, MutableSet
+
+from . import json_codec
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS similar_artists (
+    mbid TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    data TEXT NOT NULL,
+    atime REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS added_albums (
+    mbid TEXT PRIMARY KEY,
+    ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lookups (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    value TEXT,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS service_misses (
+    service TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mbid TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    retry_at REAL NOT NULL,
+    PRIMARY KEY (service, kind, mbid)
+);
+CREATE TABLE IF NOT EXISTS processed_artists (
+    mbid TEXT NOT NULL,
+    role TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (mbid, role)
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    kind TEXT NOT NULL,
+    mbid TEXT NOT NULL,
+    name TEXT NOT NULL,
+    artist_mbid TEXT,
+    artist_name TEXT,
+    rg_id TEXT,
+    rel_id TEXT,
+    fallback INTEGER NOT NULL DEFAULT 0,
+    ts REAL NOT NULL,
+    PRIMARY KEY (kind, mbid)
+);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json_codec.dumps(value)
+
+
+class SimilarCacheTable(MutableMapping):
+    """
+    Vista dict-like sulla tabella similar_artists
+
+    Compatibile con il vecchio cache["similar_cache"]: le entry hanno la forma
+    {"ts": float, "data": [[mbid, name, match], ...]}. Le letture avvengono per
+    chiave solo quando servono; ogni scrittura è una transazione a sé.
+    Gli accessi in lettura sono annotati in memoria e scritti (atime, per
+    l'eviction LRU) in blocco da CacheStore.compact_similar().
+    """
+
+    def __init__(self, store: "CacheStore"):
+        self._store = store
+        self.accessed: Dict[str, float] = {}
+
+    def __getitem__(self, mbid: str) -> Dict[str, Any]:
+        row = self._store.fetchone(
+            "SELECT ts, data FROM similar_artists WHERE mbid = ?", (mbid,)
+        )
+        if row is None:
+            raise KeyError(mbid)
+        self.accessed[mbid] = time.time()
+        return {"ts": row[0], "data": json_codec.loads(row[1])}
+
+    def __setitem__(self, mbid: str, entry: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._store.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO similar_artists (mbid, ts, data, atime) VALUES (?, ?, ?, ?)",
+                (mbid, entry["ts"], _dumps(entry["data"]), now)
+            )
+
+    def __delitem__(self, mbid: str) -> None:
+        with self._store.transaction() as conn:
+            cur = conn.execute("DELETE FROM similar_artists WHERE mbid = ?", (mbid,))
+        if cur.rowcount == 0:
+            raise KeyError(mbid)
+
+    def __contains__(self, mbid: object) -> bool:
+        return self._store.fetchone(
+            "SELECT 1 FROM similar_artists WHERE mbid = ?", (mbid,)
+        ) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._store.fetchall("SELECT mbid FROM similar_artists")
+        return iter([r[0] for r in rows])
+
+    def __len__(self) -> int:
+        return self._store.fetchone("SELECT COUNT(*) FROM similar_artists")[0]
+
+
+class AlbumSet(MutableSet):
+    """Vista set-like sulla tabella added_albums"""
+
+    def __init__(self, store: "CacheStore"):
+        self._store = store
+
+    def __contains__(self, mbid: object) -> bool:
+        return self._store.fetchone(
+            "SELECT 1 FROM added_albums WHERE mbid = ?", (mbid,)
+        ) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._store.fetchall("SELECT mbid FROM added_albums")
+        return iter([r[0] for r in rows])
+
+    def __len__(self) -> int:
+        return self._store.fetchone("SELECT COUNT(*) FROM added_albums")[0]
+
+    def add(self, mbid: str) -> None:
+        with self._store.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO added_albums (mbid, ts) VALUES (?, ?)", (mbid, time.time())
+            )
+
+    def discard(self, mbid: str) -> None:
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM added_albums WHERE mbid = ?", (mbid,))
+
+    def clear(self) -> None:
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM added_albums")
+
+    def update(self, mbids: Iterable[str]) -> None:
+        now = time.time()
+        with self._store.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO added_albums (mbid, ts) VALUES (?, ?)",
+                ((m, now) for m in mbids)
+            )
+
+
+class CacheStore:
+    """
+    Cache persistente in SQLite (journal WAL)
+
+    Sostituisce lastfm_similar_cache.json: apertura e chiusura non dipendono
+    più dalla dimensione della cache, e ogni risultato è salvato appena
+    ottenuto, per cui un crash a metà run non perde il lavoro già fatto.
+    L'istanza è condivisibile fra thread (accessi serializzati da un lock).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        # isolation_level=None: autocommit, le transazioni sono esplicite
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate_schema()
+
+        self.similar_cache = SimilarCacheTable(self)
+        self.added_albums = AlbumSet(self)
+
+    def _migrate_schema(self) -> None:
+        """Aggiunge le colonne introdotte dopo la creazione del database"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(similar_artists)")}
+        if "atime" not in columns:
+            self._conn.execute("ALTER TABLE similar_artists ADD COLUMN atime REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE similar_artists SET atime = ts")
+
+    def fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        """Query in lettura, prima riga"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: tuple = ()) -> list:
+        """Query in lettura, tutte le righe"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """Transazione esplicita: commit all'uscita, rollback in caso di errore"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # ── meta ──
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.fetchone("SELECT value FROM meta WHERE key = ?", (key,))
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # ── lookups (MusicBrainz, name→MBID, ...) ──
+    def get_lookup(self, namespace: str, key: str, max_age: Optional[float] = None) -> Any:
+        """
+        Ritorna il valore in cache o None se assente/scaduto (max_age in secondi).
+        I valori sono JSON: un None salvato è indistinguibile da una entry mancante.
+        """
+        row = self.fetchone(
+            "SELECT ts, value FROM lookups WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+        if row is None or (max_age is not None and time.time() - row[0] > max_age):
+            return None
+        return json_codec.loads(row[1])
+
+    def set_lookup(self, namespace: str, key: str, value: Any) -> None:
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO lookups (namespace, key, ts, value) VALUES (?, ?, ?, ?)",
+                (namespace, key, time.time(), _dumps(value))
+            )
+
+    # ── export / merge (bundle portabili) ──
+    def similar_rows(self) -> list:
+        """Tutte le entry similar_artists come [mbid, ts, data]"""
+        return [[mbid, ts, json_codec.loads(data)] for mbid, ts, data in
+                self.fetchall("SELECT mbid, ts, data FROM similar_artists")]
+
+    def lookup_rows(self, namespaces: Iterable[str]) -> list:
+        """Entry lookups dei namespace indicati come [namespace, key, ts, value]"""
+        namespaces = list(namespaces)
+        placeholders = ", ".join("?" * len(namespaces))
+        return [[ns, key, ts, json_codec.loads(value)] for ns, key, ts, value in self.fetchall(
+            f"SELECT namespace, key, ts, value FROM lookups WHERE namespace IN ({placeholders})",
+            tuple(namespaces)
+        )]
+
+    def merge_similar_rows(self, rows: Iterable[list]) -> int:
+        """
+        Unisce entry [mbid, ts, data]: vince il timestamp più recente.
+        Ritorna il numero di entry inserite o aggiornate.
+        """
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO similar_artists (mbid, ts, data, atime) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(mbid) DO UPDATE SET ts = excluded.ts, data = excluded.data "
+                "WHERE excluded.ts > similar_artists.ts",
+                ((mbid, ts, _dumps(data), ts) for mbid, ts, data in rows)
+            )
+            return conn.total_changes - before
+
+    def merge_lookup_rows(self, rows: Iterable[list]) -> int:
+        """Unisce entry [namespace, key, ts, value]: vince il timestamp più recente"""
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO lookups (namespace, key, ts, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET ts = excluded.ts, value = excluded.value "
+                "WHERE excluded.ts > lookups.ts",
+                ((ns, key, ts, _dumps(value)) for ns, key, ts, value in rows)
+            )
+            return conn.total_changes - before
+
+    # ── import / manutenzione ──
+    def import_legacy(self, similar_cache: Dict[str, Dict[str, Any]], added_albums: Iterable[str]) -> None:
+        """Importa in un'unica transazione il contenuto di lastfm_similar_cache.json"""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO similar_artists (mbid, ts, data, atime) VALUES (?, ?, ?, ?)",
+                ((mbid, e["ts"], _dumps(e["data"]), e["ts"]) for mbid, e in similar_cache.items())
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO added_albums (mbid, ts) VALUES (?, ?)",
+                ((m, now) for m in added_albums)
+            )
+
+    def compact_similar(self, max_age: float, max_entries: int, max_bytes: int) -> Dict[str, int]:
+        """
+        Eviction di similar_artists: purge TTL (ts più vecchio di max_age secondi),
+        poi LRU per atime finché numero di entry e byte dei dati rientrano nei limiti.
+
+        Returns:
+            {"evicted": entry rimosse, "bytes_saved": byte di dati liberati}
+        """
+        accessed = self.similar_cache.accessed
+        with self.transaction() as conn:
+            # Persisti gli accessi del run prima di decidere cosa è meno recente
+            if accessed:
+                conn.executemany(
+                    "UPDATE similar_artists SET atime = ? WHERE mbid = ? AND atime < ?",
+                    ((ts, mbid, ts) for mbid, ts in accessed.items())
+                )
+
+            cutoff = time.time() - max_age
+            expired = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(mbid) + LENGTH(data)), 0) "
+                "FROM similar_artists WHERE ts < ?", (cutoff,)
+            ).fetchone()
+            conn.execute("DELETE FROM similar_artists WHERE ts < ?", (cutoff,))
+            evicted, bytes_saved = expired
+
+            count, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(mbid) + LENGTH(data)), 0) FROM similar_artists"
+            ).fetchone()
+            if count > max_entries or total_bytes > max_bytes:
+                victims = []
+                for mbid, size in conn.execute(
+                    "SELECT mbid, LENGTH(mbid) + LENGTH(data) FROM similar_artists ORDER BY atime ASC"
+                ):
+                    if count <= max_entries and total_bytes <= max_bytes:
+                        break
+                    victims.append((mbid,))
+                    count -= 1
+                    total_bytes -= size
+                    bytes_saved += size
+                conn.executemany("DELETE FROM similar_artists WHERE mbid = ?", victims)
+                evicted += len(victims)
+
+            if evicted:
+                totals = {k: int(v) for k, v in conn.execute(
+                    "SELECT key, value FROM meta WHERE key IN ('similar_evicted_total', 'similar_bytes_saved_total')"
+                )}
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("similar_evicted_total", str(totals.get("similar_evicted_total", 0) + evicted)),
+                     ("similar_bytes_saved_total", str(totals.get("similar_bytes_saved_total", 0) + bytes_saved))]
+                )
+        accessed.clear()
+        return {"evicted": evicted, "bytes_saved": bytes_saved}
+
+    def flush(self) -> None:
+        """Riporta il WAL nel database principale (le scritture sono già committate)"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,80 @@
+"""
+DiscoveryLastFM v2.1 - Candidate Queue
+Coda persistente dei candidati fra la fase di discovery e quella di enqueue
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Candidate:
+    """Artista ("artist") o album ("album") da aggiungere al servizio"""
+    kind: str
+    mbid: str
+    name: str
+    artist_mbid: Optional[str] = None
+    artist_name: Optional[str] = None
+    rg_id: Optional[str] = None
+    rel_id: Optional[str] = None
+    fallback: bool = False
+    ts: float = 0.0
+
+
+class CandidateQueue:
+    """
+    Coda FIFO durevole fra --discover-only e --enqueue-only
+
+    La discovery (Last.fm, MusicBrainz) vi scrive gli artisti (seed e simili)
+    e gli album studio selezionati; l'enqueue li consuma verso Lidarr o
+    Headphones e rimuove ogni riga solo dopo averla elaborata, così un run
+    interrotto riprende dallo stesso punto. Un candidato già in coda non viene
+    duplicato e mantiene la sua posizione. Le righe vivono nella tabella
+    candidates del CacheStore.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _push(self, candidate: Candidate) -> bool:
+        with self.store.transaction() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO candidates "
+                "(kind, mbid, name, artist_mbid, artist_name, rg_id, rel_id, fallback, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (candidate.kind, candidate.mbid, candidate.name, candidate.artist_mbid,
+                 candidate.artist_name, candidate.rg_id, candidate.rel_id,
+                 int(candidate.fallback), time.time())
+            )
+            return cur.rowcount > 0
+
+    def push_artist(self, mbid: str, name: str) -> bool:
+        """Accoda un artista (seed o simile); False se era già in coda"""
+        return self._push(Candidate("artist", mbid, name))
+
+    def push_album(self, mbid: str, title: str, artist_mbid: str, artist_name: str,
+                   rg_id: Optional[str], rel_id: str, fallback: bool = False) -> bool:
+        """Accoda un album con il suo artista; False se era già in coda"""
+        return self._push(Candidate("album", mbid, title, artist_mbid, artist_name, rg_id, rel_id, fallback))
+
+    def items(self, kind: str, limit: Optional[int] = None) -> List[Candidate]:
+        """Candidati di un tipo in ordine di inserimento"""
+        sql = ("SELECT kind, mbid, name, artist_mbid, artist_name, rg_id, rel_id, fallback, ts "
+               "FROM candidates WHERE kind = ? ORDER BY ts, rowid")
+        params = (kind,)
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [Candidate(*row[:7], bool(row[7]), row[8]) for row in self.store.fetchall(sql, params)]
+
+    def remove(self, candidate: Candidate) -> None:
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM candidates WHERE kind = ? AND mbid = ?", (candidate.kind, candidate.mbid))
+
+    def pending(self) -> Dict[str, int]:
+        counts = dict(self.store.fetchall("SELECT kind, COUNT(*) FROM candidates GROUP BY kind"))
+        return {"artist": counts.get("artist", 0), "album": counts.get("album", 0)}
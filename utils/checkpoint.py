@@ -0,0 +1,62 @@
+"""
+DiscoveryLastFM v2.1 - Sync Checkpoints
+Salvataggio periodico dello stato di una sync per riprenderla dopo un'interruzione
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from . import json_codec
+
+log = logging.getLogger(__name__)
+
+
+class SyncCheckpoint:
+    """
+    Checkpoint di una sync salvato nella tabella meta del CacheStore
+
+    Lo stato è un dict serializzabile in JSON prodotto dal chiamante (cursore
+    su seed e simili, set seen, fallback, contatori). maybe_save() scrive al
+    più una volta ogni interval secondi; save() scrive subito. Il checkpoint
+    vive nello stesso database della cache, quindi i risultati già salvati e
+    il cursore che li descrive restano coerenti dopo un crash.
+    """
+
+    META_KEY = "sync_checkpoint"
+
+    def __init__(self, store, interval: float, state_fn: Callable[[], Dict[str, Any]],
+                 on_save: Optional[Callable[[], None]] = None):
+        self.store = store
+        self.interval = interval
+        self.state_fn = state_fn
+        self.on_save = on_save
+        self._last_save = time.monotonic()
+        self.saves = 0
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        raw = self.store.get_meta(self.META_KEY)
+        if not raw:
+            return None
+        try:
+            return json_codec.loads(raw)
+        except ValueError as e:
+            log.warning(f"Checkpoint illeggibile, ignorato: {e}")
+            return None
+
+    def save(self) -> None:
+        state = self.state_fn()
+        state["updated"] = time.time()
+        if self.on_save is not None:
+            self.on_save()
+        self.store.set_meta(self.META_KEY, json_codec.dumps(state))
+        self._last_save = time.monotonic()
+        self.saves += 1
+
+    def maybe_save(self) -> None:
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def clear(self) -> None:
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM meta WHERE key = ?", (self.META_KEY,))
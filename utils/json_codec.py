@@ -0,0 +1,45 @@
+"""
+DiscoveryLastFM v2.1 - JSON Codec
+Encoding/decoding JSON con orjson se installato, json della stdlib altrimenti
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # dipendenza opzionale
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# orjson.JSONDecodeError e json.JSONDecodeError derivano entrambe da ValueError
+JSONDecodeError = ValueError
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Decodifica JSON da str o bytes (es. response.content, senza decodifica testo)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumpb(value: Any) -> bytes:
+    """Encoding compatto in UTF-8"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # Tipi non supportati da orjson (es. interi oltre 64 bit)
+            pass
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+
+
+def dumps(value: Any) -> str:
+    """Encoding compatto (nessuna indentazione, caratteri non ASCII non escapati)"""
+    return dumpb(value).decode("utf-8")
+
+
+def response_json(response) -> Any:
+    """Corpo JSON di una requests.Response tramite il codec"""
+    return loads(response.content)
@@ -0,0 +1,86 @@
+"""
+DiscoveryLastFM v2.1 - File Locking
+Lock su file basati su fcntl per run e scritture concorrenti della cache
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: nessun lock inter-processo
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+class LockTimeout(Exception):
+    """Lock non ottenuto entro il timeout"""
+    pass
+
+
+class FileLock:
+    """
+    Lock esclusivo (flock) su un file dedicato
+
+    Il lock appartiene al file descriptor: viene rilasciato automaticamente
+    anche se il processo muore, quindi non restano lock orfani dopo un crash.
+    Non è rientrante fra istanze diverse sullo stesso path.
+    """
+
+    def __init__(self, path: Union[str, Path], poll_interval: float = 0.5):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Acquisisce il lock. Con blocking=False ritorna subito False se occupato;
+        con timeout ritorna False allo scadere. timeout=None attende senza limite.
+        """
+        if self._fd is not None:
+            return True
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            self._fd = fd
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                    os.close(fd)
+                    return False
+                time.sleep(self.poll_interval)
+
+        # PID del proprietario, utile solo per diagnostica
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        if not self.acquire():
+            raise LockTimeout(f"Could not lock {self.path}")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,82 @@
+"""
+DiscoveryLastFM v2.1 - Miss Ledger
+Registro persistente di MBID non trovati o falliti sul servizio musicale
+"""
+
+import logging
+import time
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+DAY = 86400
+
+
+class MissLedger:
+    """
+    Registro dei lookup falliti per servizio, con backoff esponenziale
+
+    Un MBID che il servizio non trova (o che fallisce) non viene ritentato
+    prima di base_days giorni; ogni nuovo fallimento raddoppia l'attesa
+    (1, 2, 4, ... giorni) fino a max_days. Un successo cancella la entry.
+    Le righe vivono nella tabella service_misses del CacheStore.
+    """
+
+    def __init__(self, store, service: str, base_days: float = 1, max_days: float = 32):
+        self.store = store
+        self.service = service
+        self.base_days = base_days
+        self.max_days = max_days
+        self.skipped = 0
+        self.recorded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.base_days > 0
+
+    def retry_at(self, kind: str, mbid: str) -> Optional[float]:
+        """Timestamp prima del quale non ritentare, None se l'MBID è ritentabile"""
+        if not self.enabled:
+            return None
+        row = self.store.fetchone(
+            "SELECT retry_at FROM service_misses WHERE service = ? AND kind = ? AND mbid = ?",
+            (self.service, kind, mbid)
+        )
+        if row is None or row[0] <= time.time():
+            return None
+        return row[0]
+
+    def should_skip(self, kind: str, mbid: str) -> bool:
+        if self.retry_at(kind, mbid) is None:
+            return False
+        self.skipped += 1
+        return True
+
+    def record(self, kind: str, mbid: str, reason: str) -> float:
+        """Registra un fallimento e ritorna i giorni di attesa prima del prossimo tentativo"""
+        if not self.enabled:
+            return 0
+        now = time.time()
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM service_misses WHERE service = ? AND kind = ? AND mbid = ?",
+                (self.service, kind, mbid)
+            ).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            days = min(self.base_days * 2 ** (attempts - 1), self.max_days)
+            conn.execute(
+                "INSERT OR REPLACE INTO service_misses (service, kind, mbid, reason, attempts, ts, retry_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.service, kind, mbid, reason, attempts, now, now + days * DAY)
+            )
+        self.recorded += 1
+        return days
+
+    def clear(self, kind: str, mbid: str) -> None:
+        if not self.enabled:
+            return
+        with self.store.transaction() as conn:
+            conn.execute(
+                "DELETE FROM service_misses WHERE service = ? AND kind = ? AND mbid = ?",
+                (self.service, kind, mbid)
+            )
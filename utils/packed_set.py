@@ -0,0 +1,197 @@
+"""
+DiscoveryLastFM v2.1 - Packed UUID Set
+Set persistente di MBID come array ordinato di UUID binari in memory-map
+"""
+
+import bisect
+import heapq
+import logging
+import mmap
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+from collections.abc import Set
+
+from .locking import FileLock
+
+log = logging.getLogger(__name__)
+
+RECORD_SIZE = 16
+
+
+class _Records:
+    """Sequenza di record da 16 byte sopra un buffer (per bisect)"""
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._len = len(buf) // RECORD_SIZE if buf is not None else 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> bytes:
+        offset = i * RECORD_SIZE
+        return self._buf[offset:offset + RECORD_SIZE]
+
+    def __iter__(self) -> Iterator[bytes]:
+        for i in range(self._len):
+            yield self[i]
+
+
+class PackedUUIDSet(Set):
+    """
+    Set di MBID salvato come file ordinato di UUID da 16 byte
+
+    Il file base viene mappato in memoria e interrogato con bisect, per cui
+    memoria e tempo di apertura restano costanti al crescere dello storico.
+    I nuovi id vengono aggiunti in coda a un file di log (anch'esso binario)
+    e fusi nel file base da merge(), alla soglia merge_threshold o a fine run.
+    merge() è sicuro con più processi: sotto un file lock rilegge file base e
+    log dal disco e li unisce agli id in memoria, senza sovrascrivere quanto
+    aggiunto da altri processi nel frattempo.
+    Id non UUID non possono essere impaccati: restano solo in memoria.
+    Il set è append-only: oltre all'interfaccia Set espone solo add e update
+    (le operazioni |, & e - ritornano un set ordinario).
+    """
+
+    def __init__(self, path: Union[str, Path], merge_threshold: int = 4096):
+        self.path = Path(path)
+        self.log_path = self.path.with_suffix(self.path.suffix + ".log")
+        self._file_lock = FileLock(self.path.with_suffix(self.path.suffix + ".lock"))
+        self.merge_threshold = merge_threshold
+        self._lock = threading.RLock()
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._records = _Records(None)
+        self._pending = set()
+        self._extra = set()
+        self._open_base()
+        self._load_log()
+
+    # ── file base / log ──
+    def _open_base(self) -> None:
+        self._close_base()
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            self._records = _Records(None)
+            return
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._records = _Records(self._mmap)
+
+    def _close_base(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _load_log(self) -> None:
+        if not self.log_path.exists():
+            return
+        data = self.log_path.read_bytes()
+        # Un record troncato (crash durante l'append) viene ignorato
+        usable = len(data) - len(data) % RECORD_SIZE
+        for offset in range(0, usable, RECORD_SIZE):
+            record = data[offset:offset + RECORD_SIZE]
+            if not self._in_base(record):
+                self._pending.add(record)
+
+    def _in_base(self, record: bytes) -> bool:
+        i = bisect.bisect_left(self._records, record)
+        return i < len(self._records) and self._records[i] == record
+
+    @staticmethod
+    def _pack(mbid: str) -> Optional[bytes]:
+        try:
+            return uuid.UUID(str(mbid)).bytes
+        except ValueError:
+            return None
+
+    # ── interfaccia set ──
+    @classmethod
+    def _from_iterable(cls, it) -> set:
+        return set(it)
+
+    def __contains__(self, mbid: object) -> bool:
+        record = self._pack(mbid)
+        if record is None:
+            return mbid in self._extra
+        with self._lock:
+            return record in self._pending or self._in_base(record)
+
+    def __len__(self) -> int:
+        return len(self._records) + len(self._pending) + len(self._extra)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            records = list(heapq.merge(self._records, sorted(self._pending)))
+        for record in records:
+            yield str(uuid.UUID(bytes=record))
+        yield from list(self._extra)
+
+    def add(self, mbid: str) -> None:
+        record = self._pack(mbid)
+        if record is None:
+            log.warning(f"Id album non UUID, non persistito: {mbid}")
+            self._extra.add(mbid)
+            return
+        with self._lock:
+            if record in self._pending or self._in_base(record):
+                return
+            with self._file_lock:
+                with open(self.log_path, "ab") as f:
+                    f.write(record)
+            self._pending.add(record)
+            if len(self._pending) >= self.merge_threshold:
+                self.merge()
+
+    def update(self, mbids: Iterable[str]) -> None:
+        """Aggiunta in blocco (import): un solo merge alla fine"""
+        with self._lock:
+            threshold, self.merge_threshold = self.merge_threshold, float("inf")
+            try:
+                for mbid in mbids:
+                    self.add(mbid)
+            finally:
+                self.merge_threshold = threshold
+            self.merge()
+
+    # ── manutenzione ──
+    def merge(self) -> None:
+        """Fonde il log nel file base ordinato (scrittura atomica via rename)"""
+        with self._lock:
+            if not self._pending and not self.log_path.exists():
+                # Niente da scrivere: solo rilettura del file base fuso da altri processi
+                # (sostituito via rename, quindi leggibile senza file lock)
+                self._open_base()
+                return
+            with self._file_lock:
+                # Stato su disco aggiornato: altri processi possono aver fuso o aggiunto id
+                self._open_base()
+                self._pending = {r for r in self._pending if not self._in_base(r)}
+                self._load_log()
+                self._write_merged()
+
+    def _write_merged(self) -> None:
+        with self._lock:
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "wb") as out:
+                for record in heapq.merge(self._records, sorted(self._pending)):
+                    out.write(record)
+                out.flush()
+                os.fsync(out.fileno())
+            self._close_base()
+            tmp_path.replace(self.path)
+            self.log_path.unlink(missing_ok=True)
+            merged = len(self._pending)
+            self._pending.clear()
+            self._open_base()
+            log.debug(f"Merged {merged} ids into {self.path.name} ({len(self._records)} total)")
+
+    def close(self) -> None:
+        with self._lock:
+            self.merge()
+            self._close_base()
@@ -0,0 +1,291 @@
+"""
+DiscoveryLastFM v2.1 - Staged Pipeline
+Pipeline producer/consumer a stadi con code limitate e pool di worker per stadio
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Stage:
+    """
+    Stadio della pipeline: handler(item, emit) elabora un item e passa zero
+    o più risultati allo stadio successivo con emit(result).
+    workers è la concorrenza dello stadio, da dimensionare sul backend che usa.
+    Con AsyncPipeline handler è una coroutine ed emit va atteso.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any, Callable[[Any], Any]], Any], workers: int = 1):
+        if workers < 1:
+            raise ValueError(f"Stage {name}: workers must be >= 1")
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+
+
+class Pipeline:
+    """
+    Catena di stadi collegati da code limitate (backpressure)
+
+    La sorgente gira in un thread dedicato, ogni stadio nel proprio pool di
+    worker: gli stadi lavorano in parallelo, per cui il tempo totale tende
+    al throughput dello stadio più lento invece che alla somma delle latenze.
+    Un'eccezione in un handler viene registrata e l'item scartato; un errore
+    della sorgente (o un KeyboardInterrupt/SystemExit in un worker) ferma la
+    pipeline e viene rilanciato da run().
+    """
+
+    def __init__(self, stages: List[Stage], maxsize: int = 100, poll_interval: float = 0.2):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self.maxsize = maxsize
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._queues: List[queue.Queue] = []
+        self._upstream: List[int] = []
+
+    def stop(self) -> None:
+        """Ferma sorgente e worker: gli item ancora in coda vengono scartati"""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    # ── code ──
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=self.poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _upstream_done(self, index: int) -> None:
+        """Un produttore della coda index ha finito: l'ultimo chiude lo stadio"""
+        with self._lock:
+            self._upstream[index] -= 1
+            last = self._upstream[index] == 0
+        if last:
+            for _ in range(self.stages[index].workers):
+                self._put(self._queues[index], _STOP)
+
+    # ── thread ──
+    def _run_source(self, source: Iterable[Any]) -> None:
+        try:
+            for item in source:
+                if not self._put(self._queues[0], item):
+                    break
+        except BaseException as e:
+            self._error = e
+            self.stop()
+        finally:
+            self._upstream_done(0)
+
+    def _run_worker(self, index: int) -> None:
+        stage = self.stages[index]
+        next_queue = self._queues[index + 1] if index + 1 < len(self.stages) else None
+
+        def emit(result: Any) -> None:
+            if next_queue is None:
+                raise RuntimeError(f"Stage {stage.name} is the last stage and cannot emit")
+            self._put(next_queue, result)
+
+        try:
+            while True:
+                item = self._get(self._queues[index])
+                if item is _STOP:
+                    break
+                start = time.monotonic()
+                try:
+                    stage.handler(item, emit)
+                    with self._lock:
+                        stage.processed += 1
+                except Exception as e:
+                    log.error(f"Pipeline stage {stage.name} failed on {item!r}: {e}")
+                    with self._lock:
+                        stage.failed += 1
+                except BaseException as e:
+                    # KeyboardInterrupt/SystemExit in un worker: ferma tutto e rilancia da run()
+                    self._error = e
+                    self.stop()
+                    break
+                finally:
+                    with self._lock:
+                        stage.busy += time.monotonic() - start
+        finally:
+            if next_queue is not None:
+                self._upstream_done(index + 1)
+
+    def run(self, source: Iterable[Any]) -> None:
+        """Esegue la pipeline finché sorgente e code non sono esaurite"""
+        self._stop.clear()
+        self._error = None
+        self._queues = [queue.Queue(self.maxsize) for _ in self.stages]
+        self._upstream = [1] + [stage.workers for stage in self.stages[:-1]]
+
+        threads = [threading.Thread(target=self._run_source, args=(source,), name="pipeline-source", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads.extend(
+                threading.Thread(target=self._run_worker, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            )
+
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(self.poll_interval)
+        except BaseException:
+            self.stop()
+            for thread in threads:
+                thread.join()
+            raise
+
+        if self._error is not None:
+            raise self._error
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Item elaborati, falliti e secondi di lavoro per stadio"""
+        return {
+            stage.name: {"processed": stage.processed, "failed": stage.failed, "busy": round(stage.busy, 1)}
+            for stage in self.stages
+        }
+
+
+class AsyncPipeline:
+    """
+    Variante asyncio di Pipeline: stessi stadi, ma i worker sono task su un
+    solo event loop e le code sono asyncio.Queue limitate.
+
+    Una sorgente sincrona (es. un generatore che fa chiamate bloccanti) viene
+    consumata in un thread del pool di default, un item alla volta. Un errore
+    della sorgente o un'eccezione non-Exception (cancellazione) cancella
+    tutti i task e viene rilanciata da run(); stop() cancella i task e run()
+    ritorna normalmente, come Pipeline.stop().
+    """
+
+    def __init__(self, stages: List[Stage], maxsize: int = 100):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self.maxsize = maxsize
+        self._stopped = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Future] = []
+
+    def stop(self) -> None:
+        """Ferma sorgente e worker; sicuro da un altro thread o da un signal handler"""
+        self._stopped = True
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._cancel)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def _cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    async def _source_items(self, source: Any):
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                yield item
+            return
+        loop = asyncio.get_running_loop()
+        iterator = iter(source)
+        while True:
+            item = await loop.run_in_executor(None, next, iterator, _STOP)
+            if item is _STOP:
+                return
+            yield item
+
+    async def run(self, source: Any) -> None:
+        """Esegue la pipeline finché sorgente e code non sono esaurite"""
+        queues = [asyncio.Queue(self.maxsize) for _ in self.stages]
+        upstream = [1] + [stage.workers for stage in self.stages[:-1]]
+
+        async def upstream_done(index: int) -> None:
+            upstream[index] -= 1
+            if upstream[index] == 0:
+                for _ in range(self.stages[index].workers):
+                    await queues[index].put(_STOP)
+
+        async def run_source() -> None:
+            async for item in self._source_items(source):
+                await queues[0].put(item)
+            await upstream_done(0)
+
+        async def run_worker(index: int) -> None:
+            stage = self.stages[index]
+            next_queue = queues[index + 1] if index + 1 < len(self.stages) else None
+
+            async def emit(result: Any) -> None:
+                if next_queue is None:
+                    raise RuntimeError(f"Stage {stage.name} is the last stage and cannot emit")
+                await next_queue.put(result)
+
+            while True:
+                item = await queues[index].get()
+                if item is _STOP:
+                    break
+                start = time.monotonic()
+                try:
+                    await stage.handler(item, emit)
+                    stage.processed += 1
+                except Exception as e:
+                    log.error(f"Pipeline stage {stage.name} failed on {item!r}: {e}")
+                    stage.failed += 1
+                finally:
+                    stage.busy += time.monotonic() - start
+            if next_queue is not None:
+                await upstream_done(index + 1)
+
+        tasks = [asyncio.ensure_future(run_source())]
+        for index, stage in enumerate(self.stages):
+            tasks.extend(asyncio.ensure_future(run_worker(index)) for _ in range(stage.workers))
+        self._loop, self._tasks = asyncio.get_running_loop(), tasks
+        if self._stopped:
+            self._cancel()
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not (self._stopped and isinstance(e, asyncio.CancelledError)):
+                raise
+        finally:
+            self._loop, self._tasks = None, []
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Item elaborati, falliti e secondi di lavoro per stadio"""
+        return {
+            stage.name: {"processed": stage.processed, "failed": stage.failed, "busy": round(stage.busy, 1)}
+            for stage in self.stages
+        }
@@ -0,0 +1,60 @@
+"""
+DiscoveryLastFM v2.1 - Processed Ledger
+Registro degli artisti già elaborati per le sync incrementali
+"""
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+
+class ProcessedLedger:
+    """
+    Registro di quando ogni artista è stato elaborato completamente
+
+    Per ogni artista (e ruolo: "seed" o "similar") salva l'ora dell'ultima
+    elaborazione completa e un fingerprint dei suoi input (lista dei simili,
+    id degli album top, parametri che li filtrano). Se il fingerprint non è
+    cambiato entro window_days l'artista può essere saltato. Le righe vivono
+    nella tabella processed_artists del CacheStore.
+    """
+
+    def __init__(self, store, window_days: float = 7):
+        self.store = store
+        self.window_days = window_days
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_days > 0
+
+    @staticmethod
+    def fingerprint(inputs: Any) -> str:
+        """Hash stabile di input serializzabili in JSON"""
+        raw = json.dumps(inputs, separators=(',', ':'), sort_keys=True)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def unchanged(self, role: str, mbid: str, fingerprint: str) -> bool:
+        """True se l'artista è stato elaborato entro la finestra con gli stessi input"""
+        if not self.enabled:
+            return False
+        row = self.store.fetchone(
+            "SELECT fingerprint, ts FROM processed_artists WHERE mbid = ? AND role = ?", (mbid, role)
+        )
+        if row is None or row[0] != fingerprint or time.time() - row[1] > self.window_days * 86400:
+            return False
+        self.skipped += 1
+        return True
+
+    def mark(self, role: str, mbid: str, fingerprint: str) -> None:
+        if not self.enabled:
+            return
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO processed_artists (mbid, role, fingerprint, ts) VALUES (?, ?, ?, ?)",
+                (mbid, role, fingerprint, time.time())
+            )
@@ -0,0 +1,69 @@
+"""
+DiscoveryLastFM v2.1 - Similarity Ranking
+Ranking globale dei candidati simili su tutti gli artisti seed
+"""
+
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy opzionale: fallback puro Python
+    np = None
+
+# (mbid, name, match) come salvato in similar_cache
+Similar = Tuple[str, str, float]
+
+
+def rank_candidates(seeds: Sequence[Tuple[float, Sequence[Similar]]],
+                    min_match: float, budget: int) -> List[Tuple[str, str, float]]:
+    """
+    Calcola lo score globale dei candidati e ritorna il top-K
+
+    Args:
+        seeds: lista di (peso seed, artisti simili del seed); il peso è il play count
+        min_match: match minimo perché un simile contribuisca allo score
+        budget: numero massimo di candidati da ritornare
+
+    Returns:
+        Lista di (mbid, name, score) ordinata per score decrescente. Lo score è
+        la somma dei match pesata con i play count normalizzati dei seed, per cui
+        un candidato condiviso da più seed pesa più di uno citato da un solo seed.
+        A parità di score vince il candidato incontrato per primo.
+    """
+    index = {}
+    names = []
+    entries = []  # (seed_idx, cand_idx, match)
+    for seed_idx, (_weight, sims) in enumerate(seeds):
+        for mbid, name, match in sims:
+            if not mbid or match < min_match:
+                continue
+            if mbid not in index:
+                index[mbid] = len(names)
+                names.append((mbid, name))
+            entries.append((seed_idx, index[mbid], match))
+
+    if not entries or budget <= 0:
+        return []
+
+    max_weight = max(weight for weight, _sims in seeds) or 1
+    weights = [weight / max_weight for weight, _sims in seeds]
+
+    if np is not None:
+        # Matrice seed × candidati, score = pesi · matrice
+        matrix = np.zeros((len(seeds), len(names)), dtype=np.float64)
+        rows, cols, vals = zip(*entries)
+        # Un seed può elencare lo stesso candidato una sola volta: tieni il match più alto
+        np.maximum.at(matrix, (np.array(rows), np.array(cols)), np.array(vals))
+        scores = np.asarray(weights, dtype=np.float64) @ matrix
+        order = np.argsort(-scores, kind="stable")[:budget]
+        return [(names[i][0], names[i][1], float(scores[i])) for i in order]
+
+    best = {}
+    for seed_idx, cand_idx, match in entries:
+        key = (seed_idx, cand_idx)
+        best[key] = max(best.get(key, 0.0), match)
+    scores = [0.0] * len(names)
+    for (seed_idx, cand_idx), match in best.items():
+        scores[cand_idx] += weights[seed_idx] * match
+    order = sorted(range(len(names)), key=lambda i: -scores[i])[:budget]
+    return [(names[i][0], names[i][1], scores[i]) for i in order]
@@ -0,0 +1,75 @@
+"""
+DiscoveryLastFM v2.1 - Rate Limiting
+Token bucket per le chiamate API, condiviso fra thread e coroutine
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """
+    Token bucket con orologio monotono
+
+    Il bucket si ricarica di un token ogni delay secondi fino a burst token:
+    dopo una pausa (es. una risposta lenta) fino a burst chiamate partono
+    subito, poi il ritmo torna a una ogni delay secondi. Ogni chiamante
+    prenota il proprio token sotto lock (il saldo può andare in negativo,
+    cioè in coda) e attende fuori dal lock, così lo stesso bucket può essere
+    condiviso fra thread e task asyncio. delay <= 0 disabilita il limite.
+    """
+
+    def __init__(self, delay: float, burst: int = 1):
+        if burst < 1:
+            raise ValueError(f"burst must be >= 1, got {burst}")
+        self.delay = delay
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.waits = 0
+        self.waited = 0.0
+
+    def reserve(self) -> float:
+        """Prenota un token e ritorna i secondi da attendere prima della chiamata"""
+        with self._lock:
+            self.calls += 1
+            if self.delay <= 0:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.delay)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens * self.delay if self._tokens < 0 else 0.0
+            if wait > 0:
+                self.waits += 1
+                self.waited += wait
+        return wait
+
+    def acquire(self) -> float:
+        """Attende il proprio turno (bloccante) e ritorna i secondi attesi"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Attesa del turno senza bloccare l'event loop"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def reset_stats(self) -> None:
+        """Azzera i contatori (nuovo run in modalità daemon)"""
+        with self._lock:
+            self.calls = self.waits = 0
+            self.waited = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Chiamate, chiamate che hanno atteso e secondi di attesa totali"""
+        with self._lock:
+            return {"calls": self.calls, "waits": self.waits, "waited": round(self.waited, 1)}
@@ -0,0 +1,116 @@
+"""
+DiscoveryLastFM v2.1 - Schedule
+Pianificazione dei run in modalità daemon: intervallo fisso o espressione cron
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+
+# (minimo, massimo) per minuto, ora, giorno del mese, mese, giorno della settimana
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+class ScheduleError(ValueError):
+    """Espressione di pianificazione non valida"""
+    pass
+
+
+def _parse_field(spec: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_spec = part.split("/", 1)
+            if not step_spec.isdigit() or int(step_spec) == 0:
+                raise ScheduleError(f"Invalid step in cron field: {spec}")
+            step = int(step_spec)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_spec, end_spec = part.split("-", 1)
+            if not (start_spec.isdigit() and end_spec.isdigit()):
+                raise ScheduleError(f"Invalid range in cron field: {spec}")
+            start, end = int(start_spec), int(end_spec)
+        elif part.isdigit():
+            start = end = int(part)
+            if step > 1:
+                end = high
+        else:
+            raise ScheduleError(f"Invalid cron field: {spec}")
+        if start < low or end > high or start > end:
+            raise ScheduleError(f"Cron field {spec} out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    Espressione cron a 5 campi (minuto ora giorno mese giorno-settimana)
+
+    Supporta *, valori, intervalli a-b, passi */n e a-b/n e liste separate
+    da virgole; domenica è 0 o 7. Come in cron, se sia il giorno del mese
+    sia quello della settimana sono limitati basta che uno dei due combaci.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ScheduleError(f"Cron expression needs 5 fields, got {len(fields)}: {expression!r}")
+        self.expression = expression
+        parsed: List[Set[int]] = [_parse_field(f, low, high) for f, (low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """Primo istante pianificato strettamente dopo after"""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 4)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise ScheduleError(f"Cron expression never matches: {self.expression!r}")
+
+    def __str__(self) -> str:
+        return f"cron '{self.expression}'"
+
+
+class IntervalSchedule:
+    """Un run ogni minutes minuti, contati dall'inizio del run precedente"""
+
+    def __init__(self, minutes: float):
+        if minutes <= 0:
+            raise ScheduleError(f"Interval must be > 0 minutes, got {minutes}")
+        self.minutes = minutes
+
+    def next_after(self, after: datetime) -> datetime:
+        return after + timedelta(minutes=self.minutes)
+
+    def __str__(self) -> str:
+        return f"ogni {self.minutes:g} minuti"
+
+
+def create_schedule(cron: Optional[str], interval_minutes: float):
+    """Espressione cron se presente, altrimenti intervallo fisso"""
+    if cron:
+        return CronSchedule(cron)
+    return IntervalSchedule(interval_minutes)
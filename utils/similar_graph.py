@@ -0,0 +1,72 @@
+"""
+DiscoveryLastFM v2.1 - Similar Artist Graph
+Espansione multi-hop degli artisti simili con memoization dei nodi
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Lista di adiacenza nel formato compatto di similar_cache: [mbid, name, match]
+Edges = Sequence[Sequence]
+
+
+class SimilarGraph:
+    """
+    Grafo artista → (vicino, match) costruito sui risultati di artist.getSimilar
+
+    Le liste di adiacenza persistite sono le entry di similar_cache: il callable
+    get_neighbors le legge dalla cache (o le scarica da Last.fm se mancanti) e
+    il grafo le memorizza per il resto del run, così ogni nodo viene espanso
+    una sola volta anche se raggiunto da più seed.
+    """
+
+    def __init__(self, get_neighbors: Callable[[str, str], Optional[Edges]]):
+        self._get_neighbors = get_neighbors
+        self._adjacency: Dict[str, Edges] = {}
+        self.expansions = 0
+
+    def neighbors(self, aid: str, name: Optional[str] = None) -> Edges:
+        """Lista di adiacenza di un nodo, espansa al massimo una volta per run"""
+        if aid not in self._adjacency:
+            self._adjacency[aid] = self._get_neighbors(aid, name or aid) or []
+            self.expansions += 1
+        return self._adjacency[aid]
+
+    def expand(self, seed: str, name: str, depth: int, decay: float,
+               min_match: float, fanout: int) -> List[list]:
+        """
+        Visita BFS fino a depth hop dal seed
+
+        Vengono seguiti solo archi con match >= min_match, e da ogni nodo si
+        espandono al più fanout vicini (i più forti). Il peso di un candidato è
+        il prodotto dei match sul cammino, moltiplicato per decay a ogni hop
+        oltre il primo; se un candidato è raggiungibile da più cammini vale il
+        peso massimo.
+
+        Returns:
+            Lista [mbid, name, weight] ordinata per peso decrescente, seed escluso
+        """
+        best: Dict[str, list] = {}
+        visited = {seed}
+        frontier = [(seed, name, 1.0)]
+
+        for hop in range(1, depth + 1):
+            hop_factor = 1.0 if hop == 1 else decay
+            reached = {}
+            for node, node_name, node_weight in frontier:
+                edges = sorted(
+                    (e for e in self.neighbors(node, node_name) if e[2] >= min_match and e[0] != seed),
+                    key=lambda e: -e[2]
+                )
+                for rank, (mbid, nb_name, match) in enumerate(edges):
+                    weight = node_weight * match * hop_factor
+                    if mbid not in best or weight > best[mbid][2]:
+                        best[mbid] = [mbid, nb_name, weight]
+                    if rank < fanout and mbid not in visited and weight > reached.get(mbid, (None, 0.0))[1]:
+                        reached[mbid] = (nb_name, weight)
+
+            if hop == depth or not reached:
+                break
+            frontier = [(mbid, nb_name, weight) for mbid, (nb_name, weight) in reached.items()]
+            visited.update(reached)
+
+        return sorted(best.values(), key=lambda entry: -entry[2])
@@ -0,0 +1,121 @@
+"""
+DiscoveryLastFM v2.1 - Single Flight
+Coalescenza delle richieste identiche in volo e memo dei risultati per run
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+def freeze(value: Any) -> Hashable:
+    """Rende hashable parametri annidati (dict/list) per usarli in una chiave"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class SingleFlight:
+    """
+    Una sola chiamata in volo per chiave, risultati memoizzati
+
+    Chiamate concorrenti con la stessa chiave (es. backend, metodo, parametri)
+    attendono la chiamata già in corso invece di ripeterla; il risultato resta
+    in memo (LRU, max_entries) fino a reset() o invalidate(). None ed eccezioni
+    non vengono memoizzati: il chiamante successivo riprova. Funziona con
+    thread (do) e task asyncio (do_async), anche sulle stesse chiavi.
+    I risultati sono condivisi: i chiamanti non devono modificarli.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._memo: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._inflight = {}
+        # Incrementata da invalidate(): le chiamate partite prima non vanno in memo
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.memo_hits = 0
+
+    def _join(self, key: Hashable):
+        """(True, risultato) se in memo, altrimenti (leader, future della chiamata)"""
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.memo_hits += 1
+                return True, self._memo[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, future
+            future = self._inflight[key] = Future()
+            future.generation = self._generation
+            self.calls += 1
+            return None, future
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None,
+                error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if error is None and result is not None and self.max_entries > 0 \
+                    and future.generation == self._generation:
+                self._memo[key] = result
+                self._memo.move_to_end(key)
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        state, value = self._join(key)
+        if state:
+            return value
+        if state is False:
+            return value.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, value, error=e)
+            raise
+        self._finish(key, value, result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        state, value = self._join(key)
+        if state:
+            return value
+        if state is False:
+            return await asyncio.wrap_future(value)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, value, error=e)
+            raise
+        self._finish(key, value, result)
+        return result
+
+    def invalidate(self, match: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Rimuove dal memo le chiavi per cui match(key) è vero (tutte se None)"""
+        with self._lock:
+            self._generation += 1
+            # Chiamate in volo: completano per chi le attende, i nuovi chiamanti ripartono
+            for key in [key for key in self._inflight if match is None or match(key)]:
+                del self._inflight[key]
+            keys = [key for key in self._memo if match is None or match(key)]
+            for key in keys:
+                del self._memo[key]
+            return len(keys)
+
+    def reset(self) -> None:
+        """Nuovo run: memo e contatori azzerati (le chiamate in volo proseguono)"""
+        self.invalidate()
+        with self._lock:
+            self.calls = self.coalesced = self.memo_hits = 0
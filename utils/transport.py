@@ -0,0 +1,84 @@
+"""
+DiscoveryLastFM v2.1 - HTTP Transport
+Session HTTP condivise con connection pooling keep-alive per host
+"""
+
+import logging
+import threading
+import urllib.parse
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+
+class HTTPTransport:
+    """
+    Trasporto HTTP condiviso fra tutti i client API
+
+    Mantiene una requests.Session per host (scheme + netloc) con un pool di
+    connessioni keep-alive, così le chiamate successive allo stesso host
+    riusano la connessione TCP/TLS invece di ripetere l'handshake. Le
+    risposte sono richieste compresse (gzip/deflate). Thread-safe: le
+    session vengono create sotto lock e requests gestisce il pool.
+    """
+
+    def __init__(self, pool_maxsize: int = 10, headers: Optional[Dict[str, str]] = None):
+        self.pool_maxsize = pool_maxsize
+        self.headers = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        self.headers.update(headers or {})
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        """Session (creata al primo uso) per l'host dell'URL"""
+        parts = urllib.parse.urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                # Un solo host per session: un pool, dimensionato sulla concorrenza attesa
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount(host + "/", adapter)
+                self._sessions[host] = session
+                log.debug(f"HTTP session created for {host}")
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_transport: Optional[HTTPTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Trasporto condiviso di processo, usato dai client a cui non ne viene passato uno"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport()
+        return _default_transport
+
+
+def set_transport(transport: HTTPTransport) -> None:
+    """Imposta il trasporto condiviso di processo (es. con pool configurati)"""
+    global _default_transport
+    with _default_lock:
+        _default_transport = transport
@@ -19,6 +19,9 @@ from typing import Dict, Any, Optional, Tuple, List
 from datetime import datetime, timedelta
 from packaging import version
 
+from . import json_codec
+from .transport import HTTPTransport, get_transport
+
 log = logging.getLogger(__name__)
 
 
@@ -39,8 +42,9 @@ class GitHubUpdater:
     - Controllo periodic programmabile
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], transport: Optional[HTTPTransport] = None):
         self.config = config
+        self.transport = transport or get_transport()
         self.repo_owner = config.get("GITHUB_REPO_OWNER", "MrRobotoGit")
         self.repo_name = config.get("GITHUB_REPO_NAME", "DiscoveryLastFM")
         self.current_version = config.get("VERSION", "2.0.3")
@@ -102,7 +106,7 @@ class GitHubUpdater:
             headers["Authorization"] = f"token {self.github_token}"
         
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.transport.get(url, headers=headers, timeout=30)
             
             # Log rate limit info
             remaining = response.headers.get("X-RateLimit-Remaining")
@@ -110,7 +114,7 @@ class GitHubUpdater:
                 log.warning(f"GitHub API rate limit low: {remaining} requests remaining")
             
             response.raise_for_status()
-            return response.json()
+            return json_codec.response_json(response)
             
         except requests.exceptions.RequestException as e:
             log.error(f"GitHub API request failed: {e}")
@@ -251,7 +255,7 @@ class GitHubUpdater:
         log.info(f"Downloading release {version_tag}...")
         
         try:
-            response = requests.get(download_url, stream=True, timeout=300)
+            response = self.transport.get(download_url, stream=True, timeout=300)
             response.raise_for_status()
             
             # Download con progress (semplificato)
@@ -348,6 +352,15 @@ class GitHubUpdater:
             preserve_files = [
                 "config.py",
                 "lastfm_similar_cache.json",
+                "lastfm_similar_cache.json.migrated",
+                "lastfm_cache.db",
+                "lastfm_cache.db-wal",
+                "lastfm_cache.db-shm",
+                "added_albums.bin",
+                "added_albums.bin.log",
+                "album_filter.bin",
+                "discovery.lock",
+                "enqueue.lock",
                 "log",
                 "backups",
                 "tmp",
@@ -474,7 +487,9 @@ class GitHubUpdater:
             
             # Rimuovi file correnti (eccetto preserve_files)
             preserve_files = {
-                "config.py", "lastfm_similar_cache.json", "log", 
+                "config.py", "lastfm_similar_cache.json", "lastfm_similar_cache.json.migrated",
+                "lastfm_cache.db", "lastfm_cache.db-wal", "lastfm_cache.db-shm", "added_albums.bin",
+                "added_albums.bin.log", "album_filter.bin", "discovery.lock", "enqueue.lock", "log",
                 "backups", "tmp", "update_state.json"
             }
             
@@ -669,12 +684,14 @@ def get_current_version() -> str:
         return "2.0.3"  # Fallback
 
 
-def create_updater_from_config(config_dict: Dict[str, Any]) -> GitHubUpdater:
+def create_updater_from_config(config_dict: Dict[str, Any],
+                               transport: Optional[HTTPTransport] = None) -> GitHubUpdater:
     """
     Crea un'istanza GitHubUpdater dalla configurazione del progetto
     
     Args:
         config_dict: Dizionario con la configurazione
+        transport: Session HTTP condivise (default: trasporto di processo)
         
     Returns:
         Istanza configurata di GitHubUpdater
@@ -695,4 +712,4 @@ def create_updater_from_config(config_dict: Dict[str, Any]) -> GitHubUpdater:
         "ALLOW_PRERELEASE_UPDATES": config_dict.get("ALLOW_PRERELEASE_UPDATES", False)
     }
     
-    return GitHubUpdater(updater_config)
\ No newline at end of file
+    return GitHubUpdater(updater_config, transport)
\ No newline at end of file